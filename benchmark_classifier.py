@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the slot classifier and login heuristics.
+
+Runs the detection logic over the saved HTML snapshots in fixtures/pages
+(or any directory with the same manifest.json layout) and reports accuracy
+plus classification throughput - no browser, no embassy server.
+
+Usage:
+    python3 benchmark_classifier.py
+    python3 benchmark_classifier.py --pages 20000 --corpus my_snapshots/
+    python3 benchmark_classifier.py --extra-phrases 1000   # cost as the rule set grows
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import string
+import argparse
+
+from slot_detection import snapshot_from_html, classify_booking_page, classify_login_page
+from detection_rules import BUNDLED_RULES, DetectionRules
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+
+
+def load_corpus(corpus_dir):
+    """Load (entry, html) pairs described by the corpus manifest."""
+    with open(os.path.join(corpus_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    corpus = []
+    for entry in manifest:
+        with open(os.path.join(corpus_dir, entry['file']), encoding='utf-8') as f:
+            corpus.append((entry, f.read()))
+    return corpus
+
+
+def load_rules(path, extra_phrases=0):
+    """Compiled rules from path, padded with extra_phrases made-up phrases that never match."""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    rng = random.Random(0)
+    padding = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 14))) + ' xq'
+               for _ in range(extra_phrases)]
+    data['groups']['booking']['phrases'].setdefault('*', []).extend(padding)
+    return DetectionRules(data, source=os.path.basename(path)).base
+
+
+def check_accuracy(corpus, rules):
+    """Classify every page once and return the list of mismatches."""
+    mismatches = []
+    for entry, html in corpus:
+        snapshot = snapshot_from_html(html, entry['url'])
+        outcome = classify_booking_page(snapshot, entry['booking_path'], rules).outcome
+        logged_in = classify_login_page(snapshot, rules).logged_in
+
+        if outcome != entry['outcome']:
+            mismatches.append((entry['file'], 'outcome', entry['outcome'], outcome))
+        if 'logged_in' in entry and logged_in != entry['logged_in']:
+            mismatches.append((entry['file'], 'logged_in', entry['logged_in'], logged_in))
+    return mismatches
+
+
+def benchmark(corpus, total_pages, rules):
+    """Time parse+classify and classify-only passes over total_pages pages."""
+    rounds = max(1, total_pages // len(corpus))
+    pages = rounds * len(corpus)
+
+    start = time.perf_counter()
+    snapshots = []
+    for _ in range(rounds):
+        for entry, html in corpus:
+            snapshot = snapshot_from_html(html, entry['url'])
+            classify_booking_page(snapshot, entry['booking_path'], rules)
+            classify_login_page(snapshot, rules)
+    parse_elapsed = time.perf_counter() - start
+
+    # Classification alone - what the live monitor pays after its one round trip
+    for entry, html in corpus:
+        snapshots.append((snapshot_from_html(html, entry['url']), entry['booking_path']))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for snapshot, booking_path in snapshots:
+            classify_booking_page(snapshot, booking_path, rules)
+            classify_login_page(snapshot, rules)
+    classify_elapsed = time.perf_counter() - start
+
+    return pages, parse_elapsed, classify_elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the slot classifier over saved HTML snapshots")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help="directory containing manifest.json and HTML files")
+    parser.add_argument('--pages', type=int, default=10000, help="approximate number of pages to classify")
+    parser.add_argument('--rules', default=BUNDLED_RULES, help="detection rules file")
+    parser.add_argument('--extra-phrases', type=int, default=0, help="pad the rules with this many never-matching phrases")
+    args = parser.parse_args()
+
+    print("🧪 Slot Classifier Benchmark")
+    print("=" * 40)
+
+    corpus = load_corpus(args.corpus)
+    print(f"📂 Corpus: {args.corpus} ({len(corpus)} pages)")
+    rules = load_rules(args.rules, args.extra_phrases)
+    print(f"📏 Rules: {args.rules} ({len(rules.rules)} phrases)")
+
+    mismatches = check_accuracy(corpus, rules)
+    checks = sum(2 if 'logged_in' in entry else 1 for entry, _ in corpus)
+    accuracy = 100.0 * (checks - len(mismatches)) / checks
+    print(f"🎯 Accuracy: {accuracy:.1f}% ({checks - len(mismatches)}/{checks} labels)")
+    for name, field, expected, actual in mismatches:
+        print(f"   ❌ {name}: {field} expected {expected!r}, got {actual!r}")
+
+    pages, parse_elapsed, classify_elapsed = benchmark(corpus, args.pages, rules)
+    print(f"⚡ Parse + classify: {pages / parse_elapsed:,.0f} pages/s ({1e6 * parse_elapsed / pages:.1f} µs/page)")
+    print(f"⚡ Classify only:    {pages / classify_elapsed:,.0f} pages/s ({1e6 * classify_elapsed / pages:.1f} µs/page)")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
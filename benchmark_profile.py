@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark the standard and lean browser profiles.
+
+Starts a throwaway Chrome for each profile, loads the same page several
+times with a cold cache and reports bytes transferred, page-load time and
+renderer/browser RSS.
+
+Usage:
+    python3 prenotami_standin.py &                  # the default --url
+    python3 benchmark_profile.py --runs 10 --headless
+
+Every run is a real, cold-cache page load, so it loads the local stand-in
+by default; pass --url to measure another copy of the site.
+"""
+
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from browser_profile import BrowserProfile
+from process_memory import driver_memory
+from prenotami_standin import DEFAULT_PORT
+
+# Navigation + every resource the page pulled, as reported by the Performance API
+TRANSFER_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0] || {};
+const resources = performance.getEntriesByType('resource');
+let bytes = nav.transferSize || 0;
+for (const entry of resources) { bytes += entry.transferSize || 0; }
+return {
+    bytes: bytes,
+    requests: resources.length + 1,
+    dom_ready: nav.domContentLoadedEventEnd || 0,
+    load: nav.loadEventEnd || nav.duration || 0
+};
+"""
+
+
+def run_profile(profile, url, runs):
+    """Load url runs times with profile; returns a list of per-run dicts."""
+    user_data_dir = tempfile.mkdtemp(prefix=f"visa-bench-{profile.name}-")
+    chrome_options = Options()
+    chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--no-default-browser-check")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.page_load_strategy = 'normal'  # Measure the full load
+    profile.apply_options(chrome_options)
+
+    driver = webdriver.Chrome(options=chrome_options)
+    results = []
+    try:
+        profile.apply_to_driver(driver)
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.set_window_size(*profile.window_size())
+        for _ in range(runs):
+            driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+            start = time.perf_counter()
+            driver.get(url)
+            wall = time.perf_counter() - start
+            stats = driver.execute_script(TRANSFER_SCRIPT)
+            memory = driver_memory(driver)
+            results.append({
+                'wall': wall,
+                'bytes': stats['bytes'],
+                'requests': stats['requests'],
+                'load_ms': stats['load'],
+                'renderer_rss': memory.renderers if memory else 0,
+                'total_rss': memory.total if memory else 0,
+            })
+    finally:
+        driver.quit()
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+    return results
+
+
+def summarize(name, results):
+    def median(key):
+        return statistics.median(result[key] for result in results)
+    print(f"\n📊 {name} ({len(results)} runs, medians)")
+    print(f"   • Transferred:  {median('bytes') / 1024:,.1f} KB in {median('requests'):.0f} request(s)")
+    print(f"   • Page load:    {median('load_ms'):,.0f} ms (wall {median('wall'):.2f}s)")
+    print(f"   • Renderer RSS: {median('renderer_rss') / 2**20:,.1f} MB")
+    print(f"   • Total RSS:    {median('total_rss') / 2**20:,.1f} MB")
+    return {key: median(key) for key in ('bytes', 'load_ms', 'renderer_rss', 'total_rss')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the standard and lean browser profiles")
+    parser.add_argument('--url', default=f"http://127.0.0.1:{DEFAULT_PORT}/Home/Login",
+                        help="page to load (default: the local stand-in)")
+    parser.add_argument('--runs', type=int, default=5, help="page loads per profile")
+    parser.add_argument('--headless', action='store_true', help="run both profiles headless")
+    args = parser.parse_args()
+
+    print("🧪 Browser Profile Benchmark")
+    print("=" * 40)
+    print(f"🌐 URL: {args.url}")
+
+    standard = summarize("Standard profile", run_profile(BrowserProfile('standard', headless=args.headless), args.url, args.runs))
+    lean = summarize("Lean profile", run_profile(BrowserProfile('lean', headless=args.headless), args.url, args.runs))
+
+    print("\n📉 Lean vs standard")
+    for key, label in (('bytes', 'Bytes'), ('load_ms', 'Load time'), ('renderer_rss', 'Renderer RSS'), ('total_rss', 'Total RSS')):
+        if standard[key]:
+            print(f"   • {label}: {100.0 * (lean[key] - standard[key]) / standard[key]:+.0f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
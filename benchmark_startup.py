@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark time-to-first-check after a restart.
+
+Measures ChromeDriver resolution with a cold state file (full probe, as on
+first install) and with the warm cached state, and optionally the full
+browser launch up to a ready about:blank page.
+
+Usage:
+    python3 benchmark_startup.py
+    python3 benchmark_startup.py --runs 20 --launch
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+from driver_cache import DriverResolver
+
+
+def time_resolution(state_file, runs, cold):
+    """Time resolve() runs times; cold removes the state file before each run."""
+    timings = []
+    path = None
+    for _ in range(runs):
+        if cold and os.path.exists(state_file):
+            os.remove(state_file)
+        start = time.perf_counter()
+        resolver = DriverResolver(state_file)
+        path = resolver.resolve(allow_download=False)
+        timings.append(time.perf_counter() - start)
+    return path, timings
+
+
+def time_launch(driver_path, runs):
+    """Time driver start + first blank page with the resolved driver."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    timings = []
+    for _ in range(runs):
+        chrome_options = Options()
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        start = time.perf_counter()
+        driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+        driver.get("about:blank")
+        timings.append(time.perf_counter() - start)
+        driver.quit()
+    return timings
+
+
+def report(label, timings):
+    print(f"   • {label}: median {1000 * statistics.median(timings):,.1f} ms, "
+          f"max {1000 * max(timings):,.1f} ms ({len(timings)} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ChromeDriver resolution and browser startup")
+    parser.add_argument('--runs', type=int, default=10, help="repetitions per measurement")
+    parser.add_argument('--launch', action='store_true', help="also time a headless browser launch")
+    args = parser.parse_args()
+
+    print("🧪 Startup Benchmark")
+    print("=" * 40)
+
+    state_file = os.path.join(tempfile.mkdtemp(prefix="visa-driver-state-"), 'state.json')
+    path, cold = time_resolution(state_file, args.runs, cold=True)
+    if not path:
+        print("❌ No local ChromeDriver matching the installed Chrome (downloads are disabled here)")
+        return 1
+    _, warm = time_resolution(state_file, args.runs, cold=False)
+
+    print(f"📍 Driver: {path}")
+    print("\n⏱️ Driver resolution")
+    report("Cold (no state file)", cold)
+    report("Warm (cached state) ", warm)
+
+    if args.launch:
+        print("\n⏱️ Browser launch to about:blank")
+        report("Headless Chrome", time_launch(path, max(1, args.runs // 2)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
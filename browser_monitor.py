@@ -7,63 +7,123 @@ the VISA booking page directly without any cookie extraction needed.
 """
 
 import os
+import sys
 import time
+import asyncio
 import logging
-from datetime import datetime, timedelta
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from datetime import datetime
 from dotenv import load_dotenv
-import subprocess
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('visa_monitor.log'),
-        logging.StreamHandler()
-    ]
+from slot_detection import (
+    SLOTS_AVAILABLE, NO_SLOTS, LOGIN_REQUIRED, MAINTENANCE, PageSnapshot, SlotCheckResult, VerdictCache,
+    capture_snapshot, classify_booking_page, classify_page_content, classify_login_page
+)
+from page_readiness import (
+    PAGE_LOAD_STRATEGIES, PageReadiness, any_of, url_left, form_present,
+    document_complete, document_interactive, services_rendered, login_form_present
 )
+from targets import load_targets, site_url
+from monitor_engine import AsyncMonitorEngine
+from email_notifier import SMTPNotifier
+from browser_profile import BrowserProfile
+from memory_governor import MemoryGovernor, RECYCLE_TAB, RESTART_BROWSER
+from session_cookies import browser_cookies, restore_cookies
+from driver_cache import DriverResolver, DEFAULT_STATE_FILE
+from metrics import MetricsRegistry
+from structured_log import configure_logging
+from history import CheckHistory
+from session_health import SessionWatch
+from detection_rules import rules_for
+
+# Selenium, requests and smtplib are imported by the subsystems that use them,
+# so lightweight commands (config check, email test) start without them.
+
 logger = logging.getLogger(__name__)
 
 class BrowserVisaMonitor:
-    def __init__(self):
-        """Initialize the browser-based VISA monitor."""
+    def __init__(self, profile_dir=None, worker_index=0, worker_count=1, rate_limiter=None, interactive=True):
+        """Initialize the browser-based VISA monitor.
+
+        The keyword arguments are set by the worker pool (worker_pool.py): each
+        worker gets its own Chrome profile, a place in the check rotation and the
+        pool's shared rate limiter, and waits for login without a terminal prompt.
+        """
         load_dotenv()
         
-        self.booking_url = "https://prenotami.esteri.it/Services/Booking/4755"
-        self.services_url = "https://prenotami.esteri.it/Services/"
+        self.site_url = site_url()
+        self.services_url = f"{self.site_url}/Services/"
+        self.name = os.getenv('WORKER_NAME', '')
+        self.profile_dir = profile_dir or os.getenv('CHROME_PROFILE_DIR', '/tmp/chrome-visa-monitor')
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        self.rate_limiter = rate_limiter
+        self.interactive = interactive
+        self.login_wait = float(os.getenv('LOGIN_WAIT', 240))
         
-        # Email configuration
-        self.sender_email = os.getenv('SENDER_EMAIL')
-        self.sender_password = os.getenv('SENDER_PASSWORD') 
-        receiver_email_str = os.getenv('RECEIVER_EMAIL', '')
-        # Parse comma-separated email addresses
-        self.receiver_emails = [email.strip() for email in receiver_email_str.split(',') if email.strip()]
-        self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-        self.smtp_port = int(os.getenv('SMTP_PORT', 587))
+        # Email configuration - one warm SMTP connection reused across alerts
+        self.notifier = SMTPNotifier.from_env()
+        self.sender_email = self.notifier.sender
+        self.receiver_emails = self.notifier.receivers
         
         # Monitoring configuration
         self.check_interval = int(os.getenv('CHECK_INTERVAL', 300))  # 5 minutes default
         logger.info(f"⏰ Check interval: {self.check_interval} seconds ({self.check_interval//60} minutes)")
+        
+        # Services/consulates to watch - all share this one browser session
+        self.targets = load_targets(self.check_interval)
+        
+        # Page readiness configuration
+        self.page_load_strategy = os.getenv('PAGE_LOAD_STRATEGY', 'eager').lower()
+        if self.page_load_strategy not in PAGE_LOAD_STRATEGIES:
+            logger.warning(f"⚠️ Unknown PAGE_LOAD_STRATEGY '{self.page_load_strategy}' - using 'eager'")
+            self.page_load_strategy = 'eager'
+        self.ready_timeout = float(os.getenv('READY_TIMEOUT', 15))
+        self.readiness = None
+        
+        # Optional HTTP probe: only render the booking page when it may have slots
+        self.probe_mode = os.getenv('PROBE_MODE', 'false').lower() in ('1', 'true', 'yes')
+        self.probe = None
+        if self.probe_mode:
+            from http_probe import RedirectProbe
+            self.probe = RedirectProbe()
+        
+        # Booking verdict from DevTools network events (status + Location) instead of the rendered page
+        self.network_detection = os.getenv('NETWORK_DETECTION', 'false').lower() in ('1', 'true', 'yes')
+        self.network = None
+        
+        # Standard or lean (resource-blocking, optionally headless) Chrome
+        self.profile = BrowserProfile.from_env()
+        self.driver_resolver = DriverResolver(os.getenv('DRIVER_STATE_FILE', DEFAULT_STATE_FILE))
+        
+        # Memory governance for long unattended runs
+        self.memory = MemoryGovernor.from_env()
+        
+        # Per-phase timings and check counters (exported by the engine)
+        self.metrics = MetricsRegistry()
+        
+        # Every check outcome goes to SQLite for later analysis
+        self.history = CheckHistory.from_env()
+        
+        # Verdicts for pages already seen - unchanged pages skip text transfer and classification
+        self.verdicts = VerdictCache(int(os.getenv('VERDICT_CACHE_SIZE', 64)))
+        
+        # Login state from cookies and check outcomes, refreshed before it expires
+        self.session = SessionWatch.from_env()
+        self.keepalive_probe = None
+        self.blocking_tab = None  # Window handle the profile's URL blocking was installed on
         self.driver = None
+        self.last_result = None
 
     def setup_browser(self):
         """Connect to existing browser or create new session."""
         try:
             logger.info("🌐 Setting up browser connection...")
+            from selenium import webdriver
+            from selenium.webdriver.chrome.service import Service
+            from selenium.webdriver.chrome.options import Options
             logger.info("⚙️ Configuring Chrome options...")
             
             chrome_options = Options()
-            chrome_options.add_argument("--user-data-dir=/tmp/chrome-visa-monitor")
+            chrome_options.add_argument(f"--user-data-dir={self.profile_dir}")
             chrome_options.add_argument("--no-first-run")
             chrome_options.add_argument("--no-default-browser-check")
             chrome_options.add_argument("--disable-blink-features=AutomationControlled")
@@ -74,79 +134,59 @@ class BrowserVisaMonitor:
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
             chrome_options.add_experimental_option("detach", True)  # Keep browser open when script ends
+            chrome_options.page_load_strategy = self.page_load_strategy
+            self.profile.apply_options(chrome_options)
+            if self.network_detection:
+                from network_watch import enable_network_log
+                enable_network_log(chrome_options)
+            if self.profile.lean:
+                logger.info(f"🪶 Lean browser profile{' (headless)' if self.profile.headless else ''}")
             
             logger.info("🔍 Attempting to connect to ChromeDriver...")
             
-            # Try to use system Chrome first
+            # Cached driver path when Chrome hasn't changed; probe/download only on mismatch
+            driver_path = self.driver_resolver.resolve()
             try:
-                service = Service("/opt/homebrew/bin/chromedriver")
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                logger.info("✅ Using system ChromeDriver at /opt/homebrew/bin/chromedriver")
+                if not driver_path:
+                    raise Exception("no matching ChromeDriver found")
+                self.driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
             except Exception as e1:
-                logger.info(f"ℹ️ System ChromeDriver failed: {str(e1)}")
+                logger.info(f"ℹ️ ChromeDriver launch failed: {str(e1)}")
+                # Forget the cached driver and resolve again from scratch
+                self.driver_resolver.invalidate()
+                fresh_path = self.driver_resolver.resolve() if driver_path else None
                 try:
-                    # Try without explicit service path
-                    self.driver = webdriver.Chrome(options=chrome_options)
-                    logger.info("✅ Using Chrome with automatic driver detection")
+                    if fresh_path and fresh_path != driver_path:
+                        self.driver = webdriver.Chrome(service=Service(fresh_path), options=chrome_options)
+                    else:
+                        # Let Selenium find a driver itself as the last resort
+                        self.driver = webdriver.Chrome(options=chrome_options)
+                        logger.info("✅ Using Chrome with automatic driver detection")
                 except Exception as e2:
-                    logger.info(f"ℹ️ Automatic detection failed: {str(e2)}")
-                    # Clear webdriver-manager cache and try again
-                    logger.info("🧹 Clearing ChromeDriver cache...")
-                    try:
-                        import shutil
-                        cache_path = os.path.expanduser("~/.wdm")
-                        if os.path.exists(cache_path):
-                            shutil.rmtree(cache_path)
-                            logger.info("✅ Cache cleared")
-                    except Exception as cache_error:
-                        logger.warning(f"⚠️ Could not clear cache: {cache_error}")
-                    
-                    # Try webdriver-manager with fresh download
-                    logger.info("🔄 Downloading fresh ChromeDriver...")
-                    try:
-                        driver_path = ChromeDriverManager().install()
-                        logger.info(f"📍 Downloaded driver to: {driver_path}")
-                        
-                        # Verify the downloaded file is executable
-                        if os.path.exists(driver_path) and os.access(driver_path, os.X_OK):
-                            service = Service(driver_path)
-                            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                            logger.info("✅ Using downloaded ChromeDriver")
-                        else:
-                            logger.error(f"❌ Downloaded driver is not executable: {driver_path}")
-                            raise Exception("ChromeDriver not executable")
-                    except Exception as wdm_error:
-                        logger.error(f"❌ WebDriver Manager failed: {wdm_error}")
-                        # Final fallback - try to find Chrome in common locations
-                        chrome_locations = [
-                            "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
-                            "/usr/bin/google-chrome",
-                            "/usr/local/bin/chromedriver"
-                        ]
-                        
-                        logger.info("🔍 Trying alternative Chrome locations...")
-                        for location in chrome_locations:
-                            if os.path.exists(location):
-                                logger.info(f"📍 Found Chrome at: {location}")
-                                break
-                        
-                        raise Exception("All ChromeDriver methods failed")
+                    logger.error(f"❌ ChromeDriver fallback failed: {str(e2)}")
+                    raise Exception("All ChromeDriver methods failed")
             
             # Configure browser to avoid detection
             logger.info("🛡️ Applying anti-detection measures...")
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
+            # Block images, fonts and trackers for the lean profile
+            self.blocking_tab = None
+            self.block_resources()
+            
             # Set window size to prevent issues
-            self.driver.set_window_size(1200, 800)
+            self.driver.set_window_size(*self.profile.window_size())
+            self.readiness = PageReadiness(self.driver)
+            if self.network_detection:
+                from network_watch import NetworkWatch
+                self.network = NetworkWatch(self.driver)
             
             # Navigate to prenotami homepage
             logger.info("🌐 Opening Prenotami website...")
-            self.driver.get("https://prenotami.esteri.it/")
+            self.readiness.navigate(f"{self.site_url}/")
+            self.readiness.wait_for(document_interactive(), self.ready_timeout)
             logger.info("✅ Browser setup complete")
             
-            # Add a small delay to ensure page loads
-            time.sleep(2)
-            
             return True
             
         except Exception as e:
@@ -158,8 +198,13 @@ class BrowserVisaMonitor:
                     pass
             return False
 
-    def ensure_logged_in(self):
-        """Check if user is logged in, if not prompt them to login."""
+    def ensure_logged_in(self, interactive=None, wait=None):
+        """Check if user is logged in, if not prompt them to login.
+
+        interactive=False (default: self.interactive) polls the page for up
+        to wait seconds (default LOGIN_WAIT) instead of prompting - for
+        callers that must not block on the terminal.
+        """
         try:
             # Check if browser is still alive
             if not self.driver:
@@ -177,54 +222,37 @@ class BrowserVisaMonitor:
                 logger.info("� The browser window may have been closed manually")
                 return False
             
-            logger.info("�🔍 Checking login status...")
-            logger.info(f"📍 Navigating to: {self.services_url}")
+            logger.debug("🔍 Checking login status...")
+            logger.debug("📍 Navigating to: %s", self.services_url)
             
-            # Navigate to services page
-            self.driver.get(self.services_url)
-            time.sleep(3)
+            # Navigate to services page and wait until we can tell which page it is
+            self.readiness.navigate(self.services_url)
+            self.readiness.wait_for(self.login_state_known(), self.ready_timeout)
             
-            # Get current URL safely
+            # Get URL and visible page text in one round trip
             try:
-                current_url = self.driver.current_url
-                if current_url:
-                    current_url = current_url.lower()
-                    logger.info(f"📍 Current URL: {self.driver.current_url}")
+                snapshot = capture_snapshot(self.driver)
+                if snapshot.url:
+                    logger.debug("📍 Current URL: %s", snapshot.url)
                 else:
                     logger.error("❌ Could not get current URL - browser may be in bad state")
                     return False
-            except Exception as e:
-                logger.error(f"❌ Failed to get current URL: {str(e)}")
-                return False
-            
-            # Get page content safely
-            try:
-                page_content = self.driver.page_source
-                if page_content:
-                    page_content = page_content.lower()
-                else:
-                    logger.error("❌ Could not get page content - browser may be in bad state")
-                    return False
             except Exception as e:
                 logger.error(f"❌ Failed to get page content: {str(e)}")
                 return False
             
-            logger.info("🔍 Analyzing page for login indicators...")
-            
-            # Check for login indicators
-            login_indicators = ['services', 'prenota', 'book', 'logout']
-            logged_in_signs = [indicator for indicator in login_indicators if indicator in page_content]
-            logger.info(f"✅ Login indicators found: {', '.join(logged_in_signs) if logged_in_signs else 'None'}")
+            logger.debug("🔍 Analyzing page for login indicators...")
             
-            # Check if we're on login page
-            not_logged_indicators = ['login', 'accedi', 'sign in']
-            not_logged_signs = [indicator for indicator in not_logged_indicators if indicator in page_content or indicator in current_url]
-            logger.info(f"❌ Not-logged indicators found: {', '.join(not_logged_signs) if not_logged_signs else 'None'}")
+            login_check = classify_login_page(snapshot)
+            logged_in_signs = login_check.logged_in_signs
+            not_logged_signs = login_check.not_logged_signs
+            logger.debug("✅ Login indicators found: %s", logged_in_signs or 'None')
+            logger.debug("❌ Not-logged indicators found: %s", not_logged_signs or 'None')
             
-            is_logged_in = len(logged_in_signs) > 0 and len(not_logged_signs) == 0
-            
-            if not is_logged_in:
+            if not login_check.logged_in:
                 logger.info("⚠️ Not logged in - please login manually")
+                if not (self.interactive if interactive is None else interactive):
+                    return self.wait_for_login(wait)
                 print("\n" + "="*60)
                 print("🔐 LOGIN REQUIRED")
                 print("="*60)
@@ -239,21 +267,21 @@ class BrowserVisaMonitor:
                 
                 # Recheck after user confirms
                 logger.info("🔄 Rechecking login status after user confirmation...")
-                self.driver.refresh()
-                time.sleep(3)
+                self.readiness.refresh()
+                self.readiness.wait_for(self.login_state_known(), self.ready_timeout)
                 
-                page_content = self.driver.page_source.lower()
-                logged_in_signs = [indicator for indicator in login_indicators if indicator in page_content]
+                logged_in_signs = classify_login_page(capture_snapshot(self.driver)).logged_in_signs
                 
                 if len(logged_in_signs) > 0:
                     logger.info(f"✅ Login confirmed! Found: {', '.join(logged_in_signs)}")
+                    self.session_confirmed()
                     return True
                 else:
                     logger.error("❌ Still not logged in")
                     return False
             else:
-                logger.info("✅ Already logged in!")
-                logger.info(f"🎯 Confirmed by: {', '.join(logged_in_signs)}")
+                logger.info(f"✅ Logged in (confirmed by: {', '.join(logged_in_signs)})")
+                self.session_confirmed()
                 return True
                 
         except Exception as e:
@@ -261,189 +289,346 @@ class BrowserVisaMonitor:
             logger.info("💡 This often happens when the browser window is closed")
             return False
 
-    def check_visa_slots(self):
-        """Check if VISA slots are available."""
+    def wait_for_login(self, wait=None):
+        """Poll the page until the user has logged in in this browser window (no terminal prompt)."""
+        wait = self.login_wait if wait is None else min(wait, self.login_wait)
+        window = f"the {self.name} browser window" if self.name else "the browser window"
+        logger.info(f"🔐 Please login to Prenotami in {window} - waiting up to {wait:.0f}s")
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(5)
+            try:
+                login_check = classify_login_page(capture_snapshot(self.driver))
+            except Exception:
+                continue  # Mid-navigation while the user logs in
+            if login_check.logged_in:
+                logger.info(f"✅ Login confirmed! Found: {', '.join(login_check.logged_in_signs)}")
+                self.session_confirmed()
+                return True
+        logger.error("❌ Still not logged in")
+        return False
+
+    def session_confirmed(self):
+        """Record a confirmed login along with the current auth cookies."""
+        try:
+            cookies = browser_cookies(self.driver, [self.services_url])
+        except Exception:
+            cookies = None
+        self.session.confirmed(cookies)
+
+    def session_valid(self):
+        """Cheap login check from the session cookies (over CDP) and the last checks - no page load."""
+        try:
+            cookies = browser_cookies(self.driver, [self.services_url])
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read session cookies: {str(e)}")
+            return False
+        valid, reason = self.session.check(cookies)
+        if valid:
+            logger.info(f"✅ Session still valid ({reason}) - no page load needed")
+        else:
+            logger.warning(f"🔐 Session looks lost: {reason}")
+        return valid
+
+    def keep_session_alive(self):
+        """Refresh the session with one small authenticated request before it expires.
+
+        Uses a no-follow HTTP request with the browser's cookies (rotated
+        cookies go back to Chrome); without requests installed, loads the
+        Services page in the tab instead. Returns True/False for logged
+        in/out, None when the answer was inconclusive.
+        """
+        if self.keepalive_probe is None:
+            try:
+                from http_probe import RedirectProbe
+                self.keepalive_probe = self.probe or RedirectProbe()
+            except ImportError:
+                self.keepalive_probe = False
+        
+        if self.keepalive_probe:
+            from http_probe import PROBE_LOGIN_REQUIRED
+            self.keepalive_probe.sync_from_browser(self.driver, self.services_url)
+            result = self.keepalive_probe.probe(self.services_url, 'services/booking')
+            self.keepalive_probe.push_to_browser(self.driver, result.cookies, self.services_url)
+            logged_in = False if result.verdict == PROBE_LOGIN_REQUIRED else (True if result.status == 200 else None)
+            logger.debug("🫀 Session keepalive: HTTP %s (%.2fs)", result.status, result.elapsed)
+        else:
+            self.readiness.navigate(self.services_url)
+            self.readiness.wait_for(self.login_state_known(), self.ready_timeout)
+            logged_in = classify_login_page(capture_snapshot(self.driver)).logged_in
+            self.memory.park(self.driver)
+        
+        if logged_in:
+            self.session_confirmed()
+            logger.info("🫀 Session refreshed")
+        elif logged_in is False:
+            self.session.logged_out = True
+            logger.warning("🔐 Session keepalive found the login page - login needed")
+        return logged_in
+
+    def booking_outcome_known(self, target):
+        """Readiness condition: redirected away, form rendered, or page fully loaded."""
+        return any_of(url_left(target.booking_path), form_present(), document_complete())
+
+    def login_state_known(self):
+        """Readiness condition: services list or login form visible, or page fully loaded."""
+        return any_of(services_rendered(), login_form_present(), document_complete())
+
+    def probe_booking_page(self, target):
+        """Ask for the booking URL over HTTP without following redirects.
+
+        Returns a SlotCheckResult when the probe alone settles the check
+        (redirected to Services), or None when the browser should look.
+        """
+        from http_probe import PROBE_NO_SLOTS
         try:
-            logger.info("🎯 Checking VISA booking slots...")
-            logger.info(f"📍 Navigating to: {self.booking_url}")
+            self.probe.sync_from_browser(self.driver, target.booking_url)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not copy browser cookies to probe: {str(e)}")
+            return None
+        
+        probe_result = self.probe.probe(target.booking_url, target.booking_path)
+        if probe_result.error:
+            logger.warning(f"⚠️ Probe request failed: {probe_result.error}")
+        else:
+            logger.debug("🛰️ Probe: HTTP %s %s (%.2fs) → %s", probe_result.status,
+                         probe_result.location or '', probe_result.elapsed, probe_result.verdict)
+        self.probe.push_to_browser(self.driver, probe_result.cookies, target.booking_url)
+        
+        if probe_result.verdict != PROBE_NO_SLOTS:
+            return None
+        snapshot = PageSnapshot(url=probe_result.location)
+        evidence = {'no_slots_messages': [], 'probe_status': probe_result.status}
+        return SlotCheckResult(NO_SLOTS, snapshot, "probe redirected to services page", evidence)
+
+    def network_verdict(self, target):
+        """Settle the check from the booking request's response headers, if they are conclusive.
+
+        Returns a SlotCheckResult for a redirect to Services (loading of that
+        page is stopped), or None when the page has to be looked at.
+        """
+        from http_probe import PROBE_NO_SLOTS
+        from network_watch import SETTLED_GRACE
+        # Only a non-blocking navigation ('none') has to wait for the headers
+        timeout = self.ready_timeout if self.page_load_strategy == 'none' else SETTLED_GRACE
+        response = self.network.booking_response(target.booking_path, timeout)
+        if response is None:
+            return None
+        verdict = response.verdict(target.booking_path)
+        logger.debug("🛰️ Network: HTTP %s %s (%.2fs after navigation returned) → %s",
+                     response.status, response.location, response.elapsed, verdict)
+        self.metrics.inc('network_verdicts_total', verdict=verdict)
+        if verdict != PROBE_NO_SLOTS:
+            return None
+        self.network.stop_loading()
+        snapshot = PageSnapshot(url=response.location)
+        evidence = {'no_slots_messages': [], 'network_status': response.status}
+        return SlotCheckResult(NO_SLOTS, snapshot, "redirected to services page (network)", evidence)
+
+    def check_visa_slots(self, target=None):
+        """Check if VISA slots are available for target (default: first target)."""
+        target = target or self.targets[0]
+        timings = {}
+        try:
+            logger.debug("🎯 Checking booking slots for %s...", target.label)
+            self.block_resources()
+            
+            if self.probe:
+                with self.metrics.timer('probe', into=timings):
+                    result = self.probe_booking_page(target)
+                if result:
+                    result.timings = timings
+                    self.last_result = target.last_result = result
+                    self.session.observe_outcome(result.outcome)
+                    logger.debug("❌ Probe redirected to services page - No slots available")
+                    return False
+                logger.debug("🔎 Probe inconclusive or slots possible - loading page in browser")
             
-            # Navigate to booking page
-            start_time = time.time()
-            self.driver.get(self.booking_url)
+            logger.debug("📍 Navigating to: %s", target.booking_url)
             
-            logger.info("⏳ Waiting for page to load...")
-            time.sleep(3)
-            load_time = time.time() - start_time
+            # Navigate to booking page
+            watching = self.network is not None and self.network.available
+            if watching:
+                self.network.begin()
+            with self.metrics.timer('navigation', into=timings):
+                self.readiness.navigate(target.booking_url)
+            
+            if watching:
+                with self.metrics.timer('network_verdict', into=timings):
+                    result = self.network_verdict(target)
+                if result:
+                    result.timings = timings
+                    self.last_result = target.last_result = result
+                    self.session.observe_outcome(result.outcome)
+                    logger.debug("❌ Booking request redirected to services page - No slots available")
+                    return False
             
-            current_url = self.driver.current_url.lower()
-            logger.info(f"📍 Final URL: {self.driver.current_url}")
-            logger.info(f"⌛ Page load time: {load_time:.1f}s")
+            logger.debug("⏳ Waiting for page outcome...")
+            with self.metrics.timer('readiness_wait', into=timings):
+                self.readiness.wait_for(self.booking_outcome_known(target), self.ready_timeout)
             
-            # Get page title for additional context
+            # One round trip for URL, title, element counts and visible text (unless already known)
+            rules = rules_for(target.consulate)
             try:
-                page_title = self.driver.title
-                logger.info(f"📄 Page title: {page_title}")
-            except:
-                logger.warning("⚠️ Could not get page title")
-            
-            # Check if we stayed on the booking page
-            if "booking/4755" in current_url:
-                logger.info("✅ Stayed on booking page - analyzing for slots...")
-                
-                # Look for booking form elements
-                try:
-                    logger.info("🔍 Analyzing page content for booking form...")
-                    
-                    # Wait a bit for page to fully load
-                    time.sleep(2)
-                    
-                    # Look for form elements
-                    form_elements = self.driver.find_elements(By.TAG_NAME, "form")
-                    input_elements = self.driver.find_elements(By.TAG_NAME, "input")
-                    submit_buttons = self.driver.find_elements(By.CSS_SELECTOR, "input[type='submit'], button[type='submit'], .btn-submit")
-                    
-                    logger.info(f"📋 Found {len(form_elements)} form(s)")
-                    logger.info(f"📝 Found {len(input_elements)} input field(s)")
-                    logger.info(f"🔘 Found {len(submit_buttons)} submit button(s)")
-                    
-                    # Look for typical booking form fields
-                    name_fields = self.driver.find_elements(By.CSS_SELECTOR, "input[name*='name'], input[name*='Name'], input[id*='name'], input[id*='Name']")
-                    email_fields = self.driver.find_elements(By.CSS_SELECTOR, "input[type='email'], input[name*='email'], input[name*='Email']")
-                    phone_fields = self.driver.find_elements(By.CSS_SELECTOR, "input[name*='phone'], input[name*='Phone'], input[type='tel']")
-                    
-                    logger.info(f"👤 Found {len(name_fields)} name field(s)")
-                    logger.info(f"📧 Found {len(email_fields)} email field(s)")
-                    logger.info(f"📞 Found {len(phone_fields)} phone field(s)")
-                    
-                    # Check for booking-specific text
-                    page_text = self.driver.page_source.lower()
-                    booking_keywords = ['book', 'prenota', 'appointment', 'appuntamento', 'slot', 'available']
-                    found_keywords = [word for word in booking_keywords if word in page_text]
-                    logger.info(f"🔤 Booking keywords found: {', '.join(found_keywords) if found_keywords else 'None'}")
-                    
-                    has_booking_form = (
-                        len(form_elements) > 0 and 
-                        len(input_elements) > 3 and  # More than just basic inputs
-                        (len(submit_buttons) > 0 or len(name_fields) > 0 or len(email_fields) > 0)
-                    )
-                    
-                    if has_booking_form:
-                        logger.info("🎉 SLOTS AVAILABLE! Booking form detected!")
-                        logger.info("📊 Form analysis:")
-                        logger.info(f"   • Forms: {len(form_elements)}")
-                        logger.info(f"   • Inputs: {len(input_elements)}")  
-                        logger.info(f"   • Buttons: {len(submit_buttons)}")
-                        logger.info(f"   • Name fields: {len(name_fields)}")
-                        logger.info(f"   • Email fields: {len(email_fields)}")
-                        
-                        # Take a screenshot for verification
-                        try:
-                            screenshot_path = f"slot_available_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                            self.driver.save_screenshot(screenshot_path)
-                            logger.info(f"📸 Screenshot saved: {screenshot_path}")
-                        except Exception as e:
-                            logger.warning(f"⚠️ Could not save screenshot: {str(e)}")
-                        
-                        return True
-                    else:
-                        logger.info("❌ On booking page but no booking form detected")
-                        logger.info("📊 Analysis summary:")
-                        logger.info(f"   • Forms: {len(form_elements)} (need > 0)")
-                        logger.info(f"   • Inputs: {len(input_elements)} (need > 3)")
-                        logger.info(f"   • Submit buttons: {len(submit_buttons)}")
-                        logger.info(f"   • Booking fields: {len(name_fields) + len(email_fields)}")
-                        return False
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️ Error checking form elements: {str(e)}")
-                    # Fallback: check page content
-                    logger.info("🔄 Falling back to content-based detection...")
-                    page_content = self.driver.page_source.lower()
-                    form_indicators = ['first name', 'last name', 'email', 'phone', 'submit', 'confirm', 'book']
-                    
-                    found_indicators = []
-                    for indicator in form_indicators:
-                        if indicator in page_content:
-                            found_indicators.append(indicator)
-                    
-                    logger.info(f"🔤 Content indicators found: {', '.join(found_indicators) if found_indicators else 'None'}")
-                    
-                    has_form = len(found_indicators) >= 2  # Need at least 2 indicators
-                    
-                    if has_form:
-                        logger.info("🎉 SLOTS AVAILABLE! (Detected via page content)")
-                        logger.info(f"📊 Found indicators: {', '.join(found_indicators)}")
-                        return True
-                    else:
-                        logger.info("❌ No booking form detected in page content")
-                        logger.info(f"📊 Only found: {', '.join(found_indicators) if found_indicators else 'No booking indicators'}")
-                        return False
-            
-            # Check if redirected to services page (no slots)
-            elif "services" in current_url:
-                logger.info("❌ Redirected to services page - No slots available")
-                logger.info("🔍 Analyzing redirect reason...")
-                
-                # Look for the "all booked" message
-                try:
-                    page_content = self.driver.page_source.lower()
-                    no_slots_messages = [
-                        'all appointments', 'fully booked', 'no availability',
-                        'non ci sono', 'tutto prenotato', 'esaurito', 'disponibilità'
-                    ]
-                    
-                    found_messages = []
-                    for msg in no_slots_messages:
-                        if msg in page_content:
-                            found_messages.append(msg)
-                    
-                    if found_messages:
-                        logger.info(f"💬 No-slots messages found: {', '.join(found_messages)}")
-                        logger.info("✅ Confirmed: All appointments currently booked")
-                    else:
-                        logger.info("📄 No specific 'booked' message found")
-                        logger.info("💭 Redirect likely means no availability")
-                        
-                    # Check page title for additional context
-                    try:
-                        page_title = self.driver.title
-                        if 'service' in page_title.lower():
-                            logger.info(f"📄 Services page confirmed: {page_title}")
-                    except:
-                        pass
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️ Could not analyze services page: {str(e)}")
+                with self.metrics.timer('dom_analysis', into=timings):
+                    snapshot = capture_snapshot(self.driver, self.verdicts.fingerprints())
+                    result = self.verdicts.lookup(snapshot, target.booking_path, rules)
+                    if result is None and snapshot.text_omitted:
+                        # Known text but new element counts or URL - fetch the text after all
+                        snapshot = capture_snapshot(self.driver)
+                if result is None:
+                    with self.metrics.timer('classification', into=timings):
+                        result = classify_booking_page(snapshot, target.booking_path, rules)
+                    result.novel = self.verdicts.remember(snapshot, target.booking_path, result, rules)
+                    if result.novel:
+                        logger.info(f"🆕 New page variant for {target.label}: {result.outcome} "
+                                    f"({result.reason}) [{snapshot.fingerprint}]")
+                        self.metrics.inc('page_variants_total', outcome=result.outcome)
+                self.metrics.inc('verdict_cache_total', result='hit' if result.cached else 'miss')
+            except Exception as e:
+                logger.warning(f"⚠️ Error collecting page snapshot: {str(e)}")
+                # Fallback: check page content
+                logger.debug("🔄 Falling back to content-based detection...")
+                snapshot = PageSnapshot(url=self.driver.current_url, text=self.driver.page_source)
+                result = classify_page_content(snapshot, target.booking_path, rules)
+            
+            result.timings = timings
+            self.last_result = target.last_result = result
+            self.session.observe_outcome(result.outcome)
+            logger.debug("📍 Final URL: %s", snapshot.url)
+            logger.debug("⌛ Page load time: %.1fs", timings['navigation'] + timings['readiness_wait'])
+            logger.debug("📄 Page title: %s", snapshot.title)
+            
+            evidence = result.evidence
+            if result.outcome == SLOTS_AVAILABLE:
+                logger.info(f"🎉 SLOTS AVAILABLE! {result.reason.capitalize()}!")
+                if 'forms' in evidence:
+                    logger.debug("📊 Form analysis: forms=%s inputs=%s buttons=%s name fields=%s email fields=%s",
+                                 snapshot.forms, snapshot.inputs, snapshot.submit_buttons,
+                                 snapshot.name_fields, snapshot.email_fields)
+                else:
+                    logger.debug("📊 Found indicators: %s", evidence.get('content_indicators'))
                 
-                return False
+                return True
             
+            if result.outcome == NO_SLOTS and 'forms' in evidence:
+                logger.debug("❌ On booking page but no booking form detected")
+                logger.debug("📊 Analysis summary: forms=%s (need > 0) inputs=%s (need > 3) submit buttons=%s booking fields=%s",
+                             snapshot.forms, snapshot.inputs, snapshot.submit_buttons,
+                             snapshot.name_fields + snapshot.email_fields)
+                logger.debug("🔤 Booking keywords found: %s", evidence['keywords'] or 'None')
+            elif result.outcome == NO_SLOTS and 'no_slots_messages' in evidence:
+                logger.debug("❌ Redirected to services page - No slots available")
+                if evidence['no_slots_messages']:
+                    logger.debug("💬 No-slots messages found: %s", evidence['no_slots_messages'])
+                else:
+                    logger.debug("📄 No specific 'booked' message found - redirect likely means no availability")
+            elif result.outcome == NO_SLOTS:
+                logger.debug("❌ No booking form detected in page content")
+                logger.debug("📊 Only found: %s", evidence.get('content_indicators') or 'No booking indicators')
+            elif result.outcome == LOGIN_REQUIRED:
+                logger.warning(f"🔐 Login page shown instead of booking page: {snapshot.url}")
+            elif result.outcome == MAINTENANCE:
+                logger.warning(f"🚧 Site under maintenance: {', '.join(evidence['maintenance_messages'])}")
             else:
-                logger.warning(f"⚠️ Unexpected redirect to: {self.driver.current_url}")
-                logger.warning("🤔 This URL pattern was not expected")
-                return False
+                logger.warning(f"⚠️ Unexpected redirect to: {snapshot.url} - this URL pattern was not expected")
+            
+            return False
                 
         except Exception as e:
             logger.error(f"❌ Error checking slots: {str(e)}")
             return False
 
-    def send_alert(self, slots_available=True):
-        """Send email alert about slot availability."""
+    def capture_evidence(self):
+        """Grab (screenshot PNG, page HTML, URL) of the current page in memory - written out later."""
         try:
-            if not all([self.sender_email, self.sender_password, self.receiver_emails]):
+            return self.driver.get_screenshot_as_png(), self.driver.page_source, self.driver.current_url
+        except Exception as e:
+            logger.warning(f"⚠️ Could not capture page evidence: {str(e)}")
+            return None
+
+    def block_resources(self):
+        """Install the profile's URL blocking on the current monitoring tab, once per tab.
+
+        Network.setBlockedURLs only covers the tab it was sent to, so a
+        recycled or handed-over tab needs it again - checked before every
+        booking check and after every tab change.
+        """
+        try:
+            handle = self.driver.current_window_handle
+            if handle == self.blocking_tab:
+                return
+            first = self.blocking_tab is None
+            blocked = self.profile.apply_to_driver(self.driver)
+            self.blocking_tab = handle
+            if blocked and first:
+                logger.info(f"🚫 Blocking {blocked} resource pattern(s)")
+            elif blocked:
+                logger.debug("🚫 Resource blocking installed on the new monitoring tab")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not enable resource blocking: {str(e)}")
+
+    def hand_over_booking_tab(self):
+        """Leave the current tab on the booking page and keep checking in a new one."""
+        try:
+            self.driver.switch_to.new_window('tab')
+            self.block_resources()
+            logger.info("🗂️ Booking page kept open in the previous tab - monitoring continues in a new tab")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not open a new monitoring tab: {str(e)}")
+
+    def maintain_browser(self):
+        """Recycle the tab or restart Chrome when memory grows, then park the tab."""
+        try:
+            action = self.memory.evaluate(self.driver)
+            if action == RESTART_BROWSER and len(self.driver.window_handles) > 1:
+                # A booking tab is waiting for the user - don't close it under them
+                logger.warning("⚠️ Booking tab open - recycling the monitoring tab instead of restarting")
+                action = RECYCLE_TAB
+            if action == RESTART_BROWSER:
+                self.restart_browser()
+            elif action == RECYCLE_TAB:
+                self.memory.recycle_tab(self.driver)
+                self.block_resources()
+            self.memory.park(self.driver)
+        except Exception as e:
+            logger.warning(f"⚠️ Browser maintenance failed: {str(e)}")
+
+    def restart_browser(self):
+        """Start a fresh Chrome and carry the login cookies over."""
+        cookies = browser_cookies(self.driver, [self.services_url])
+        logger.info(f"🔄 Restarting browser (keeping {len(cookies)} cookie(s))...")
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        self.driver = None
+        if not self.setup_browser():
+            raise Exception("browser restart failed")
+        restore_cookies(self.driver, cookies)
+        self.memory.restarted()
+        logger.info("✅ Browser restarted with session cookies restored")
+
+    def send_alert(self, slots_available=True, target=None):
+        """Send email alert about slot availability for target."""
+        try:
+            if not self.notifier.configured:
                 logger.warning("⚠️ Email not configured - skipping notification")
                 return False
             
             logger.info("📧 Preparing email notification...")
             
             if slots_available:
-                subject = "🎉 VISA SLOTS AVAILABLE - Book Now!"
+                target = target or self.targets[0]
+                subject = f"🎉 SLOTS AVAILABLE: {target.label} - Book Now!"
                 body = f"""
                 <html>
                 <body>
-                    <h2 style="color: green;">🎉 VISA APPOINTMENT SLOTS AVAILABLE!</h2>
+                    <h2 style="color: green;">🎉 APPOINTMENT SLOTS AVAILABLE: {target.label}</h2>
                     
                     <p><strong>⏰ Detection Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S PST')}</p>
-                    <p><strong>🎯 Booking URL:</strong> <a href="{self.booking_url}">Click here to book immediately</a></p>
+                    <p><strong>📋 Service:</strong> {target.name}{f" - {target.consulate}" if target.consulate else ""}</p>
+                    <p><strong>🎯 Booking URL:</strong> <a href="{target.booking_url}">Click here to book immediately</a></p>
                     
                     <h3>🚨 URGENT ACTION REQUIRED:</h3>
                     <ol>
@@ -479,25 +664,12 @@ class BrowserVisaMonitor:
                 </html>
                 """
             
-            msg = MIMEMultipart()
-            msg['From'] = self.sender_email
-            msg['To'] = ', '.join(self.receiver_emails)  # Join all emails for display
-            msg['Subject'] = subject
-            
-            msg.attach(MIMEText(body, 'html'))
-            
-            logger.info(f"📤 Connecting to {self.smtp_server}:{self.smtp_port}...")
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            logger.info("🔐 Authenticating...")
-            server.login(self.sender_email, self.sender_password)
-            
-            text = msg.as_string()
-            # Send to all recipients
-            server.sendmail(self.sender_email, self.receiver_emails, text)
-            server.quit()
+            report = self.notifier.send(subject, body)
+            if not report.success:
+                logger.error(f"❌ Failed to send alert after {report.attempts} attempt(s): {report.error}")
+                return False
             
-            logger.info(f"✅ Alert sent successfully to {len(self.receiver_emails)} recipient(s): {', '.join(self.receiver_emails)}")
+            logger.info(f"✅ Alert sent successfully to {len(self.receiver_emails)} recipient(s) in {report.latency:.2f}s: {', '.join(self.receiver_emails)}")
             return True
             
         except Exception as e:
@@ -505,103 +677,29 @@ class BrowserVisaMonitor:
             return False
 
     def run_monitor(self):
-        """Run the continuous monitoring loop."""
+        """Run the continuous monitoring loop, rotating through all targets."""
         logger.info("🚀 Starting Browser-Based VISA Monitor")
-        logger.info(f"🎯 Target: VISA booking slots (ID: 4755)")
-        logger.info(f"⏰ Check interval: {self.check_interval} seconds ({self.check_interval//60} minutes)")
+        for target in self.targets:
+            logger.info(f"🎯 Target: {target.label} every {target.check_interval} seconds ({target.check_interval//60} minutes)")
         logger.info(f"📧 Notifications: {'Enabled' if self.sender_email else 'Disabled'}")
         if self.receiver_emails:
             logger.info(f"📧 Email: {self.sender_email} → {len(self.receiver_emails)} recipient(s): {', '.join(self.receiver_emails)}")
         else:
             logger.info(f"📧 Email: {self.sender_email} → No recipients configured")
         
-        consecutive_errors = 0
-        max_errors = 3
-        check_count = 0
-        
+        # Checks, alerts, screenshots and login checks run as separate tasks
         try:
-            while True:
-                check_count += 1
-                current_time = datetime.now().strftime('%H:%M:%S')
-                logger.info(f"🔍 Check #{check_count} at {current_time}")
-                
-                # Periodically verify we're still logged in
-                if consecutive_errors > 0:
-                    logger.info("🔄 Verifying login status due to previous errors...")
-                    if not self.ensure_logged_in():
-                        consecutive_errors += 1
-                        logger.error(f"❌ Login verification failed (error {consecutive_errors}/{max_errors})")
-                        if consecutive_errors >= max_errors:
-                            logger.error("❌ Too many login failures - sending alert")
-                            self.send_alert(slots_available=False)
-                            break
-                        logger.info(f"⏳ Waiting {self.check_interval} seconds before retry...")
-                        time.sleep(self.check_interval)
-                        continue
-                
-                # Check for slots
-                try:
-                    logger.info("🎯 Starting slot availability check...")
-                    slots_available = self.check_visa_slots()
-                    
-                    if slots_available:
-                        logger.info("🎉 SLOTS DETECTED! Sending alert...")
-                        alert_sent = self.send_alert(slots_available=True)
-                        
-                        if alert_sent:
-                            logger.info("✅ Alert sent successfully")
-                        else:
-                            logger.warning("⚠️ Alert sending failed")
-                        
-                        # Desktop notification
-                        try:
-                            logger.info("🖥️ Showing desktop notification...")
-                            subprocess.run([
-                                'osascript', '-e',
-                                'display notification "VISA slots available! Check browser window!" with title "🎉 VISA SLOTS FOUND!"'
-                            ])
-                            logger.info("✅ Desktop notification sent")
-                        except Exception as e:
-                            logger.warning(f"⚠️ Desktop notification failed: {str(e)}")
-                            print('\a' * 5)  # System beep fallback
-                        
-                        # Keep browser on booking page for user
-                        logger.info("🖥️ Browser is ready for booking - check the window!")
-                        
-                        # Wait longer after finding slots
-                        wait_time = self.check_interval * 3
-                        logger.info(f"⏳ Waiting {wait_time} seconds ({wait_time//60} minutes) after alert...")
-                        time.sleep(wait_time)
-                    else:
-                        logger.info("❌ No slots available at this time")
-                        consecutive_errors = 0  # Reset on successful check
-                        
-                except Exception as e:
-                    consecutive_errors += 1
-                    logger.error(f"❌ Slot check failed (error {consecutive_errors}/{max_errors}): {str(e)}")
-                    if consecutive_errors >= max_errors:
-                        logger.error("❌ Too many consecutive errors - sending alert")
-                        self.send_alert(slots_available=False)
-                        break
-                
-                # Wait before next check
-                next_check = datetime.now() + timedelta(seconds=self.check_interval)
-                logger.info(f"⏳ Next check #{check_count + 1} at {next_check.strftime('%H:%M:%S')} (in {self.check_interval} seconds)")
-                logger.info("=" * 60)
-                time.sleep(self.check_interval)
-                
+            asyncio.run(AsyncMonitorEngine(self).run())
         except KeyboardInterrupt:
             logger.info("🛑 Monitor stopped by user (Ctrl+C)")
-        except Exception as e:
-            logger.error(f"❌ Fatal error: {str(e)}")
-            self.send_alert(slots_available=False)
         finally:
             if self.driver:
                 logger.info("🔒 Keeping browser open for manual use")
                 # Don't close the driver - keep it open for user
 
-def main():
-    """Main function."""
+def main(debug=None):
+    """Main function. Returns the exit status: 1 when the browser or login isn't there."""
+    configure_logging(debug)
     print("🎯 VISA Slot Monitor - Browser Session")
     print("=" * 50)
     print()
@@ -611,7 +709,7 @@ def main():
     # Setup browser
     if not monitor.setup_browser():
         print("❌ Failed to setup browser")
-        return
+        return 1
     
     print("🌐 Browser connected!")
     print()
@@ -619,18 +717,23 @@ def main():
     # Ensure user is logged in
     if not monitor.ensure_logged_in():
         print("❌ Login required - please login and try again")
-        return
+        return 1
     
     print("✅ Login confirmed!")
     print()
     print("🎯 Starting continuous monitoring...")
-    print("📋 Peak times: 3 PM, 10-11 PM, 7-9 AM Pacific")
+    peak_hours = monitor.history.peak_hours() if monitor.history else []
+    if peak_hours:
+        print(f"📋 Slots seen most often at: {', '.join(f'{hour:02d}:00' for hour in peak_hours)} (from check history)")
+    else:
+        print("📋 Peak times: 3 PM, 10-11 PM, 7-9 AM Pacific")
     print("🔄 Also monitoring for cancelled slots (available anytime)")
     print("🖥️ Keep this terminal and browser window open")
     print()
     
     # Start monitoring
     monitor.run_monitor()
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
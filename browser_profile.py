@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Browser Profile - Lean Chrome for Unattended Checks
+
+The standard profile is a full visible Chrome that downloads every image,
+font and analytics script on each booking-page navigation. The lean profile
+turns images off, blocks fonts, media and trackers through CDP
+Network.setBlockedURLs and can run headless. The page structure and text the
+classifier needs are unchanged.
+
+Stylesheets are kept by default: innerText depends on CSS visibility, so
+blocking them can surface hidden text. Set LEAN_BLOCK_CSS=true to drop them
+anyway.
+"""
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ('standard', 'lean')
+
+BLOCKED_URL_PATTERNS = [
+    # Images and media
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp',
+    '*.mp4', '*.webm', '*.mp3',
+    # Fonts
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    # Analytics and ads
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*hotjar.com*', '*facebook.net*', '*clarity.ms*',
+]
+CSS_URL_PATTERNS = ['*.css']
+
+
+class BrowserProfile:
+    """Chrome options and CDP setup for one profile."""
+
+    def __init__(self, name='standard', headless=False, block_css=False, extra_patterns=None):
+        self.name = name if name in PROFILES else 'standard'
+        self.headless = headless
+        self.block_css = block_css
+        self.extra_patterns = extra_patterns or []
+
+    @classmethod
+    def from_env(cls):
+        name = os.getenv('BROWSER_PROFILE', 'standard').lower()
+        if name not in PROFILES:
+            logger.warning(f"⚠️ Unknown BROWSER_PROFILE '{name}' - using 'standard'")
+        extra = [pattern.strip() for pattern in os.getenv('BLOCK_URL_PATTERNS', '').split(',') if pattern.strip()]
+        return cls(
+            name,
+            headless=os.getenv('HEADLESS', 'false').lower() in ('1', 'true', 'yes'),
+            block_css=os.getenv('LEAN_BLOCK_CSS', 'false').lower() in ('1', 'true', 'yes'),
+            extra_patterns=extra
+        )
+
+    @property
+    def lean(self):
+        return self.name == 'lean'
+
+    def blocked_patterns(self):
+        if not self.lean:
+            return list(self.extra_patterns)
+        patterns = BLOCKED_URL_PATTERNS + self.extra_patterns
+        if self.block_css:
+            patterns += CSS_URL_PATTERNS
+        return patterns
+
+    def window_size(self):
+        return (1000, 700) if self.headless else (1200, 800)
+
+    def apply_options(self, chrome_options):
+        """Add profile-specific Chrome switches and prefs."""
+        if self.headless:
+            chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--window-size=%d,%d" % self.window_size())
+        if not self.lean:
+            return
+
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-component-update")
+        chrome_options.add_argument("--disable-default-apps")
+        chrome_options.add_argument("--disable-sync")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument("--renderer-process-limit=2")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+
+    def apply_to_driver(self, driver):
+        """Install URL blocking over CDP; returns the number of patterns."""
+        patterns = self.blocked_patterns()
+        if not patterns:
+            return 0
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        return len(patterns)
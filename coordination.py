@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Coordination - Several Monitor Nodes, One Set of Checks and Alerts
+
+Optional layer for running the monitor on more than one host (or more than
+once on one host) for redundancy without multiplying the traffic or the
+emails. Every node talks to the same backend (COORDINATION_URL):
+
+- sqlite:coordination.db   - a shared SQLite file, for nodes on one box
+- http://host:8765         - the small key-value service in this module
+                             (`python3 coordination.py serve`), for
+                             several hosts; it keeps its state in SQLite
+
+Two primitives cover everything:
+
+- claim(name, node, ttl)   - take or renew `name` for `node` unless another
+                             node holds an unexpired claim; returns the holder
+  * per-target leases ("lease:<target>", the service ID plus its
+    consulate, if any): only the holder checks the target, the others
+    stand by and take over once the lease runs out
+  * alert de-duplication ("alert:<target>:<page fingerprint>"): only the
+    first node to claim an opening sends the alert for it; the claim is
+    released once that node sees the target closed again, so the next
+    opening is alerted afresh
+- reserve(name, rate, burst) - cluster-wide token bucket; returns the
+                             seconds to wait before the next check
+
+Timestamps are taken where the state lives (the SQLite file's host or the
+coordination service), so node clocks don't need to agree.
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    stamp REAL NOT NULL
+);
+"""
+
+
+class CoordinationError(Exception):
+    """The coordination backend could not be reached or answered with an error."""
+
+
+class SQLiteCoordinator:
+    """Claims and token buckets in a SQLite file shared by every node on the box."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # Autocommit mode: every operation runs in its own BEGIN IMMEDIATE transaction
+        self.connection = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def _transaction(self, operation):
+        with self.lock:
+            try:
+                self.connection.execute("BEGIN IMMEDIATE")
+                result = operation(self.connection, time.time())
+                self.connection.execute("COMMIT")
+                return result
+            except sqlite3.Error as e:
+                if self.connection.in_transaction:
+                    self.connection.execute("ROLLBACK")
+                raise CoordinationError(str(e)) from e
+
+    def claim(self, name, node, ttl):
+        """Take or renew name for node for ttl seconds; returns the node holding it afterwards."""
+        def operation(connection, now):
+            row = connection.execute("SELECT holder, expires FROM claims WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != node and row[1] > now:
+                return row[0]
+            connection.execute(
+                "INSERT INTO claims (name, holder, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires = excluded.expires",
+                (name, node, now + ttl)
+            )
+            return node
+        return self._transaction(operation)
+
+    def release(self, name, node):
+        """Give up name if node holds it."""
+        return self._transaction(lambda connection, now: connection.execute(
+            "DELETE FROM claims WHERE name = ? AND holder = ?", (name, node)
+        ).rowcount > 0)
+
+    def reserve(self, name, rate, burst=1.0):
+        """Take one token from the bucket (rate tokens/s, up to burst banked); returns seconds to wait."""
+        burst = max(1.0, burst)
+
+        def operation(connection, now):
+            row = connection.execute("SELECT tokens, stamp FROM buckets WHERE name = ?", (name,)).fetchone()
+            tokens, stamp = row if row else (burst, now)
+            tokens = min(burst, tokens + (now - stamp) * rate) - 1
+            connection.execute(
+                "INSERT INTO buckets (name, tokens, stamp) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET tokens = excluded.tokens, stamp = excluded.stamp",
+                (name, tokens, now)
+            )
+            return max(0.0, -tokens / rate)
+        return self._transaction(operation)
+
+    def claims(self):
+        """[(name, holder, seconds left)] for every unexpired claim."""
+        now = time.time()
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name, holder, expires FROM claims WHERE expires > ? ORDER BY name", (now,)
+            ).fetchall()
+        return [(name, holder, expires - now) for name, holder, expires in rows]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class HttpCoordinator:
+    """Client for the coordination service started with `coordination.py serve`."""
+
+    def __init__(self, url, token=None, timeout=5.0):
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def _call(self, operation, **params):
+        import urllib.request
+        import urllib.error
+
+        request = urllib.request.Request(
+            f"{self.url}/{operation}",
+            data=json.dumps(params).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        if self.token:
+            request.add_header('Authorization', f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))['result']
+        except (OSError, ValueError, KeyError) as e:
+            raise CoordinationError(f"{operation} failed: {e}") from e
+
+    def claim(self, name, node, ttl):
+        return self._call('claim', name=name, node=node, ttl=ttl)
+
+    def release(self, name, node):
+        return self._call('release', name=name, node=node)
+
+    def reserve(self, name, rate, burst=1.0):
+        return self._call('reserve', name=name, rate=rate, burst=burst)
+
+    def claims(self):
+        return self._call('claims')
+
+    def close(self):
+        pass
+
+
+def coordinator_from_env():
+    """Backend named by COORDINATION_URL, or None when coordination is off."""
+    url = os.getenv('COORDINATION_URL', '').strip()
+    if not url:
+        return None
+    if url.startswith(('http://', 'https://')):
+        return HttpCoordinator(url, token=os.getenv('COORDINATION_TOKEN') or None,
+                               timeout=float(os.getenv('COORDINATION_TIMEOUT', 5)))
+    if url.startswith('sqlite:'):
+        path = url[len('sqlite:'):]
+        return SQLiteCoordinator(path[2:] if path.startswith('//') else path)  # sqlite:///abs/path too
+    raise ValueError(f"COORDINATION_URL must start with sqlite: or http(s):// (got {url!r})")
+
+
+def serve(backend, host='127.0.0.1', port=DEFAULT_PORT, token=None):
+    """Serve backend's operations as JSON over HTTP until interrupted."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    operations = {
+        'claim': backend.claim,
+        'release': backend.release,
+        'reserve': backend.reserve,
+        'claims': backend.claims,
+    }
+
+    class CoordinationHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if token and self.headers.get('Authorization') != f"Bearer {token}":
+                self._reply(403, {'error': 'forbidden'})
+                return
+            operation = operations.get(self.path.strip('/'))
+            if operation is None:
+                self._reply(404, {'error': 'unknown operation'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                params = json.loads(self.rfile.read(length) or b'{}')
+                self._reply(200, {'result': operation(**params)})
+            except (TypeError, ValueError, CoordinationError) as e:
+                self._reply(400, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass  # One request per check per node would flood the log
+
+    server = ThreadingHTTPServer((host, port), CoordinationHandler)
+    server.daemon_threads = True
+    print(f"🤝 Coordination service on http://{host}:{port} ({'token required' if token else 'no token'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coordination service for several monitor nodes")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subcommands.add_parser('serve', help="run the key-value service the nodes share")
+    serve_parser.add_argument('--db', default='coordination.db', help="SQLite file holding the state")
+    serve_parser.add_argument('--host', default='127.0.0.1', help="address to listen on (0.0.0.0 for other hosts)")
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    status_parser = subcommands.add_parser('status', help="show which node holds which lease")
+    status_parser.add_argument('--url', default=os.getenv('COORDINATION_URL'), help="default: COORDINATION_URL")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(SQLiteCoordinator(args.db), args.host, args.port, os.getenv('COORDINATION_TOKEN') or None)
+        return 0
+
+    if not args.url:
+        print("❌ No coordination backend - set COORDINATION_URL or pass --url")
+        return 1
+    os.environ['COORDINATION_URL'] = args.url
+    claims = coordinator_from_env().claims()
+    for name, holder, remaining in claims:
+        print(f"   • {name}: {holder} ({remaining:.0f}s left)")
+    if not claims:
+        print("   • No active leases or alert claims")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Detection Rules - Page Wording in a File, Compiled Into One Matcher
+
+The phrases the classifier looks for live in detection_rules.json (or the
+file named by DETECTION_RULES), grouped by what they point to:
+
+- booking                   - booking page wording (evidence)
+- form                      - booking form labels, for the content-only fallback
+- no_slots                  - "fully booked" notices on the services page (evidence)
+- maintenance               - maintenance notices
+- logged_in / not_logged_in - login heuristics (not_logged_in is also
+                              looked for in the URL)
+
+Every group lists its phrases per language ("*" = any language). A phrase
+is a string, {"text": ..., "weight": ...} or {"regex": ..., "weight": ...};
+a group counts as present once the weights of the distinct phrases found
+reach its "threshold" (default 1). Per-consulate variants go under
+"consulates" and add to (or re-weight) the shared rules for targets at that
+consulate:
+
+    "consulates": {"Los Angeles": {"no_slots": {"en": ["no appointments left"]}}}
+
+DETECTION_LANGUAGES (e.g. "it,en") limits which languages are compiled.
+
+A rule set is compiled once: the literal phrases into a single regular
+expression - a prefix trie, so phrases sharing a start are tried together -
+that scans a page in one pass whatever the number of phrases, and each
+"regex" rule into its own pattern, searched separately so it is found even
+where a phrase matches at the same spot. Neither may match digits, which
+page fingerprints ignore. New wording is a file edit, not a code change.
+"""
+
+import os
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_RULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'detection_rules.json')
+GROUPS = ('booking', 'form', 'no_slots', 'maintenance', 'logged_in', 'not_logged_in')
+ANY_LANGUAGE = '*'
+
+# Page fingerprints ignore digits (see VOLATILE_PATTERN), so a phrase or
+# pattern matching digits could tell apart two pages that share one cached
+# verdict. In patterns, {m,n} repeat counts are the only digits allowed.
+DIGIT = re.compile(r'\d')
+REGEX_DIGIT = re.compile(r'\\d|\d')
+REGEX_REPEAT = re.compile(r'\{\d+(?:,\d*)?\}')
+
+
+class Rule:
+    """One phrase (or pattern) of a group and its weight."""
+
+    def __init__(self, group, label, weight=1.0, regex=None):
+        self.group = group
+        self.label = label
+        self.weight = weight
+        self.regex = regex
+
+
+class RuleMatches:
+    """What one scan found: per group, the distinct phrases (in page order) and their weights."""
+
+    def __init__(self, rule_set, found=None):
+        self.rule_set = rule_set
+        self.found = found if found is not None else {}  # group -> {label: weight}
+
+    def add(self, rule):
+        self.found.setdefault(rule.group, {}).setdefault(rule.label, rule.weight)
+
+    def phrases(self, group):
+        return list(self.found.get(group, ()))
+
+    def score(self, group):
+        return sum(self.found.get(group, {}).values())
+
+    def present(self, group):
+        return self.score(group) >= self.rule_set.thresholds.get(group, 1.0)
+
+    def scores(self):
+        """{group: summed weight} for every group with a match - the weighted evidence."""
+        return {group: round(sum(labels.values()), 3) for group, labels in self.found.items()}
+
+    def union(self, other):
+        """Matches of self and other together (e.g. page text and URL)."""
+        found = {group: dict(labels) for group, labels in self.found.items()}
+        for group, labels in other.found.items():
+            for label, weight in labels.items():
+                found.setdefault(group, {}).setdefault(label, weight)
+        return RuleMatches(self.rule_set, found)
+
+
+def _trie_pattern(node):
+    """Regex for a trie of literal phrases; a phrase's end is marked by an empty named group."""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if '' in node:
+        branches.append(f"(?P<{node['']}>)")  # Last, so the longest phrase wins
+    return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+
+class RuleSet:
+    """Literal phrases compiled into one trie pattern (a single pass over the text), plus any patterns."""
+
+    def __init__(self, rules, thresholds=None, name='default'):
+        # A phrase listed again (e.g. by a consulate variant) takes the later weight
+        self.rules = list({(rule.group, rule.label): rule for rule in rules}.values())
+        rules = self.rules
+        self.thresholds = dict(thresholds or {})
+        self.name = name
+        self.by_marker = {}  # group name in the trie pattern -> rules found when it matches
+
+        literals = {}
+        for rule in rules:
+            if rule.regex is None:
+                literals.setdefault(rule.label, []).append(rule)
+        trie = {}
+        for index, text in enumerate(literals):
+            marker = f"l{index}"
+            node = trie
+            for char in text:
+                node = node.setdefault(char, {})
+            node[''] = marker
+            # The trie reports the longest phrase at a position; shorter ones ending inside it are there too
+            self.by_marker[marker] = [rule for other in literals if text.startswith(other) for rule in literals[other]]
+
+        self.pattern = re.compile(_trie_pattern(trie)) if trie else None
+        # Patterns get a search each, so one starting where a phrase (or another pattern) does is still seen
+        self.patterns = [(re.compile(rule.regex), rule) for rule in rules if rule.regex is not None]
+
+    def scan(self, text):
+        """RuleMatches for already-lowercased text.
+
+        Searching again from one character after each match start catches
+        phrases that overlap or sit inside another one ('book' in 'fully
+        booked'). Patterns are searched for separately, so they are found
+        wherever phrases match too.
+        """
+        found = []  # (position, rules) - sorted so phrases are listed in page order
+        if self.pattern is not None:
+            search = self.pattern.search
+            position = 0
+            while True:
+                match = search(text, position)
+                if match is None:
+                    break
+                found.append((match.start(), self.by_marker[match.lastgroup]))
+                position = match.start() + 1
+        for pattern, rule in self.patterns:
+            match = pattern.search(text)
+            if match is not None:
+                found.append((match.start(), [rule]))
+        matches = RuleMatches(self)
+        for _, rules in sorted(found, key=lambda item: item[0]):
+            for rule in rules:
+                matches.add(rule)
+        return matches
+
+    def __repr__(self):
+        return f"RuleSet({self.name!r}, {len(self.rules)} rules)"
+
+
+def _parse_groups(groups, languages, source):
+    """[Rule] and {group: threshold} from a "groups" mapping of the rules file."""
+    rules = []
+    thresholds = {}
+    for group, spec in groups.items():
+        if group not in GROUPS:
+            raise ValueError(f"{source}: unknown group {group!r} (expected one of {', '.join(GROUPS)})")
+        if 'threshold' in spec:
+            thresholds[group] = float(spec['threshold'])
+            if thresholds[group] <= 0:
+                raise ValueError(f"{source}: threshold of {group!r} must be positive")
+        for language, phrases in spec.get('phrases', {}).items():
+            if languages and language != ANY_LANGUAGE and language not in languages:
+                continue
+            for phrase in phrases:
+                if isinstance(phrase, str):
+                    phrase = {'text': phrase}
+                weight = float(phrase.get('weight', 1.0))
+                if 'regex' in phrase:
+                    regex = phrase['regex']
+                    try:
+                        if re.compile(regex).match(''):
+                            raise ValueError("matches the empty string")
+                        if REGEX_DIGIT.search(REGEX_REPEAT.sub('', regex)):
+                            raise ValueError("matches digits, which page fingerprints ignore")
+                    except (re.error, ValueError) as e:
+                        raise ValueError(f"{source}: bad regex {regex!r} in {group!r}: {e}") from e
+                    rules.append(Rule(group, regex, weight, regex))
+                    continue
+                text = phrase['text'].strip().lower()
+                if not text or DIGIT.search(text):
+                    raise ValueError(f"{source}: phrase {phrase['text']!r} in {group!r} must be non-empty and digit-free")
+                rules.append(Rule(group, text, weight))
+    return rules, thresholds
+
+
+class DetectionRules:
+    """The rules file: shared rules plus per-consulate variants, each compiled on first use."""
+
+    def __init__(self, data, languages=None, source='rules'):
+        self.languages = {language.strip().lower() for language in languages or () if language.strip()}
+        self.source = source
+        self.rules, self.thresholds = _parse_groups(data.get('groups', {}), self.languages, source)
+        self.variants = {}
+        for consulate, groups in data.get('consulates', {}).items():
+            groups = {group: spec if 'phrases' in spec or 'threshold' in spec else {'phrases': spec}
+                      for group, spec in groups.items()}
+            self.variants[consulate.strip().lower()] = _parse_groups(groups, self.languages, f"{source} [{consulate}]")
+        self.compiled = {'': RuleSet(self.rules, self.thresholds)}
+
+    @classmethod
+    def from_file(cls, path, languages=None):
+        """Load a rules file; raises OSError or ValueError when it is missing or malformed."""
+        with open(path, encoding='utf-8') as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}") from e
+        try:
+            return cls(data, languages, os.path.basename(path))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"{path}: malformed rule ({e!r})") from e
+
+    @classmethod
+    def from_env(cls):
+        """DETECTION_RULES, or the bundled rules if it is unset or can't be loaded."""
+        languages = os.getenv('DETECTION_LANGUAGES', '').split(',')
+        path = os.getenv('DETECTION_RULES')
+        if path:
+            try:
+                return cls.from_file(path, languages)
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ Invalid detection rules: {str(e)} - using the bundled rules")
+        return cls.from_file(BUNDLED_RULES, languages)
+
+    @property
+    def base(self):
+        return self.compiled['']
+
+    def for_consulate(self, consulate=''):
+        """RuleSet for targets at consulate - the shared rules plus its variant, if it has one."""
+        key = (consulate or '').strip().lower()
+        if key not in self.variants:
+            return self.base
+        if key not in self.compiled:
+            rules, thresholds = self.variants[key]
+            self.compiled[key] = RuleSet(self.rules + rules, {**self.thresholds, **thresholds}, consulate)
+        return self.compiled[key]
+
+
+_default_rules = None
+
+
+def default_rules():
+    """The rules from the environment, loaded once per process."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = DetectionRules.from_env()
+    return _default_rules
+
+
+def rules_for(consulate=''):
+    return default_rules().for_consulate(consulate)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+ChromeDriver Cache - Fast Driver Resolution at Startup
+
+Remembers which chromedriver worked, its version and the installed Chrome
+version in a small state file. On a normal start the check is a handful of
+stat() calls: if Chrome hasn't changed and the cached driver is still there,
+it is used straight away. Candidate probing and the webdriver-manager
+download only run when the major versions actually mismatch, and the
+~/.wdm cache is only wiped when a downloaded driver turns out to be
+unusable.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+import plistlib
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.driver_state.json')
+
+CHROME_BINARIES = [
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    "/opt/google/chrome/chrome",
+    "/usr/bin/google-chrome",
+    "/usr/bin/google-chrome-stable",
+    "/usr/bin/chromium",
+    "/usr/bin/chromium-browser",
+    "/snap/bin/chromium",
+]
+DRIVER_CANDIDATES = [
+    "/opt/homebrew/bin/chromedriver",
+    "/usr/local/bin/chromedriver",
+    "/usr/bin/chromedriver",
+    "/usr/lib/chromium/chromedriver",
+    "/usr/lib/chromium-browser/chromedriver",
+]
+
+VERSION_PATTERN = re.compile(r'(\d+)\.(\d+)\.(\d+)\.(\d+)')
+
+
+def major(version):
+    return version.split('.')[0] if version else None
+
+
+def _file_signature(path):
+    """(mtime, size) - changes whenever the binary is replaced or updated."""
+    stat = os.stat(path)
+    return [int(stat.st_mtime), stat.st_size]
+
+
+def _run_version(path):
+    """Ask a binary for its version string."""
+    try:
+        output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = VERSION_PATTERN.search(output)
+    return match.group(0) if match else None
+
+
+def find_chrome():
+    """Path of the installed Chrome/Chromium binary, if any."""
+    for path in CHROME_BINARIES:
+        if os.path.exists(path):
+            return path
+    for name in ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser'):
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def chrome_version(path):
+    """Chrome version without launching it on macOS, via --version elsewhere."""
+    if sys.platform == 'darwin' and '.app/' in path:
+        plist_path = path.split('.app/')[0] + '.app/Contents/Info.plist'
+        try:
+            with open(plist_path, 'rb') as f:
+                return plistlib.load(f).get('CFBundleShortVersionString')
+        except (OSError, plistlib.InvalidFileException):
+            pass
+    return _run_version(path)
+
+
+class DriverResolver:
+    """Resolves a chromedriver matching the installed Chrome, with a state file."""
+
+    def __init__(self, state_file=DEFAULT_STATE_FILE):
+        self.state_file = state_file
+        self.state = self._load()
+        self.last_resolution = None  # 'cached', 'candidate' or 'download'
+        self.chrome_changed = False
+
+    def _load(self):
+        try:
+            with open(self.state_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        try:
+            tmp_path = self.state_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not save driver state: {e}")
+
+    def invalidate(self):
+        """Forget the cached driver (e.g. after it failed to launch)."""
+        self.state.pop('driver_path', None)
+        self.state.pop('driver_version', None)
+        self.state.pop('driver_signature', None)
+        self._save()
+
+    def current_chrome(self):
+        """(path, version) of Chrome, reusing the cached version when the binary is unchanged."""
+        path = self.state.get('chrome_path')
+        if not path or not os.path.exists(path):
+            path = find_chrome()
+        if not path:
+            return None, None
+        signature = _file_signature(path)
+        if path == self.state.get('chrome_path') and signature == self.state.get('chrome_signature'):
+            return path, self.state.get('chrome_version')
+
+        version = chrome_version(path)
+        self.state.update({'chrome_path': path, 'chrome_version': version, 'chrome_signature': signature})
+        self.chrome_changed = True
+        return path, version
+
+    def _cached_driver(self, chrome_major):
+        path = self.state.get('driver_path')
+        if not path or not os.path.exists(path) or not os.access(path, os.X_OK):
+            return None
+        if _file_signature(path) != self.state.get('driver_signature'):
+            return None
+        if chrome_major and major(self.state.get('driver_version')) != chrome_major:
+            return None
+        return path
+
+    def _remember(self, path, version):
+        self.state.update({
+            'driver_path': path,
+            'driver_version': version,
+            'driver_signature': _file_signature(path),
+            'resolved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        self._save()
+
+    def _candidates(self):
+        seen = set()
+        on_path = shutil.which('chromedriver')
+        for path in DRIVER_CANDIDATES + ([on_path] if on_path else []):
+            real = os.path.realpath(path)
+            if real not in seen and os.path.exists(path) and os.access(path, os.X_OK):
+                seen.add(real)
+                yield path
+
+    def _download(self):
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        logger.info("🔄 Downloading matching ChromeDriver...")
+        path = ChromeDriverManager().install()
+        if not (os.path.exists(path) and os.access(path, os.X_OK) and _run_version(path)):
+            # Corrupt cache entry (the old "Exec format error") - wipe and retry once
+            logger.warning(f"⚠️ Downloaded driver is unusable: {path} - clearing ~/.wdm and retrying")
+            shutil.rmtree(os.path.expanduser("~/.wdm"), ignore_errors=True)
+            path = ChromeDriverManager().install()
+        return path
+
+    def resolve(self, allow_download=True):
+        """Return a chromedriver path for the installed Chrome, or None."""
+        start = time.monotonic()
+        chrome_path, version = self.current_chrome()
+        chrome_major = major(version)
+
+        path = self._cached_driver(chrome_major)
+        if path:
+            self.last_resolution = 'cached'
+            if self.chrome_changed:
+                self._save()
+            logger.info(f"⚡ Cached ChromeDriver {self.state.get('driver_version')} for Chrome {version} ({1000 * (time.monotonic() - start):.0f} ms)")
+            return path
+
+        logger.info(f"🔍 Resolving ChromeDriver for Chrome {version or 'unknown'}...")
+        for candidate in self._candidates():
+            driver_version = _run_version(candidate)
+            if driver_version and (not chrome_major or major(driver_version) == chrome_major):
+                self.last_resolution = 'candidate'
+                self._remember(candidate, driver_version)
+                logger.info(f"✅ Using ChromeDriver {driver_version} at {candidate}")
+                return candidate
+            logger.info(f"ℹ️ Skipping {candidate} (version {driver_version or 'unknown'})")
+
+        if not allow_download:
+            return None
+        try:
+            path = self._download()
+        except Exception as e:
+            logger.error(f"❌ ChromeDriver download failed: {e}")
+            return None
+        self.last_resolution = 'download'
+        self._remember(path, _run_version(path))
+        logger.info(f"✅ Using downloaded ChromeDriver at {path}")
+        return path
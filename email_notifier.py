@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Email Notifier - Warm SMTP Connection with Retry and Failover
+
+Keeps an authenticated SMTP connection open between alerts so a slot alert
+doesn't pay for connect + STARTTLS + login. The connection is health-checked
+with NOOP and re-established ahead of time by keep_warm(). Every alert goes
+to all receivers in one SMTP transaction, is retried with backoff, and fails
+over to a secondary server when the primary keeps failing or times out.
+
+A send finishes within the email channel's deadline (NOTIFY_TIMEOUT_EMAIL):
+each server gets an equal share of what is left of it, and socket timeouts
+and backoff are cut to fit that share, so the fallback server is still
+tried before the channel gives up.
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from collections import deque
+
+from notifications import DEFAULT_CHANNEL_TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+# Seconds the send keeps in hand so it reports back before the channel is cancelled
+DEADLINE_MARGIN = 1.0
+
+
+class SMTPServerConfig:
+    """Where and how to log in to one SMTP server."""
+
+    def __init__(self, host, port, username, password, timeout=20):
+        self.host = host
+        self.port = int(port)
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+
+class DeliveryReport:
+    """What happened to one alert."""
+
+    def __init__(self, success, server=None, attempts=0, latency=0.0, refused=None, error=None):
+        self.success = success
+        self.server = server
+        self.attempts = attempts
+        self.latency = latency
+        self.refused = refused or {}
+        self.error = error
+
+    def __repr__(self):
+        return f"DeliveryReport(success={self.success}, server={self.server!r}, attempts={self.attempts}, latency={self.latency:.2f}s)"
+
+
+def build_message(sender, receivers, subject, html_body):
+    """Build the HTML alert email."""
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = ', '.join(receivers)  # Join all emails for display
+    msg['Subject'] = subject
+    msg.attach(MIMEText(html_body, 'html'))
+    return msg.as_string()
+
+
+class SMTPNotifier:
+    """Sends alert emails over a reused, health-checked SMTP connection."""
+
+    def __init__(self, sender, receivers, servers, retries=3, backoff=1.0, max_connection_age=600, deadline=None):
+        self.sender = sender
+        self.receivers = receivers
+        self.servers = servers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connection_age = max_connection_age
+        self.deadline = deadline  # Seconds one send may take in all (None = no limit)
+
+        self.connection = None
+        self.server = None
+        self.connected_at = 0.0
+        self.lock = threading.Lock()
+        self.reports = deque(maxlen=100)
+
+    @classmethod
+    def from_env(cls):
+        """Build a notifier from the SENDER_/RECEIVER_/SMTP_ settings in .env."""
+        sender = os.getenv('SENDER_EMAIL')
+        password = os.getenv('SENDER_PASSWORD')
+        receiver_email_str = os.getenv('RECEIVER_EMAIL', '')
+        # Parse comma-separated email addresses
+        receivers = [email.strip() for email in receiver_email_str.split(',') if email.strip()]
+
+        servers = [SMTPServerConfig(
+            os.getenv('SMTP_SERVER', 'smtp.gmail.com'), os.getenv('SMTP_PORT', 587), sender, password
+        )]
+        fallback_host = os.getenv('SMTP_FALLBACK_SERVER')
+        if fallback_host:
+            servers.append(SMTPServerConfig(
+                fallback_host,
+                os.getenv('SMTP_FALLBACK_PORT', 587),
+                os.getenv('SMTP_FALLBACK_USER', sender),
+                os.getenv('SMTP_FALLBACK_PASSWORD', password)
+            ))
+        return cls(
+            sender, receivers, servers,
+            retries=int(os.getenv('SMTP_RETRIES', 3)),
+            backoff=float(os.getenv('SMTP_RETRY_BACKOFF', 1.0)),
+            deadline=float(os.getenv('NOTIFY_TIMEOUT_EMAIL', DEFAULT_CHANNEL_TIMEOUTS['email'])) - DEADLINE_MARGIN
+        )
+
+    @property
+    def configured(self):
+        return bool(self.sender and self.servers[0].password and self.receivers)
+
+    def _open(self, server, timeout=None):
+        """Connect, secure and authenticate - the part worth keeping warm."""
+        import smtplib
+
+        timeout = timeout or server.timeout
+        if server.port == 465:
+            connection = smtplib.SMTP_SSL(server.host, server.port, timeout=timeout)
+        else:
+            connection = smtplib.SMTP(server.host, server.port, timeout=timeout)
+            connection.starttls()
+        connection.login(server.username, server.password)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            try:
+                self.connection.quit()
+            except Exception:
+                pass
+        self.connection = None
+        self.server = None
+
+    def _healthy(self):
+        """True when the open connection is young enough and answers NOOP."""
+        if self.connection is None:
+            return False
+        if time.monotonic() - self.connected_at > self.max_connection_age:
+            return False
+        try:
+            return self.connection.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _ensure_connection(self, server, timeout=None):
+        """Reuse or (re)open the connection to server; socket operations time out after timeout."""
+        if self.server is server and self._healthy():
+            if self.connection.sock is not None:
+                self.connection.sock.settimeout(timeout or server.timeout)
+            return
+        self._close()
+        start = time.monotonic()
+        self.connection = self._open(server, timeout)
+        self.server = server
+        self.connected_at = time.monotonic()
+        logger.info(f"🔐 SMTP connection ready to {server.address} ({time.monotonic() - start:.2f}s)")
+
+    def keep_warm(self):
+        """Health-check the connection and re-establish it before it is needed."""
+        if not self.configured:
+            return False
+        with self.lock:
+            try:
+                self._ensure_connection(self.server or self.servers[0])
+                return True
+            except Exception as e:
+                logger.warning(f"⚠️ Could not warm SMTP connection: {str(e)}")
+                self._close()
+                return False
+
+    def send(self, subject, html_body, deadline=None):
+        """Send one alert to every receiver within deadline seconds (default: self.deadline).
+
+        Returns a DeliveryReport.
+        """
+        start = time.monotonic()
+        deadline = self.deadline if deadline is None else deadline
+        end = start + deadline if deadline else None
+        text = build_message(self.sender, self.receivers, subject, html_body)
+        attempts = 0
+        last_error = None
+
+        # keep_warm() may be reconnecting - wait for it no longer than the deadline allows
+        if not self.lock.acquire(timeout=max(0.0, end - start) if end else -1):
+            report = DeliveryReport(False, None, 0, time.monotonic() - start, error="SMTP connection busy")
+            self.reports.append(report)
+            return report
+        try:
+            for index, server in enumerate(self.servers):
+                # Leave every later server an equal share of what is left
+                server_end = None
+                if end is not None:
+                    server_end = time.monotonic() + (end - time.monotonic()) / (len(self.servers) - index)
+                for attempt in range(self.retries):
+                    timeout = server.timeout
+                    if server_end is not None:
+                        timeout = min(timeout, server_end - time.monotonic())
+                        if timeout <= 0:
+                            break
+                    attempts += 1
+                    try:
+                        self._ensure_connection(server, timeout)
+                        # Single transaction: one MAIL FROM, one RCPT TO per receiver
+                        refused = self.connection.sendmail(self.sender, self.receivers, text)
+                        report = DeliveryReport(True, server.address, attempts, time.monotonic() - start, refused)
+                        self.reports.append(report)
+                        if refused:
+                            logger.warning(f"⚠️ Recipients refused: {', '.join(refused)}")
+                        logger.info(f"📨 Delivered via {server.address} in {report.latency:.2f}s (attempt {attempts})")
+                        return report
+                    except Exception as e:
+                        last_error = str(e) or type(e).__name__
+                        logger.warning(f"⚠️ SMTP send via {server.address} failed (attempt {attempt + 1}/{self.retries}): {last_error}")
+                        self._close()
+                        if isinstance(e, socket.timeout) and server is not self.servers[-1]:
+                            break  # An unresponsive server won't answer a retry either - fail over now
+                        delay = self.backoff * (2 ** attempt)
+                        if attempt + 1 >= self.retries or (server_end is not None and time.monotonic() + delay >= server_end):
+                            break
+                        time.sleep(delay)
+                if server is not self.servers[-1]:
+                    logger.warning(f"🔀 Failing over from {server.address}")
+        finally:
+            self.lock.release()
+
+        report = DeliveryReport(False, None, attempts, time.monotonic() - start, error=last_error)
+        self.reports.append(report)
+        return report
+
+    def close(self):
+        with self.lock:
+            self._close()
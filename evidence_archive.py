@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Evidence Archive - Screenshots and Page HTML, Deduplicated and Size-Capped
+
+When slots are found - and whenever the monitor lands on a page it did not
+expect (an unexpected redirect or a page variant it has never seen) - the
+browser thread grabs the screenshot and HTML into memory and moves on.
+Writing them out happens later on the I/O pool, after the alert has gone
+out:
+
+- artifacts are content-addressed (<hash>.png, <hash>.html.gz), so the same
+  services page captured a hundred times is stored once; HTML is hashed
+  with digits and hex tokens normalised away, like the page fingerprint
+- HTML is gzipped; PNGs are stored as they are (already deflate-compressed)
+- index.jsonl gets one line per capture: time, kind, target, URL, files
+- once the archive exceeds EVIDENCE_MAX_MB, the least recently captured
+  artifacts are deleted first, and their index lines with them; the index
+  itself is kept to a twentieth of the budget by dropping its oldest lines
+
+Everything lives under EVIDENCE_DIR (default evidence/; empty = off).
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+from slot_detection import VOLATILE_PATTERN
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = 'evidence'
+INDEX_FILE = 'index.jsonl'
+INDEX_SHARE = 0.05  # Of the size budget; the index is trimmed to half of that when it outgrows it
+
+
+class EvidenceArchive:
+    """Content-addressed store for page captures with a total size budget."""
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=200 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Archive at EVIDENCE_DIR, or None when EVIDENCE_DIR is set to an empty value."""
+        directory = os.getenv('EVIDENCE_DIR', DEFAULT_DIR)
+        if not directory:
+            return None
+        try:
+            return cls(directory, int(float(os.getenv('EVIDENCE_MAX_MB', 200)) * 2 ** 20))
+        except OSError as e:
+            logger.warning(f"⚠️ Could not create evidence directory {directory}: {e}")
+            return None
+
+    def _write(self, name, produce):
+        """Write produce() under name unless it is already there; either way mark it as just used."""
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            os.utime(path)
+            return name
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(produce())
+        os.replace(tmp_path, path)
+        return name
+
+    def store(self, kind, target, screenshot=None, html=None, url=None):
+        """Archive one capture; returns its index entry."""
+        entry = {
+            'ts': datetime.now().isoformat(timespec='seconds'),
+            'kind': kind,
+            'target': target.name,
+            'service_id': target.service_id,
+            'url': url,
+            'screenshot': None,
+            'html': None,
+        }
+        with self.lock:
+            if screenshot:
+                digest = hashlib.sha256(screenshot).hexdigest()[:20]
+                entry['screenshot'] = self._write(f"{digest}.png", lambda: screenshot)
+            if html:
+                digest = hashlib.sha256(VOLATILE_PATTERN.sub('#', html).encode('utf-8')).hexdigest()[:20]
+                entry['html'] = self._write(f"{digest}.html.gz", lambda: gzip.compress(html.encode('utf-8'), mtime=0))
+            with open(os.path.join(self.directory, INDEX_FILE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+            self.prune()
+        return entry
+
+    def _rewrite_index(self, present, max_size):
+        """Keep the index lines whose files are still present, newest first up to max_size bytes; returns its size."""
+        path = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with open(path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            return 0
+        kept = []
+        size = 0
+        for line in reversed(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not any(entry.get(field) in present for field in ('screenshot', 'html')):
+                continue
+            size += len(line.encode('utf-8'))
+            if size > max_size:
+                break
+            kept.append(line)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(reversed(kept))
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def prune(self):
+        """Delete the least recently used artifacts until the archive fits the budget."""
+        artifacts = []
+        index_size = 0
+        with os.scandir(self.directory) as entries:
+            for item in entries:
+                if not item.is_file():
+                    continue
+                stat = item.stat()
+                if item.name == INDEX_FILE:
+                    index_size = stat.st_size
+                elif not item.name.endswith('.tmp'):
+                    artifacts.append((stat.st_mtime, stat.st_size, item.name))
+        present = {name for _, _, name in artifacts}
+        index_budget = self.max_bytes * INDEX_SHARE
+        if index_size > index_budget:
+            index_size = self._rewrite_index(present, index_budget / 2)
+
+        total = index_size + sum(size for _, size, _ in artifacts)
+        removed = 0
+        for _, size, name in sorted(artifacts):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            present.discard(name)
+            total -= size
+            removed += 1
+        if removed:
+            self._rewrite_index(present, index_budget)
+            logger.debug("🧹 Evidence archive over budget - removed %d old artifact(s)", removed)
+        return removed
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Check History - SQLite Record of Every Check Outcome
+
+Every check is stored with its target, time, outcome, final URL and
+latency in a local SQLite database (HISTORY_DB, default visa_history.db).
+An insert trigger keeps per-target, per-day, per-hour counters in a rollup
+table, and all analytics are set-based SQL run inside SQLite rather than
+row by row in Python - heatmaps and error rates read the small rollup,
+open windows start from the sightings and use index lookups - so they stay
+fast over months of checks from many targets:
+
+- heatmap()      - slot sightings and check counts per weekday x hour
+- open_windows() - how long slots stayed visible, per target
+- error_rates()  - checks, errors and error rate per target and day
+- peak_hours()   - the hours slots actually showed up most often
+
+Targets are keyed by MonitorTarget.key - the service ID, plus the consulate
+when one is set - so the same service watched at two consulates stays two
+series. Databases from before the key are migrated on open: their
+service_id columns become target_key, and their rows keep the bare service
+ID, which is the key of a target without a consulate.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+from slot_detection import SLOTS_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB = 'visa_history.db'
+ERROR = 'error'
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checks (
+    id INTEGER PRIMARY KEY,
+    target_key TEXT NOT NULL,
+    target TEXT NOT NULL,
+    ts REAL NOT NULL,
+    weekday INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    url TEXT,
+    latency REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_checks_key_ts ON checks (target_key, ts, outcome);
+CREATE INDEX IF NOT EXISTS idx_checks_outcome_ts ON checks (outcome, ts);
+
+-- Per target, day and hour counters, kept current by the trigger below so
+-- heatmaps and error rates never scan the raw checks
+CREATE TABLE IF NOT EXISTS hourly_stats (
+    target_key TEXT NOT NULL,
+    target TEXT NOT NULL,
+    day TEXT NOT NULL,
+    weekday INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    checks INTEGER NOT NULL,
+    sightings INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    latency_sum REAL NOT NULL,
+    PRIMARY KEY (target_key, day, hour)
+);
+CREATE INDEX IF NOT EXISTS idx_hourly_day ON hourly_stats (day);
+
+CREATE TRIGGER IF NOT EXISTS checks_rollup AFTER INSERT ON checks BEGIN
+    INSERT INTO hourly_stats (target_key, target, day, weekday, hour, checks, sightings, errors, latency_sum)
+    VALUES (NEW.target_key, NEW.target, date(NEW.ts, 'unixepoch', 'localtime'), NEW.weekday, NEW.hour, 1,
+            NEW.outcome = 'slots_available', NEW.outcome = 'error', COALESCE(NEW.latency, 0))
+    ON CONFLICT (target_key, day, hour) DO UPDATE SET
+        target = excluded.target,
+        checks = checks + 1,
+        sightings = sightings + excluded.sightings,
+        errors = errors + excluded.errors,
+        latency_sum = latency_sum + excluded.latency_sum;
+END;
+"""
+
+# A window opens at a sighting whose previous (non-error) check saw no slots
+# and closes at the next check without slots. Driven from the sightings, with
+# index lookups either side, so it scales with sightings, not with checks.
+OPEN_WINDOWS_SQL = """
+SELECT target_key, target, opened, closed FROM (
+    SELECT s.target_key, s.target, s.ts AS opened,
+        (SELECT p.outcome FROM checks p
+         WHERE p.target_key = s.target_key AND p.ts < s.ts AND p.outcome != :error
+         ORDER BY p.ts DESC LIMIT 1) AS previous,
+        (SELECT n.ts FROM checks n
+         WHERE n.target_key = s.target_key AND n.ts > s.ts AND n.outcome NOT IN (:slots, :error)
+         ORDER BY n.ts LIMIT 1) AS closed
+    FROM checks s
+    WHERE s.outcome = :slots AND s.ts >= :since {target_filter}
+)
+WHERE previous IS NULL OR previous != :slots
+ORDER BY opened
+"""
+
+
+class CheckHistory:
+    """Thread-safe writer and query interface for the history database."""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.connection.executescript(SCHEMA)
+
+    def _migrate(self):
+        """Rename service_id to target_key in a database written before targets had keys."""
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(checks)")}
+        if 'service_id' not in columns:
+            return
+        logger.info(f"🗄️ Migrating history database {self.path} to per-target keys")
+        # The trigger and index are recreated by SCHEMA under the new column name
+        self.connection.executescript("""
+            BEGIN;
+            DROP TRIGGER IF EXISTS checks_rollup;
+            DROP INDEX IF EXISTS idx_checks_service_ts;
+            ALTER TABLE checks RENAME COLUMN service_id TO target_key;
+            ALTER TABLE hourly_stats RENAME COLUMN service_id TO target_key;
+            COMMIT;
+        """)
+
+    @classmethod
+    def from_env(cls):
+        """History at HISTORY_DB, or None when HISTORY_DB is set to an empty value."""
+        path = os.getenv('HISTORY_DB', DEFAULT_DB)
+        if not path:
+            return None
+        try:
+            return cls(path)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Could not open history database {path}: {e}")
+            return None
+
+    def record(self, target_key, target, outcome, ts=None, url=None, latency=None, error=None):
+        """Store one check; ts is a Unix timestamp (default: now)."""
+        ts = time.time() if ts is None else ts
+        local = datetime.fromtimestamp(ts)
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO checks (target_key, target, ts, weekday, hour, outcome, url, latency, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (target_key, target, ts, local.weekday(), local.hour, outcome, url, latency, error)
+            )
+            self.connection.commit()
+
+    def record_many(self, rows):
+        """Bulk insert of (target_key, target, ts, outcome, url, latency, error) tuples."""
+        prepared = []
+        for target_key, target, ts, outcome, url, latency, error in rows:
+            local = datetime.fromtimestamp(ts)
+            prepared.append((target_key, target, ts, local.weekday(), local.hour, outcome, url, latency, error))
+        with self.lock:
+            self.connection.executemany(
+                "INSERT INTO checks (target_key, target, ts, weekday, hour, outcome, url, latency, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", prepared
+            )
+            self.connection.commit()
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _since(days):
+        return time.time() - days * 86400 if days else 0
+
+    @staticmethod
+    def _since_day(days):
+        return datetime.fromtimestamp(time.time() - days * 86400).strftime('%Y-%m-%d') if days else ''
+
+    def heatmap(self, days=None, target_key=None):
+        """7x24 matrices (sightings, checks): slot sightings and non-error checks per weekday and hour."""
+        sql = "SELECT weekday, hour, SUM(sightings), SUM(checks - errors) FROM hourly_stats WHERE day >= ?"
+        params = [self._since_day(days)]
+        if target_key:
+            sql += " AND target_key = ?"
+            params.append(target_key)
+        sql += " GROUP BY weekday, hour"
+
+        sightings = [[0] * 24 for _ in range(7)]
+        checks = [[0] * 24 for _ in range(7)]
+        for weekday, hour, seen, total in self._query(sql, params):
+            sightings[weekday][hour] = seen
+            checks[weekday][hour] = total
+        return sightings, checks
+
+    def hourly_rates(self, days=None, target_key=None):
+        """{hour: share of checks in that hour that saw slots}, across weekdays."""
+        sightings, checks = self.heatmap(days, target_key)
+        rates = {}
+        for hour in range(24):
+            total = sum(checks[weekday][hour] for weekday in range(7))
+            if total:
+                rates[hour] = sum(sightings[weekday][hour] for weekday in range(7)) / total
+        return rates
+
+    def peak_hours(self, limit=3, days=None, min_sightings=3, target_key=None):
+        """Hours (0-23) with the most slot sightings, or [] if history is too thin."""
+        sql = "SELECT hour, SUM(sightings) AS seen FROM hourly_stats WHERE day >= ?"
+        params = [self._since_day(days)]
+        if target_key:
+            sql += " AND target_key = ?"
+            params.append(target_key)
+        sql += " GROUP BY hour HAVING seen > 0 ORDER BY seen DESC LIMIT ?"
+        params.append(limit)
+        rows = self._query(sql, params)
+        if sum(seen for _, seen in rows) < min_sightings:
+            return []
+        return [hour for hour, _ in rows]
+
+    def open_windows(self, days=None, target_key=None):
+        """[(target_key, target, opened, closed)] - closed is None while still open."""
+        target_filter = "AND target_key = :target_key" if target_key else ""
+        params = {'slots': SLOTS_AVAILABLE, 'error': ERROR, 'since': self._since(days), 'target_key': target_key}
+        return self._query(OPEN_WINDOWS_SQL.format(target_filter=target_filter), params)
+
+    def error_rates(self, days=None, target_key=None):
+        """[(target_key, target, day, checks, errors, rate)] per target and local day."""
+        sql = ("SELECT target_key, MAX(target), day, SUM(checks), SUM(errors), "
+               "ROUND(1.0 * SUM(errors) / SUM(checks), 4) FROM hourly_stats WHERE day >= ?")
+        params = [self._since_day(days)]
+        if target_key:
+            sql += " AND target_key = ?"
+            params.append(target_key)
+        return self._query(sql + " GROUP BY target_key, day ORDER BY day, target_key", params)
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM checks")[0][0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Report on the check history collected by the monitor.
+
+Prints when slots actually appeared (weekday x hour heatmap), how long they
+stayed open and the daily error rate per target.
+
+Usage:
+    python3 history_report.py
+    python3 history_report.py --days 30 --target 4755
+    python3 history_report.py --db /path/to/visa_history.db
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import datetime
+
+from history import CheckHistory, DEFAULT_DB, WEEKDAYS
+
+SHADES = ' ░▒▓█'
+
+
+def print_heatmap(history, days, target_key):
+    sightings, checks = history.heatmap(days, target_key)
+    peak = max(max(row) for row in sightings)
+    print("\n🗓️  Slot sightings by weekday and hour (local time)")
+    print("      " + "".join(f"{hour:<3d}" for hour in range(24)))
+    for weekday, row in enumerate(sightings):
+        cells = []
+        for hour, seen in enumerate(row):
+            if not checks[weekday][hour]:
+                cells.append(' · ')
+            else:
+                shade = SHADES[min(len(SHADES) - 1, -(-seen * (len(SHADES) - 1) // peak))] if peak else SHADES[0]
+                cells.append(f" {shade} ")
+        print(f"  {WEEKDAYS[weekday]} " + "".join(cells))
+    print(f"  ({sum(map(sum, sightings))} sightings in {sum(map(sum, checks))} checks; · = never checked)")
+
+    peak_hours = history.peak_hours(days=days, target_key=target_key)
+    if peak_hours:
+        print(f"  Peak hours: {', '.join(f'{hour:02d}:00' for hour in peak_hours)}")
+
+
+def print_windows(history, days, target_key):
+    windows = history.open_windows(days, target_key)
+    print(f"\n🪟 Open windows: {len(windows)}")
+    durations = [closed - opened for _, _, opened, closed in windows if closed]
+    if durations:
+        print(f"   • Median open: {statistics.median(durations) / 60:.1f} min, "
+              f"longest {max(durations) / 60:.1f} min (upper bounds - limited by the check interval)")
+    for target_key, target, opened, closed in windows[-10:]:
+        start = datetime.fromtimestamp(opened).strftime('%Y-%m-%d %H:%M')
+        length = f"{(closed - opened) / 60:.1f} min" if closed else "still open"
+        print(f"   • {target} ({target_key}) {start}: {length}")
+
+
+def print_error_rates(history, days, target_key):
+    rows = history.error_rates(days, target_key)
+    print("\n⚠️  Error rate per day")
+    for target_key, target, day, checks, errors, rate in rows[-14:]:
+        print(f"   • {day} {target} ({target_key}): {errors}/{checks} ({100 * rate:.1f}%)")
+    if not rows:
+        print("   • No checks recorded")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report on the monitor's check history")
+    parser.add_argument('--db', default=os.getenv('HISTORY_DB', DEFAULT_DB) or DEFAULT_DB, help="history database")
+    parser.add_argument('--days', type=float, help="only the last N days")
+    parser.add_argument('--target', help="only this target: service ID, or ID@consulate for targets with a consulate")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ No history at {args.db} - run the monitor first")
+        return 1
+
+    history = CheckHistory(args.db)
+    start = time.perf_counter()
+    print("📊 Check History")
+    print("=" * 40)
+    print(f"🗄️  {args.db}: {history.count():,} checks")
+    print_heatmap(history, args.days, args.target)
+    print_windows(history, args.days, args.target)
+    print_error_rates(history, args.days, args.target)
+    print(f"\n⏱️ Queries took {1000 * (time.perf_counter() - start):.0f} ms")
+    history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
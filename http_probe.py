@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+HTTP Redirect Probe - Lightweight Booking Check
+
+Copies the cookies from the logged-in Selenium session into a pooled
+requests session and asks for the booking URL without following redirects.
+The status code and Location header are usually enough to know that there
+are no slots, so the browser only loads the booking page when the probe
+says slots may exist.
+"""
+
+import time
+import logging
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from session_cookies import browser_cookies, restore_cookies
+
+logger = logging.getLogger(__name__)
+
+# Probe verdicts
+PROBE_NO_SLOTS = "no_slots"
+PROBE_MAYBE_SLOTS = "maybe_slots"
+PROBE_LOGIN_REQUIRED = "login_required"
+PROBE_UNKNOWN = "unknown"
+
+LOGIN_URL_MARKERS = ('login', 'account', 'signin', 'iam.esteri.it')
+
+
+class ProbeResult:
+    """Verdict of one no-follow request."""
+
+    def __init__(self, verdict, status=None, location='', elapsed=0.0, error=None, cookies=None):
+        self.verdict = verdict
+        self.status = status
+        self.location = location
+        self.elapsed = elapsed
+        self.error = error
+        self.cookies = cookies or []
+
+    def __repr__(self):
+        return f"ProbeResult(verdict={self.verdict!r}, status={self.status!r}, location={self.location!r})"
+
+
+def classify_probe_response(status, location, booking_path):
+    """Map status code and Location header to a probe verdict."""
+    location = (location or '').lower()
+    if status in (301, 302, 303, 307, 308):
+        if any(marker in location for marker in LOGIN_URL_MARKERS):
+            return PROBE_LOGIN_REQUIRED
+        if 'services' in location and booking_path not in location:
+            return PROBE_NO_SLOTS
+        return PROBE_UNKNOWN
+    if status == 200:
+        return PROBE_MAYBE_SLOTS
+    if status in (401, 403):
+        return PROBE_LOGIN_REQUIRED
+    return PROBE_UNKNOWN
+
+
+def _has_attr(cookie, name):
+    """Whether a Set-Cookie flag such as HttpOnly was present, however it was capitalised."""
+    return cookie.has_nonstandard_attr(name) or cookie.has_nonstandard_attr(name.lower())
+
+
+def _get_attr(cookie, name):
+    return cookie.get_nonstandard_attr(name) or cookie.get_nonstandard_attr(name.lower())
+
+
+class RedirectProbe:
+    """Pooled HTTP client that shares cookies with the browser session."""
+
+    def __init__(self, timeout=10, pool_size=2):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'it-IT,it;q=0.9,en;q=0.8',
+        })
+
+    def sync_from_browser(self, driver, url):
+        """Copy the cookies for url and the user agent from the live Selenium session."""
+        cookies = browser_cookies(driver, [url])
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=cookie.get('domain'), path=cookie.get('path', '/')
+            )
+        try:
+            self.session.headers['User-Agent'] = driver.execute_script("return navigator.userAgent")
+        except Exception:
+            pass
+        return len(cookies)
+
+    def push_to_browser(self, driver, response_cookies, url):
+        """Give cookies the server rotated during a probe of url back to the browser.
+
+        HttpOnly and SameSite are carried over, and a cookie set without a
+        Domain attribute stays host-only (set through url), so the browser
+        keeps one copy with the attributes the server gave it.
+        """
+        scheme, host = urlsplit(url)[:2]
+        cookies = []
+        for cookie in response_cookies:
+            converted = {
+                'name': cookie.name,
+                'value': cookie.value,
+                'path': cookie.path or '/',
+                'secure': bool(cookie.secure),
+                'httpOnly': _has_attr(cookie, 'HttpOnly'),
+                'sameSite': _get_attr(cookie, 'SameSite') or '',
+                'expiry': cookie.expires,
+            }
+            if cookie.domain_specified:
+                converted['domain'] = cookie.domain
+            else:
+                converted['url'] = f"{scheme}://{host}{converted['path']}"
+            cookies.append(converted)
+        try:
+            restore_cookies(driver, cookies)
+        except Exception as e:
+            logger.debug(f"Could not push {len(cookies)} cookie(s) to browser: {e}")
+
+    def probe(self, url, booking_path):
+        """Issue one no-follow GET and classify the response."""
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, allow_redirects=False, timeout=self.timeout, stream=True)
+        except requests.RequestException as e:
+            return ProbeResult(PROBE_UNKNOWN, elapsed=time.monotonic() - start, error=str(e))
+
+        status = response.status_code
+        location = urljoin(url, response.headers.get('Location', '')) if response.is_redirect else ''
+        if response.is_redirect:
+            response.content  # Tiny body - read it so the connection goes back to the pool
+        response.close()
+
+        verdict = classify_probe_response(status, location, booking_path)
+        return ProbeResult(
+            verdict, status=status, location=location,
+            elapsed=time.monotonic() - start, cookies=list(response.cookies)
+        )
+
+    def close(self):
+        self.session.close()
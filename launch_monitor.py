@@ -7,7 +7,6 @@ Opens Chrome with debug mode and starts monitoring.
 import subprocess
 import time
 import sys
-import os
 
 def start_chrome_debug():
     """Start Chrome in debug mode for Selenium connection."""
@@ -53,7 +52,7 @@ def main():
     
     if not chrome_process:
         print("❌ Could not start Chrome")
-        return
+        return 1
     
     # Wait for user to login
     input("Press Enter when you have logged in to Prenotami...")
@@ -63,13 +62,15 @@ def main():
     print("🖥️ Keep both the browser window and this terminal open")
     print()
     
-    # Start the monitor
+    # Start the monitor in this process
     try:
-        os.system("python3 browser_monitor.py")
+        import browser_monitor
+        return browser_monitor.main()
     except KeyboardInterrupt:
         print("\n🛑 Monitor stopped")
+        return 0
     finally:
         print("🔒 Browser window left open for your use")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Memory Governor - Flat Memory for Week-Long Runs
+
+Navigating the same tab hundreds of times makes Chrome's renderer grow.
+The governor samples the browser and renderer RSS every few checks, keeps
+a bounded history, and recycles before memory degrades:
+
+- renderer over RENDERER_MEMORY_LIMIT_MB -> open a fresh tab, close the old
+  one (site isolation gives the new tab a new renderer; cookies are shared)
+- whole tree over BROWSER_MEMORY_LIMIT_MB -> the monitor restarts Chrome and
+  restores the cookies it saved beforehand
+
+Between checks the monitoring tab is parked on about:blank so the prenotami
+page isn't kept alive (timers, scripts) while idle.
+"""
+
+import os
+import time
+import logging
+from collections import deque
+
+from process_memory import driver_memory
+
+logger = logging.getLogger(__name__)
+
+MB = 2 ** 20
+
+# Actions returned by MemoryGovernor.evaluate
+RECYCLE_TAB = "recycle_tab"
+RESTART_BROWSER = "restart_browser"
+
+
+class MemoryGovernor:
+    """Samples Chrome memory and decides when to recycle."""
+
+    def __init__(self, renderer_limit_mb=400, browser_limit_mb=1500, sample_every=10,
+                 recycle_every=0, park_between_checks=True, history_size=2000):
+        self.renderer_limit = renderer_limit_mb * MB
+        self.browser_limit = browser_limit_mb * MB
+        self.sample_every = max(1, sample_every)
+        self.recycle_every = recycle_every
+        self.park_between_checks = park_between_checks
+        self.history = deque(maxlen=history_size)
+        self.checks_since_recycle = 0
+        self.checks = 0
+        self.recycles = 0
+        self.restarts = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            renderer_limit_mb=int(os.getenv('RENDERER_MEMORY_LIMIT_MB', 400)),
+            browser_limit_mb=int(os.getenv('BROWSER_MEMORY_LIMIT_MB', 1500)),
+            sample_every=int(os.getenv('MEMORY_SAMPLE_EVERY', 10)),
+            recycle_every=int(os.getenv('RECYCLE_TAB_EVERY', 0)),
+            park_between_checks=os.getenv('PARK_BETWEEN_CHECKS', 'true').lower() in ('1', 'true', 'yes'),
+        )
+
+    @property
+    def latest(self):
+        return self.history[-1][1] if self.history else None
+
+    def sample(self, driver):
+        """Record one memory sample; returns it (or None if unavailable)."""
+        sample = driver_memory(driver)
+        if sample is None:
+            return None
+        self.history.append((time.time(), sample))
+        baseline = self.history[0][1].total
+        logger.info(
+            f"🧠 Chrome memory: {sample.total / MB:.0f} MB total "
+            f"(browser {sample.browser / MB:.0f} MB, {sample.renderer_count} renderer(s) {sample.renderers / MB:.0f} MB, "
+            f"{(sample.total - baseline) / MB:+.0f} MB since start)"
+        )
+        return sample
+
+    def evaluate(self, driver):
+        """Called after every check; returns RECYCLE_TAB, RESTART_BROWSER or None."""
+        self.checks += 1
+        self.checks_since_recycle += 1
+
+        if self.recycle_every and self.checks_since_recycle >= self.recycle_every:
+            logger.info(f"♻️ Scheduled tab recycle after {self.checks_since_recycle} checks")
+            return RECYCLE_TAB
+
+        if self.checks % self.sample_every:
+            return None
+        sample = self.sample(driver)
+        if sample is None:
+            return None
+        if sample.total > self.browser_limit:
+            logger.warning(f"⚠️ Chrome uses {sample.total / MB:.0f} MB (limit {self.browser_limit / MB:.0f} MB) - restarting browser")
+            return RESTART_BROWSER
+        if sample.renderers > self.renderer_limit:
+            logger.warning(f"⚠️ Renderers use {sample.renderers / MB:.0f} MB (limit {self.renderer_limit / MB:.0f} MB) - recycling tab")
+            return RECYCLE_TAB
+        return None
+
+    def recycle_tab(self, driver):
+        """Replace the monitoring tab with a fresh one; other tabs are left alone."""
+        old_tab = driver.current_window_handle
+        driver.switch_to.new_window('tab')
+        new_tab = driver.current_window_handle
+        driver.switch_to.window(old_tab)
+        driver.close()
+        driver.switch_to.window(new_tab)
+        self.recycles += 1
+        self.checks_since_recycle = 0
+        logger.info(f"♻️ Monitoring tab recycled (#{self.recycles})")
+
+    def park(self, driver):
+        """Leave the monitoring tab idle on about:blank until the next check."""
+        if self.park_between_checks:
+            driver.get("about:blank")
+
+    def restarted(self):
+        self.restarts += 1
+        self.checks_since_recycle = 0
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Metrics - Per-Phase Timings and Check Counters
+
+Keeps histograms and counters for the hot path (navigation, readiness wait,
+DOM analysis, classification, login verification, screenshot, each
+notification channel) plus check/outcome/error counters, and exports them
+in the Prometheus text format:
+
+- METRICS_FILE  - rewritten atomically after every check (node_exporter
+                  textfile collector, or just `cat`)
+- METRICS_PORT  - tiny HTTP endpoint serving /metrics on METRICS_HOST
+                  (default 127.0.0.1)
+
+Both are off by default; the numbers are collected either way. Recording is
+thread-safe - phases are timed on the browser thread, notifications on the
+event loop.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'visa_monitor'
+
+# Seconds - from a fast CDP round trip to a slow page load or SMTP send
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# name -> (type, help)
+METRICS = {
+    'phase_seconds': (HISTOGRAM, "Time spent in each phase of a check"),
+    'notification_seconds': (HISTOGRAM, "Time from alert to delivery, per channel"),
+    'notifications_total': (COUNTER, "Alert deliveries per channel and result"),
+    'checks_total': (COUNTER, "Slot checks started"),
+    'check_outcomes_total': (COUNTER, "Slot check outcomes"),
+    'check_errors_total': (COUNTER, "Slot checks that failed or timed out"),
+    'verdict_cache_total': (COUNTER, "Page verdicts replayed from the fingerprint cache (hit) or classified (miss)"),
+    'network_verdicts_total': (COUNTER, "Booking responses read from DevTools network events, per verdict"),
+    'page_variants_total': (COUNTER, "Distinct page variants seen, per outcome"),
+    'consecutive_errors': (GAUGE, "Current consecutive-error streak"),
+    'longest_error_streak': (GAUGE, "Longest consecutive-error streak since start"),
+    'schedule_lag_seconds': (HISTOGRAM, "How late checks started relative to their planned time"),
+    'missed_deadlines_total': (COUNTER, "Planned checks skipped because the loop was too far behind"),
+    'rate_limit_wait_seconds': (HISTOGRAM, "Time a check waited for the worker pool's or cluster's rate limit"),
+    'lease_held': (GAUGE, "1 while this node holds the target's lease and checks it, 0 while standing by"),
+    'alerts_deduplicated_total': (COUNTER, "Alerts not sent because another node already alerted"),
+    'coordination_errors_total': (COUNTER, "Coordination backend calls that failed (node acted alone)"),
+    'session_keepalives_total': (COUNTER, "Session refreshes between checks, per result"),
+    'start_time_seconds': (GAUGE, "Unix time the monitor started"),
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects it."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=None):
+    items = sorted(labels) + (extra or [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in items) + '}'
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters, gauges and histograms keyed by labels."""
+
+    def __init__(self, namespace=NAMESPACE, buckets=DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.series = {name: {} for name in METRICS}
+        self.set('start_time_seconds', time.time())
+
+    def _key(self, name, labels):
+        if name not in self.series:
+            raise KeyError(f"unknown metric {name}")
+        return tuple(sorted(labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.series[name][key] = self.series[name].get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.series[name][key] = value
+
+    def set_max(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.series[name][key] = max(value, self.series[name].get(key, 0))
+
+    def get(self, name, **labels):
+        return self.series[name].get(self._key(name, labels))
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.series[name].get(key)
+            if histogram is None:
+                histogram = self.series[name][key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, phase, into=None, **labels):
+        """Time a block into phase_seconds{phase=...}, even if it raises.
+
+        into, if given, is a dict that also receives {phase: seconds}.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('phase_seconds', elapsed, phase=phase, **labels)
+            if into is not None:
+                into[phase] = elapsed
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for name, (kind, help_text) in METRICS.items():
+                series = self.series[name]
+                if not series:
+                    continue
+                full_name = f"{self.namespace}_{name}"
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for key, value in sorted(series.items()):
+                    labels = list(key)
+                    if kind != HISTOGRAM:
+                        lines.append(f"{full_name}{_labels(labels)} {float(value)!r}")
+                        continue
+                    for bound, count in value.cumulative():
+                        lines.append(f"{full_name}_bucket{_labels(labels, [('le', f'{bound:g}')])} {count}")
+                    lines.append(f"{full_name}_bucket{_labels(labels, [('le', '+Inf')])} {value.count}")
+                    lines.append(f"{full_name}_sum{_labels(labels)} {value.sum:.6f}")
+                    lines.append(f"{full_name}_count{_labels(labels)} {value.count}")
+        return '\n'.join(lines) + '\n'
+
+    def phase_summary(self):
+        """{phase: (count, mean seconds)} across all labels, for a quick log line."""
+        totals = {}
+        with self.lock:
+            for key, histogram in self.series['phase_seconds'].items():
+                count, total = totals.get(dict(key)['phase'], (0, 0.0))
+                totals[dict(key)['phase']] = (count + histogram.count, total + histogram.sum)
+        return {phase: (count, total / count) for phase, (count, total) in totals.items() if count}
+
+
+class MetricsExporter:
+    """Writes the registry to a textfile and/or serves it over HTTP."""
+
+    def __init__(self, registry, path=None, port=0, host='127.0.0.1'):
+        self.registry = registry
+        self.path = path
+        self.port = port
+        self.host = host
+        self.server = None
+
+    @classmethod
+    def from_env(cls, registry):
+        return cls(
+            registry,
+            path=os.getenv('METRICS_FILE') or None,
+            port=int(os.getenv('METRICS_PORT', 0)),
+            host=os.getenv('METRICS_HOST', '127.0.0.1')
+        )
+
+    def start(self):
+        """Start the /metrics endpoint if a port is configured."""
+        if not self.port:
+            return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self.registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would flood the monitor log
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not serve metrics on {self.host}:{self.port}: {e}")
+            return
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info(f"📈 Metrics at http://{self.host}:{self.port}/metrics")
+
+    def flush(self):
+        """Rewrite METRICS_FILE atomically (no-op when unset)."""
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.registry.render())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write metrics file: {e}")
+
+    def close(self):
+        self.flush()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
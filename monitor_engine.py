@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Async Monitor Engine - Non-Blocking Check Loop
+
+Runs the monitoring loop on asyncio so slot checks, notifications,
+screenshots and login verification are separate tasks with their own
+timeouts. Selenium is not thread-safe, so every browser call goes through
+one dedicated executor thread; email and other blocking I/O use a separate
+pool. A slow SMTP server or a found slot never delays the next check of
+the other targets.
+"""
+
+import os
+import time
+import random
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from notifications import Alert, NotificationPipeline
+from metrics import MetricsExporter
+from structured_log import log_check
+from scheduler import AdaptiveScheduler
+from evidence_archive import EvidenceArchive
+from coordination import coordinator_from_env
+from slot_detection import SLOTS_AVAILABLE, NO_SLOTS, UNEXPECTED_REDIRECT, LOGIN_REQUIRED
+
+logger = logging.getLogger(__name__)
+
+# Seconds between looks at the session deadline, and the least between two keepalives
+SESSION_POLL = 300
+SESSION_KEEPALIVE_RETRY = 60
+
+# Seconds of LOGIN_TIMEOUT kept for loading the Services page around the wait for a manual login
+LOGIN_PAGE_ALLOWANCE = 30
+
+
+class AsyncMonitorEngine:
+    """Drives a BrowserVisaMonitor's targets from an asyncio event loop."""
+
+    def __init__(self, monitor, max_errors=3):
+        self.monitor = monitor
+        self.max_errors = max_errors
+        self.check_timeout = float(os.getenv('CHECK_TIMEOUT', 120))
+        self.login_timeout = float(os.getenv('LOGIN_TIMEOUT', 300))
+        self.notify_timeout = float(os.getenv('NOTIFY_TIMEOUT', 60))
+        self.screenshot_timeout = float(os.getenv('SCREENSHOT_TIMEOUT', 30))
+        self.smtp_keepalive = float(os.getenv('SMTP_KEEPALIVE', 120))
+        self.jitter = float(os.getenv('CHECK_JITTER', 0))
+
+        # One thread owns the WebDriver; everything else gets its own pool
+        self.browser_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='browser')
+        self.io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='notify')
+        self.background_tasks = set()
+        self.pipeline = NotificationPipeline.from_env(monitor.send_alert)
+        self.metrics = monitor.metrics
+        self.exporter = MetricsExporter.from_env(self.metrics)
+        self.scheduler = AdaptiveScheduler.from_env(monitor.history)
+        self.archive = EvidenceArchive.from_env()
+
+        # Optional coordination with other nodes: leases, cluster budget, alert dedup
+        self.coordinator = coordinator_from_env()
+        self.node_id = os.getenv('NODE_ID') or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_ttl = float(os.getenv('LEASE_TTL', 0))
+        self.cluster_rate = float(os.getenv('CLUSTER_CHECKS_PER_MINUTE', 0)) / 60
+        self.alert_dedup_window = float(os.getenv('ALERT_DEDUP_SECONDS', 900))
+        self.coordination_timeout = float(os.getenv('COORDINATION_TIMEOUT', 5))
+
+        self.consecutive_errors = 0
+        self.check_count = 0
+
+    async def run_in_browser(self, func, *args, timeout):
+        """Run a blocking Selenium call on the browser thread with a timeout."""
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self.browser_executor, func, *args), timeout)
+
+    async def run_in_io(self, func, *args, timeout):
+        """Run a blocking I/O call (SMTP, disk) on the I/O pool with a timeout."""
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self.io_executor, func, *args), timeout)
+
+    def spawn(self, coro, name):
+        """Start a background task that never blocks the check loop."""
+        task = asyncio.create_task(coro, name=name)
+        self.background_tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        self.background_tasks.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if isinstance(error, asyncio.TimeoutError):
+            logger.warning(f"⚠️ Task {task.get_name()} timed out")
+        elif error:
+            logger.error(f"❌ Task {task.get_name()} failed: {str(error)}")
+
+    async def dispatch(self, alert):
+        """Send alert through the pipeline and record per-channel timings."""
+        report = await self.pipeline.dispatch(alert)
+        for result in report.results:
+            self.metrics.observe('notification_seconds', result.elapsed, channel=result.channel)
+            self.metrics.inc('notifications_total', channel=result.channel, result='delivered' if result.success else 'failed')
+        return report
+
+    async def notify_attention(self):
+        """Tell the user the monitor stopped and needs them."""
+        alert = Alert(
+            "⚠️ VISA Monitor Needs Attention",
+            "Session issue - check the browser window and make sure you're still logged in.",
+            slots_available=False
+        )
+        return await self.dispatch(alert)
+
+    def _capture(self, hand_over=False):
+        """Grab the page into memory on the browser thread, then optionally leave its tab to the user."""
+        evidence = None
+        if self.archive:
+            with self.metrics.timer('screenshot'):
+                evidence = self.monitor.capture_evidence()
+        if hand_over:
+            self.monitor.hand_over_booking_tab()
+        return evidence
+
+    async def archive_evidence(self, target, kind, capture, after=None):
+        """Wait for the capture, let `after` (the alert) finish first, then write it to the archive."""
+        evidence = await asyncio.wait_for(capture, self.screenshot_timeout)
+        if after is not None:
+            await asyncio.wait({after})
+        if not evidence:
+            return
+        entry = await self.run_in_io(self.archive.store, kind, target, *evidence, timeout=self.screenshot_timeout)
+        logger.info(f"📸 Evidence archived for {target.label}: {self.archive.directory}/{entry['screenshot']}")
+
+    def capture_evidence(self, target, kind, hand_over=False, after=None):
+        """Queue a page capture and archive it in the background."""
+        if not self.archive and not hand_over:
+            return
+        # Submitted right away so it runs on the browser thread before the next check
+        loop = asyncio.get_running_loop()
+        capture = loop.run_in_executor(self.browser_executor, self._capture, hand_over)
+        self.spawn(self.archive_evidence(target, kind, capture, after), f"evidence-{target.key}")
+
+    async def coordinate(self, func, *args, fallback):
+        """Call the coordination backend on the I/O pool; if it is unreachable, warn and use fallback."""
+        try:
+            return await self.run_in_io(func, *args, timeout=self.coordination_timeout)
+        except Exception as e:
+            self.metrics.inc('coordination_errors_total')
+            logger.warning(f"⚠️ Coordination backend unavailable ({str(e) or type(e).__name__}) - acting alone")
+            return fallback
+
+    async def hold_lease(self, target, interval):
+        """Take or renew target's lease; False while another node is checking it."""
+        if self.coordinator is None:
+            return True
+        # Outlives the pause after an alert, so a busy leader isn't mistaken for a dead one
+        ttl = self.lease_ttl or 4 * max(interval, target.check_interval)
+        holder = await self.coordinate(self.coordinator.claim, f"lease:{target.key}", self.node_id, ttl,
+                                       fallback=self.node_id)
+        leader = holder == self.node_id
+        if leader and target.lease_holder != self.node_id:
+            logger.info(f"👑 {target.label}: this node ({self.node_id}) is now checking it")
+        elif not leader and holder != target.lease_holder:
+            logger.info(f"💤 {target.label}: checked by {holder} - standing by")
+        target.lease_holder = holder
+        self.metrics.set('lease_held', 1 if leader else 0, target=target.label)
+        return leader
+
+    def opening_claim(self, target):
+        """Claim name for the opening target's last check saw - the same slots page on every node."""
+        result = target.last_result
+        snapshot = getattr(result, 'snapshot', None)
+        # No fingerprint (content fallback): this node's own check, so nothing is suppressed wrongly
+        opening = getattr(snapshot, 'fingerprint', '') or f"{self.node_id}-{target.check_count}"
+        return f"alert:{target.key}:{opening}"
+
+    async def deliver_alert(self, alert, target, claim):
+        """Dispatch alert unless another node already alerted for this opening."""
+        if self.coordinator is not None:
+            holder = await self.coordinate(self.coordinator.claim, claim, self.node_id,
+                                           self.alert_dedup_window, fallback=self.node_id)
+            if holder != self.node_id:
+                logger.info(f"🔕 {target.label}: {holder} already sent the alert for these slots")
+                self.metrics.inc('alerts_deduplicated_total', target=target.label)
+                return None
+            target.alert_claim = claim
+        return await self.dispatch(alert)
+
+    async def opening_closed(self, target):
+        """Release the alert claim once the opening is gone, so the next one is alerted again."""
+        claim, target.alert_claim = target.alert_claim, None
+        await self.coordinate(self.coordinator.release, claim, self.node_id, fallback=False)
+
+    def alert_slots(self, target):
+        """Fan the alert out to every channel, then archive the booking page."""
+        logger.info(f"🎉 SLOTS DETECTED for {target.label}! Sending alert...")
+        alert = Alert(
+            f"🎉 SLOTS FOUND: {target.name}",
+            f"{target.name} slots available! Check browser window!",
+            target=target
+        )
+        delivery = self.spawn(self.deliver_alert(alert, target, self.opening_claim(target)), f"alert-{target.key}")
+        self.capture_evidence(target, SLOTS_AVAILABLE, hand_over=True, after=delivery)
+
+    async def keep_email_warm(self):
+        """Periodically NOOP the SMTP connection so an alert never waits on a handshake."""
+        notifier = self.monitor.notifier
+        while True:
+            try:
+                await self.run_in_io(notifier.keep_warm, timeout=self.notify_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ SMTP keepalive timed out")
+            await asyncio.sleep(self.smtp_keepalive)
+
+    async def keep_session_alive(self):
+        """Refresh the login shortly before it would expire, between checks."""
+        session = self.monitor.session
+        while True:
+            due = session.keepalive_in()
+            if due is None or due > 0:
+                # Re-evaluate regularly - every authenticated check pushes the deadline out
+                await asyncio.sleep(min(due if due is not None else SESSION_POLL, SESSION_POLL))
+                continue
+            try:
+                with self.metrics.timer('session_keepalive'):
+                    logged_in = await self.run_in_browser(self.monitor.keep_session_alive, timeout=self.check_timeout)
+                result = {True: 'refreshed', False: 'logged_out', None: 'inconclusive'}[logged_in]
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ Session keepalive timed out")
+                result = 'timeout'
+            except Exception as e:
+                logger.warning(f"⚠️ Session keepalive failed: {str(e)}")
+                result = 'error'
+            self.metrics.inc('session_keepalives_total', result=result)
+            await asyncio.sleep(SESSION_KEEPALIVE_RETRY)
+
+    async def verify_login(self):
+        """Run the login check on the browser thread; a timeout counts as failure.
+
+        A lost login is waited for in the browser window (LOGIN_WAIT, cut to
+        fit LOGIN_TIMEOUT) rather than prompted for in the terminal.
+
+        Cookies and recent check outcomes are consulted first - the Services
+        page is only loaded when they point to a lost session.
+        """
+        try:
+            with self.metrics.timer('login_verification'):
+                if await self.run_in_browser(self.monitor.session_valid, timeout=self.check_timeout):
+                    return True
+                # Never the terminal prompt: input() would hold the browser thread past the timeout
+                wait = max(0.0, self.login_timeout - LOGIN_PAGE_ALLOWANCE)
+                return await self.run_in_browser(self.monitor.ensure_logged_in, False, wait, timeout=self.login_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Login verification timed out after {self.login_timeout:.0f}s")
+            return False
+
+    async def maintain_browser(self):
+        """Memory governance and tab parking on the browser thread between checks."""
+        try:
+            await self.run_in_browser(self.monitor.maintain_browser, timeout=self.check_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Browser maintenance timed out")
+
+    def next_interval(self, target, now=None):
+        """Seconds until target's next regular check: flat, or from the adaptive budget plan."""
+        if self.scheduler is None:
+            return target.check_interval
+        return self.scheduler.delay(target, self.monitor.targets, now)
+
+    def plan_next(self, target):
+        """Move target's deadline on by one interval, with bounded jitter that never accumulates."""
+        planned_at = datetime.now() - timedelta(seconds=time.monotonic() - target.deadline)
+        interval = self.next_interval(target, planned_at)
+        jitter = random.uniform(-1, 1) * min(self.jitter, interval / 4) if self.jitter else 0.0
+        missed = target.advance(interval, jitter)
+        if missed:
+            self.metrics.inc('missed_deadlines_total', missed, target=target.label)
+            logger.warning(f"⚠️ {target.label} is running behind - skipped {missed} planned check(s)")
+        return interval
+
+    async def wait_for_rate_limit(self, target):
+        """Take a token from the worker pool's and the cluster's rate limits, sleeping while over budget."""
+        waits = []
+        if self.monitor.rate_limiter is not None:
+            waits.append(self.monitor.rate_limiter.reserve())
+        if self.coordinator is not None and self.cluster_rate > 0:
+            waits.append(await self.coordinate(self.coordinator.reserve, 'checks', self.cluster_rate, 1.0, fallback=0.0))
+        if not waits:
+            return
+        wait = max(waits)
+        self.metrics.observe('rate_limit_wait_seconds', wait, target=target.label)
+        if wait > 0:
+            logger.debug("🪣 %s waiting %.1fs for the shared rate limit", target.label, wait)
+            await asyncio.sleep(wait)
+
+    def record_streak(self, target):
+        """Publish the consecutive-error streaks after every check."""
+        self.metrics.set('consecutive_errors', self.consecutive_errors)
+        self.metrics.set('consecutive_errors', target.consecutive_errors, target=target.label)
+        self.metrics.set_max('longest_error_streak', self.consecutive_errors)
+        self.metrics.set_max('longest_error_streak', target.consecutive_errors, target=target.label)
+
+    def report_check(self, target, elapsed, error=None):
+        """One structured record per check: outcome, timings and evidence."""
+        result = target.last_result if error is None else None
+        outcome = result.outcome if result else 'error'
+        record = {
+            'ts': target.last_checked_at.isoformat(timespec='seconds'),
+            'check': self.check_count,
+            'target': target.name,
+            'service_id': target.service_id,
+            'outcome': outcome,
+            'reason': result.reason if result else error,
+            'url': result.snapshot.url if result and result.snapshot else None,
+            'duration': round(elapsed, 3),
+            'timings': {phase: round(seconds, 3) for phase, seconds in result.timings.items()} if result else {},
+            'evidence': result.evidence if result else {},
+            'fingerprint': result.snapshot.fingerprint if result and result.snapshot else None,
+            'cached': result.cached if result else False,
+            'error_streak': self.consecutive_errors,
+            'schedule_lag': round(target.schedule_lag, 3),
+        }
+        if self.monitor.name:
+            record['worker'] = self.monitor.name
+        summary = f"🔍 Check #{self.check_count} {target.label}: {outcome} in {elapsed:.2f}s"
+        if error:
+            summary += f" ({error})"
+        log_check(record, summary)
+
+        history = self.monitor.history
+        if history:
+            self.spawn(self.run_in_io(
+                history.record, target.key, target.name, outcome, target.last_checked_at.timestamp(),
+                record['url'], elapsed, error, timeout=self.notify_timeout
+            ), f"history-{target.key}")
+
+    async def check_target(self, target):
+        """Run one slot check for target and update its state.
+
+        Returns False when the monitor should stop.
+        """
+        target.schedule_lag = max(0.0, time.monotonic() - target.next_check)
+        self.metrics.observe('schedule_lag_seconds', target.schedule_lag, target=target.label)
+        interval = self.plan_next(target)
+        if not await self.hold_lease(target, interval):
+            return True
+        await self.wait_for_rate_limit(target)
+
+        self.check_count += 1
+        target.check_count += 1
+        self.metrics.inc('checks_total', target=target.label)
+        logger.debug("🔍 Check #%d (%s, #%d) %.3fs behind plan", self.check_count, target.label,
+                     target.check_count, target.schedule_lag)
+        target.last_checked_at = datetime.now()
+        started = time.perf_counter()
+
+        # Periodically verify we're still logged in
+        if self.consecutive_errors > 0:
+            logger.info("🔄 Verifying login status due to previous errors...")
+            if not await self.verify_login():
+                self.consecutive_errors += 1
+                self.metrics.inc('check_errors_total', target=target.label, reason='login')
+                self.record_streak(target)
+                self.report_check(target, time.perf_counter() - started, error="login verification failed")
+                logger.error(f"❌ Login verification failed (error {self.consecutive_errors}/{self.max_errors})")
+                if self.consecutive_errors >= self.max_errors:
+                    logger.error("❌ Too many login failures - sending alert")
+                    return False
+                logger.info(f"⏳ Waiting {interval:.0f} seconds before retry...")
+                return True
+
+        try:
+            logger.debug("🎯 Starting slot availability check...")
+            target.last_result = None
+            with self.metrics.timer('check', target=target.label):
+                slots_available = await self.run_in_browser(
+                    self.monitor.check_visa_slots, target, timeout=self.check_timeout
+                )
+            if target.last_result is not None:
+                self.metrics.inc('check_outcomes_total', target=target.label, outcome=target.last_result.outcome)
+
+            if slots_available:
+                target.slots_found_count += 1
+                target.consecutive_errors = 0
+                self.record_streak(target)
+                self.report_check(target, time.perf_counter() - started)
+                self.alert_slots(target)
+
+                # Booking page stays open in its own tab for the user
+                logger.info("🖥️ Browser is ready for booking - check the window!")
+
+                # Back off this target only - the others keep their rotation
+                wait_time = target.check_interval * 3
+                logger.info(f"⏳ Pausing {target.label} for {wait_time} seconds ({wait_time//60} minutes) after alert...")
+                target.schedule(wait_time)
+            elif target.last_result is None:
+                raise Exception("check did not produce a result")
+            elif target.last_result.outcome == LOGIN_REQUIRED:
+                # Counted as an error so the next check logs in again first
+                raise Exception("session expired - login page shown")
+            else:
+                self.consecutive_errors = 0  # Reset on successful check
+                target.consecutive_errors = 0
+                self.record_streak(target)
+                self.report_check(target, time.perf_counter() - started)
+                result = target.last_result
+                if target.alert_claim is not None and result.outcome == NO_SLOTS:
+                    self.spawn(self.opening_closed(target), f"opening-closed-{target.key}")
+                if result.outcome == UNEXPECTED_REDIRECT or result.novel:
+                    # Keep a copy of pages the classifier had not seen for later analysis
+                    self.capture_evidence(target, result.outcome)
+
+        except Exception as e:
+            reason = 'error'
+            if isinstance(e, asyncio.TimeoutError):
+                reason = 'timeout'
+                e = f"timed out after {self.check_timeout:.0f}s"
+            self.consecutive_errors += 1
+            target.consecutive_errors += 1
+            self.metrics.inc('check_errors_total', target=target.label, reason=reason)
+            self.record_streak(target)
+            self.report_check(target, time.perf_counter() - started, error=str(e))
+            logger.error(f"❌ Slot check failed for {target.label} (error {self.consecutive_errors}/{self.max_errors}): {str(e)}")
+            if self.consecutive_errors >= self.max_errors:
+                logger.error("❌ Too many consecutive errors - sending alert")
+                return False
+        return True
+
+    async def run(self):
+        """Rotate through the targets until stopped or too many errors."""
+        targets = self.monitor.targets
+
+        # Stagger the first checks so targets don't all hit the site at once -
+        # in a worker pool, interleaved with the other workers' targets
+        slots = len(targets) * self.monitor.worker_count
+        stagger = min(target.check_interval for target in targets) / slots
+        for index, target in enumerate(targets):
+            target.schedule((index * self.monitor.worker_count + self.monitor.worker_index) * stagger)
+
+        self.exporter.start()
+        keepalive = None
+        if self.monitor.notifier.configured and self.smtp_keepalive > 0:
+            keepalive = asyncio.create_task(self.keep_email_warm(), name="smtp-keepalive")
+        session_keepalive = None
+        if self.monitor.session.keepalive:
+            session_keepalive = asyncio.create_task(self.keep_session_alive(), name="session-keepalive")
+
+        try:
+            while True:
+                # Next target due on the rotation
+                target = min(targets, key=lambda t: t.next_check)
+                delay = target.next_check - time.monotonic()
+                if delay > 0:
+                    next_check = datetime.now() + timedelta(seconds=delay)
+                    logger.debug("⏳ Next check #%d (%s) at %s (in %.0f seconds)",
+                                 self.check_count + 1, target.label, next_check.strftime('%H:%M:%S'), delay)
+                    await asyncio.sleep(delay)
+
+                if not await self.check_target(target):
+                    await self.notify_attention()
+                    break
+                await self.maintain_browser()
+                await self.run_in_io(self.exporter.flush, timeout=self.notify_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Fatal error: {str(e)}")
+            await self.notify_attention()
+        finally:
+            if keepalive:
+                keepalive.cancel()
+            if session_keepalive:
+                session_keepalive.cancel()
+            await self.shutdown()
+
+    async def shutdown(self, grace=None):
+        """Give in-flight alerts a chance to finish, then release the executors."""
+        pending = list(self.background_tasks)
+        if pending:
+            logger.info(f"⏳ Waiting for {len(pending)} background task(s) to finish...")
+            await asyncio.wait(pending, timeout=grace if grace is not None else self.notify_timeout)
+        await self.run_in_io(self.monitor.notifier.close, timeout=self.notify_timeout)
+        await self.run_in_io(self.exporter.close, timeout=self.notify_timeout)
+        if self.coordinator is not None:
+            # Hand our leases over right away instead of making standbys wait for them to expire
+            for target in self.monitor.targets:
+                if target.lease_holder == self.node_id:
+                    await self.coordinate(self.coordinator.release, f"lease:{target.key}", self.node_id,
+                                          fallback=False)
+            self.coordinator.close()
+        if self.monitor.history:
+            await self.run_in_io(self.monitor.history.close, timeout=self.notify_timeout)
+        phases = self.metrics.phase_summary()
+        if phases:
+            logger.info("⏱️ Phase timings: " + ", ".join(
+                f"{phase} {mean:.2f}s avg x{count}" for phase, (count, mean) in sorted(phases.items())
+            ))
+        self.io_executor.shutdown(wait=False)
+        self.pipeline.close()
+        self.browser_executor.shutdown(wait=False)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Network Watch - Booking Verdict From DevTools Network Events
+
+Chrome can record the DevTools Network events of every page in its
+performance log (goog:loggingPrefs). The booking request's response - or
+the 3xx and Location it was redirected with - is there as soon as the
+headers arrive, before the page it leads to has rendered, and a status
+code is a firmer signal than page wording.
+
+WebDriver has no push channel for these events without BiDi, so the log is
+drained in short polls while the page loads. With PAGE_LOAD_STRATEGY=none
+navigation returns at once, the redirect is seen mid-load and the Services
+page is never rendered; with 'eager' or 'normal' the verdict is read as
+soon as Chrome hands the page back, skipping the readiness wait and DOM
+analysis.
+"""
+
+import json
+import time
+import logging
+from urllib.parse import urljoin
+
+from http_probe import classify_probe_response
+
+logger = logging.getLogger(__name__)
+
+PERFORMANCE_LOG = 'performance'
+
+# Checks in a row without any booking response in the log before the watch
+# gives up (log not enabled on this driver) instead of waiting on every check
+MAX_MISSES = 3
+
+# After a blocking navigation ('eager'/'normal') the headers are already in; allow for log lag only
+SETTLED_GRACE = 0.5
+
+
+def enable_network_log(chrome_options):
+    """Have Chrome record Network events (and nothing else) in the performance log."""
+    chrome_options.set_capability('goog:loggingPrefs', {PERFORMANCE_LOG: 'ALL'})
+    chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+
+
+def header(headers, name):
+    """Case-insensitive header lookup (HTTP/2 headers arrive lowercased)."""
+    name = name.lower()
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return ''
+
+
+class DocumentResponse:
+    """Status and Location of the booking request, as Chrome received them."""
+
+    def __init__(self, url, status, location='', elapsed=0.0):
+        self.url = url
+        self.status = status
+        self.location = location
+        self.elapsed = elapsed
+
+    def verdict(self, booking_path):
+        """The same verdicts as the HTTP probe (http_probe.PROBE_*)."""
+        return classify_probe_response(self.status, self.location, booking_path)
+
+    def __repr__(self):
+        return f"DocumentResponse(status={self.status!r}, location={self.location!r})"
+
+
+class NetworkWatch:
+    """Follows the booking document request through the driver's performance log."""
+
+    def __init__(self, driver, poll_interval=0.05):
+        self.driver = driver
+        self.poll_interval = poll_interval
+        self.available = True
+        self.misses = 0
+
+    def entries(self):
+        """New performance log entries; turns the watch off if the log isn't there."""
+        try:
+            return self.driver.get_log(PERFORMANCE_LOG)
+        except Exception as e:
+            logger.warning(f"⚠️ Network events unavailable ({str(e)}) - using page detection only")
+            self.available = False
+            return []
+
+    def begin(self):
+        """Drop events from earlier pages - call just before navigating."""
+        if self.available:
+            self.entries()
+
+    def booking_response(self, booking_path, timeout):
+        """Wait for the first response to the booking request.
+
+        Returns a DocumentResponse as soon as its headers are in the log
+        (for a redirect, the hop away from the booking URL), or None when
+        none arrived within timeout.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        booking_path = booking_path.lower()
+        request_id = None
+        while self.available:
+            for entry in self.entries():
+                try:
+                    message = json.loads(entry['message'])['message']
+                except (KeyError, TypeError, ValueError):
+                    continue
+                method = message.get('method')
+                params = message.get('params', {})
+                if method == 'Network.requestWillBeSent' and params.get('type') == 'Document':
+                    redirect = params.get('redirectResponse')
+                    if redirect and params.get('requestId') == request_id:
+                        # The booking request was answered with a 3xx - params.request is the next hop
+                        location = header(redirect.get('headers'), 'location') or params['request']['url']
+                        self.misses = 0
+                        return DocumentResponse(redirect.get('url', ''), redirect.get('status'),
+                                                urljoin(redirect.get('url', ''), location),
+                                                time.monotonic() - start)
+                    if request_id is None and booking_path in params.get('request', {}).get('url', '').lower():
+                        request_id = params.get('requestId')
+                elif method == 'Network.responseReceived' and params.get('requestId') == request_id \
+                        and request_id is not None:
+                    response = params.get('response', {})
+                    self.misses = 0
+                    return DocumentResponse(response.get('url', ''), response.get('status'),
+                                            elapsed=time.monotonic() - start)
+            if time.monotonic() >= deadline:
+                logger.debug("🛰️ No network response for the booking request within %.1fs", timeout)
+                self.misses += 1
+                if self.misses >= MAX_MISSES:
+                    logger.warning(f"⚠️ No network events in {self.misses} checks - using page detection only")
+                    self.available = False
+                return None
+            time.sleep(self.poll_interval)
+        return None
+
+    def stop_loading(self):
+        """Abort the page the redirect leads to - its content isn't needed."""
+        try:
+            self.driver.execute_cdp_cmd('Page.stopLoading', {})
+        except Exception:
+            pass  # Already loaded or not a Chromium driver - nothing to abort
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Notification Pipeline - Parallel Fan-Out with Per-Channel Deadlines
+
+Every alert fires on all configured channels at once, each under its own
+timeout, so one slow channel never holds up the others. A per-alert report
+records which channel delivered first and how long each one took.
+
+Channels (NOTIFY_CHANNELS, comma-separated):
+    email    - HTML email through the warm SMTP notifier
+    desktop  - macOS osascript or Linux notify-send popup
+    bell     - terminal bell plus a banner on stdout
+    webhook  - JSON POST to WEBHOOK_URL
+    file     - JSON line appended to NOTIFY_FILE (or sent to NOTIFY_SOCKET)
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import shutil
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNELS = 'email,desktop'
+# email: long enough for two full attempts on the primary SMTP server and two on the fallback
+DEFAULT_CHANNEL_TIMEOUTS = {'email': 90, 'desktop': 10, 'bell': 2, 'webhook': 10, 'file': 5}
+
+
+class Alert:
+    """One thing a human should hear about."""
+
+    def __init__(self, title, message, target=None, slots_available=True):
+        self.title = title
+        self.message = message
+        self.target = target
+        self.slots_available = slots_available
+        self.created_at = time.monotonic()
+        self.timestamp = datetime.now()
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'message': self.message,
+            'slots_available': self.slots_available,
+            'target': self.target.label if self.target else None,
+            'service_id': self.target.service_id if self.target else None,
+            'booking_url': self.target.booking_url if self.target else None,
+            'timestamp': self.timestamp.isoformat(timespec='seconds'),
+        }
+
+
+class ChannelResult:
+    """How one channel handled one alert."""
+
+    def __init__(self, channel, success, elapsed, error=None):
+        self.channel = channel
+        self.success = success
+        self.elapsed = elapsed
+        self.error = error
+
+
+class NotificationReport:
+    """Per-alert delivery report across all channels."""
+
+    def __init__(self, alert, results):
+        self.alert = alert
+        self.results = results
+
+    @property
+    def delivered(self):
+        return any(result.success for result in self.results)
+
+    @property
+    def first_delivered(self):
+        successes = [result for result in self.results if result.success]
+        return min(successes, key=lambda result: result.elapsed) if successes else None
+
+    def summary(self):
+        parts = []
+        for result in sorted(self.results, key=lambda result: result.elapsed):
+            status = "✅" if result.success else f"❌ {result.error}"
+            parts.append(f"{result.channel} {status} {result.elapsed:.2f}s")
+        return "; ".join(parts)
+
+
+class NotificationChannel:
+    """Base class: deliver() raises on failure."""
+
+    name = 'channel'
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    async def deliver(self, alert, executor):
+        raise NotImplementedError
+
+
+class EmailChannel(NotificationChannel):
+    """Sends the monitor's HTML email through its SMTP notifier."""
+
+    name = 'email'
+
+    def __init__(self, timeout, send_alert):
+        super().__init__(timeout)
+        self.send_alert = send_alert
+
+    async def deliver(self, alert, executor):
+        loop = asyncio.get_running_loop()
+        sent = await loop.run_in_executor(executor, self.send_alert, alert.slots_available, alert.target)
+        if not sent:
+            raise RuntimeError("email not sent")
+
+
+class DesktopChannel(NotificationChannel):
+    """macOS notification centre or Linux notify-send."""
+
+    name = 'desktop'
+
+    @staticmethod
+    def applescript_string(text):
+        """text as an AppleScript string literal - target names come from config files."""
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+    def command(self, alert):
+        if sys.platform == 'darwin':
+            script = (f"display notification {self.applescript_string(alert.message)} "
+                      f"with title {self.applescript_string(alert.title)}")
+            return ['osascript', '-e', script]
+        if shutil.which('notify-send'):
+            return ['notify-send', '--urgency=critical', alert.title, alert.message]
+        return None
+
+    async def deliver(self, alert, executor):
+        command = self.command(alert)
+        if not command:
+            print('\a' * 5)  # System beep fallback
+            raise RuntimeError("no desktop notifier available")
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            returncode = await process.wait()
+        except asyncio.CancelledError:
+            # Timed out (or shutting down) - don't leave the notifier process behind
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        if returncode != 0:
+            raise RuntimeError(f"{command[0]} exited with {returncode}")
+
+
+class BellChannel(NotificationChannel):
+    """Terminal bell and a banner on stdout."""
+
+    name = 'bell'
+
+    async def deliver(self, alert, executor):
+        print('\a' * 5)
+        print("\n" + "=" * 60)
+        print(f"{alert.title}")
+        print(f"{alert.message}")
+        print("=" * 60 + "\n")
+        sys.stdout.flush()
+
+
+class WebhookChannel(NotificationChannel):
+    """POSTs the alert as JSON to a generic webhook."""
+
+    name = 'webhook'
+
+    def __init__(self, timeout, url):
+        super().__init__(timeout)
+        self.url = url
+
+    def _post(self, payload):
+        import urllib.request
+
+        request = urllib.request.Request(
+            self.url, data=payload, headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"HTTP {response.status}")
+
+    async def deliver(self, alert, executor):
+        payload = json.dumps(alert.to_dict()).encode('utf-8')
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, self._post, payload)
+
+
+class FileSinkChannel(NotificationChannel):
+    """Appends a JSON line to a local file or sends it to a Unix socket."""
+
+    name = 'file'
+
+    def __init__(self, timeout, path=None, socket_path=None):
+        super().__init__(timeout)
+        self.path = path
+        self.socket_path = socket_path
+
+    def _write(self, line):
+        if self.socket_path:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sink:
+                sink.settimeout(self.timeout)
+                sink.connect(self.socket_path)
+                sink.sendall(line)
+        else:
+            with open(self.path, 'ab') as sink:
+                sink.write(line)
+
+    async def deliver(self, alert, executor):
+        line = (json.dumps(alert.to_dict()) + "\n").encode('utf-8')
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, self._write, line)
+
+
+class NotificationPipeline:
+    """Fans an alert out to every channel concurrently."""
+
+    def __init__(self, channels, max_workers=4):
+        self.channels = channels
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='channel')
+        self.reports = []
+
+    @classmethod
+    def from_env(cls, send_alert):
+        """Build the channels listed in NOTIFY_CHANNELS."""
+        names = [name.strip().lower() for name in os.getenv('NOTIFY_CHANNELS', DEFAULT_CHANNELS).split(',') if name.strip()]
+        channels = []
+        for name in names:
+            timeout = float(os.getenv(f'NOTIFY_TIMEOUT_{name.upper()}', DEFAULT_CHANNEL_TIMEOUTS.get(name, 10)))
+            if name == 'email':
+                channels.append(EmailChannel(timeout, send_alert))
+            elif name == 'desktop':
+                channels.append(DesktopChannel(timeout))
+            elif name == 'bell':
+                channels.append(BellChannel(timeout))
+            elif name == 'webhook':
+                url = os.getenv('WEBHOOK_URL')
+                if url:
+                    channels.append(WebhookChannel(timeout, url))
+                else:
+                    logger.warning("⚠️ webhook channel enabled but WEBHOOK_URL is not set - skipping")
+            elif name == 'file':
+                channels.append(FileSinkChannel(
+                    timeout, path=os.getenv('NOTIFY_FILE', 'alerts.jsonl'), socket_path=os.getenv('NOTIFY_SOCKET')
+                ))
+            else:
+                logger.warning(f"⚠️ Unknown notification channel '{name}' - skipping")
+        return cls(channels)
+
+    async def _run_channel(self, channel, alert):
+        start = alert.created_at
+        try:
+            await asyncio.wait_for(channel.deliver(alert, self.executor), channel.timeout)
+            return ChannelResult(channel.name, True, time.monotonic() - start)
+        except asyncio.TimeoutError:
+            return ChannelResult(channel.name, False, time.monotonic() - start, f"timeout after {channel.timeout:.0f}s")
+        except Exception as e:
+            return ChannelResult(channel.name, False, time.monotonic() - start, str(e))
+
+    async def dispatch(self, alert):
+        """Deliver alert on all channels at once; returns a NotificationReport."""
+        results = await asyncio.gather(*(self._run_channel(channel, alert) for channel in self.channels))
+        report = NotificationReport(alert, list(results))
+        self.reports.append(report)
+        del self.reports[:-100]
+
+        first = report.first_delivered
+        if first:
+            logger.info(f"📣 Alert reached a human via {first.channel} first ({first.elapsed:.2f}s) - {report.summary()}")
+        else:
+            logger.error(f"❌ Alert was not delivered on any channel - {report.summary()}")
+        return report
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Page Readiness - Event-Driven Waits
+
+Replaces fixed sleeps with predicate waits that return as soon as the page
+outcome is known. Every predicate is a small JavaScript expression, so a
+combined "any of" wait costs one execute_script per poll, and every wait
+records how long it took.
+"""
+
+import json
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+PAGE_LOAD_STRATEGIES = ('normal', 'eager', 'none')
+
+# Set on the outgoing document before navigating so a stale page from the
+# previous check can never satisfy a predicate (matters with 'none')
+STALE_MARKER = "window.__visaMonitorStale"
+
+
+class ReadinessCondition:
+    """A named JavaScript predicate evaluated in the page."""
+
+    def __init__(self, name, expression):
+        self.name = name
+        self.expression = expression
+
+    def script(self):
+        return f"return !{STALE_MARKER} && !!({self.expression});"
+
+    def __repr__(self):
+        return f"ReadinessCondition({self.name!r})"
+
+
+def url_left(fragment):
+    """The browser is no longer on a URL containing fragment."""
+    return ReadinessCondition(
+        f"url left {fragment}",
+        f"!window.location.href.toLowerCase().includes({json.dumps(fragment.lower())})"
+    )
+
+
+def form_present():
+    """A form with inputs has been parsed."""
+    return ReadinessCondition(
+        "form present",
+        "document.readyState !== 'loading' && document.querySelector('form input') !== null"
+    )
+
+
+def document_complete():
+    """document.readyState is complete."""
+    return ReadinessCondition("document complete", "document.readyState === 'complete'")
+
+
+def document_interactive():
+    """The DOM has been parsed (DOMContentLoaded)."""
+    return ReadinessCondition("document interactive", "document.readyState !== 'loading'")
+
+
+def services_rendered():
+    """The services list (or its booking links) has been rendered."""
+    return ReadinessCondition(
+        "services list rendered",
+        "document.querySelector(\"a[href*='/Services/Booking/'], table tbody tr\") !== null"
+    )
+
+
+def login_form_present():
+    """A login form with a password field is on the page."""
+    return ReadinessCondition("login form present", "document.querySelector(\"input[type='password']\") !== null")
+
+
+def any_of(*conditions):
+    """Satisfied when any of the given conditions is."""
+    return ReadinessCondition(
+        " | ".join(condition.name for condition in conditions),
+        " || ".join(f"({condition.expression})" for condition in conditions)
+    )
+
+
+class WaitTiming:
+    """How long one readiness wait took."""
+
+    def __init__(self, name, elapsed, satisfied):
+        self.name = name
+        self.elapsed = elapsed
+        self.satisfied = satisfied
+        self.timestamp = time.time()
+
+
+class PageReadiness:
+    """Navigate and wait on page predicates, recording each wait."""
+
+    def __init__(self, driver, poll_interval=0.1, history_size=500):
+        self.driver = driver
+        self.poll_interval = poll_interval
+        self.timings = deque(maxlen=history_size)
+
+    def navigate(self, url):
+        """Mark the current document stale, then start navigating to url."""
+        try:
+            self.driver.execute_script(f"{STALE_MARKER} = true;")
+        except Exception:
+            pass  # about:blank or a crashed page - nothing to mark
+        self.driver.get(url)
+
+    def refresh(self):
+        """Mark the current document stale, then reload it."""
+        try:
+            self.driver.execute_script(f"{STALE_MARKER} = true;")
+        except Exception:
+            pass
+        self.driver.refresh()
+
+    def wait_for(self, condition, timeout):
+        """Poll condition until it holds or timeout expires.
+
+        Returns True when the condition was met. The elapsed time is
+        recorded either way.
+        """
+        script = condition.script()
+        start = time.monotonic()
+        deadline = start + timeout
+        satisfied = False
+        while True:
+            try:
+                if self.driver.execute_script(script):
+                    satisfied = True
+                    break
+            except Exception:
+                pass  # Page is mid-navigation - try again on the next poll
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(self.poll_interval)
+
+        elapsed = time.monotonic() - start
+        self.timings.append(WaitTiming(condition.name, elapsed, satisfied))
+        if satisfied:
+            logger.debug("⏱️ Ready (%s) in %.2fs", condition.name, elapsed)
+        else:
+            logger.warning(f"⏱️ Timed out after {elapsed:.1f}s waiting for: {condition.name}")
+        return satisfied
+
+    def summary(self):
+        """Return count, mean and max wait time per condition name."""
+        stats = {}
+        for timing in self.timings:
+            entry = stats.setdefault(timing.name, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            entry['count'] += 1
+            entry['total'] += timing.elapsed
+            entry['max'] = max(entry['max'], timing.elapsed)
+            if not timing.satisfied:
+                entry['timeouts'] += 1
+        for entry in stats.values():
+            entry['mean'] = entry['total'] / entry['count']
+        return stats
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Prenotami Stand-in - A Local Imitation of the Booking Site
+
+Serves the few pages the monitor cares about, built from the saved pages in
+fixtures/pages, so the whole check loop can run without touching the real
+site (see simulate_monitor.py, or point PRENOTAMI_URL at it):
+
+- /Home/Login          - login form; posting it starts a session
+                         (.AspNetCore.Cookies) and redirects to ReturnUrl
+- /Services            - services list, or a redirect to the login page
+- /Services/Booking/ID - redirect to /Services while closed, the booking
+                         form while open, a maintenance page during
+                         maintenance - following the scenario
+- sessions end after --session-idle seconds without a request and after
+  --session-lifetime seconds in any case
+- --slow-rate of the responses are held back --slow-seconds
+
+The scenario is a list of windows, in seconds since the server started,
+that apply to every service:
+
+    [{"at": 30, "for": 20, "state": "open"}, {"at": 300, "for": 60, "state": "maintenance"}]
+
+or randomly generated (--open-every / --maintenance-every, seeded).
+
+Usage:
+    python3 prenotami_standin.py --port 8770 --open-every 120 --open-seconds 20
+    PRENOTAMI_URL=http://127.0.0.1:8770 python3 start_monitor.py run
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs, quote
+
+DEFAULT_PORT = 8770
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+SESSION_COOKIE = '.AspNetCore.Cookies'
+
+CLOSED = 'closed'
+OPEN = 'open'
+MAINTENANCE = 'maintenance'
+
+HOME_PAGE = """<!DOCTYPE html>
+<html lang="it">
+<head><meta charset="utf-8"><title>Prenot@Mi</title></head>
+<body><div class="container"><h1>Prenot@Mi</h1><a href="/Home/Login">Accedi</a></div></body>
+</html>
+"""
+
+
+class Scenario:
+    """When the booking pages are open or under maintenance; closed the rest of the time."""
+
+    def __init__(self, windows=(), open_every=0.0, open_seconds=20.0,
+                 maintenance_every=0.0, maintenance_seconds=60.0, seed=None):
+        self.windows = sorted((float(start), float(end), state) for start, end, state in windows)
+        self.generators = []
+        self.generated_until = 0.0
+        rng = random.Random(seed)
+        if open_every > 0:
+            self.generators.append([OPEN, open_every, open_seconds, random.Random(rng.random()), 0.0])
+        if maintenance_every > 0:
+            self.generators.append([MAINTENANCE, maintenance_every, maintenance_seconds, random.Random(rng.random()), 0.0])
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+        windows = []
+        for entry in entries:
+            state = entry.get('state', OPEN)
+            if state not in (OPEN, MAINTENANCE):
+                raise ValueError(f"window state must be {OPEN!r} or {MAINTENANCE!r} (got {state!r})")
+            windows.append((entry['at'], entry['at'] + entry['for'], state))
+        return cls(windows)
+
+    def _generate(self, until):
+        """Extend the random windows to cover until (exponential gaps, so openings come at any time)."""
+        if not self.generators or until <= self.generated_until:
+            return
+        for generator in self.generators:
+            state, every, seconds, rng, cursor = generator
+            while cursor <= until:
+                start = cursor + rng.expovariate(1.0 / every)
+                self.windows.append((start, start + seconds, state))
+                cursor = start + seconds
+            generator[4] = cursor
+        self.windows.sort()
+        self.generated_until = until
+
+    def windows_until(self, until):
+        """[(start, end, state)] of every window starting before until."""
+        with self.lock:
+            self._generate(until)
+            return [window for window in self.windows if window[0] < until]
+
+    def state_at(self, elapsed):
+        # Maintenance wins over an opening that overlaps it
+        states = {state for start, end, state in self.windows_until(elapsed + 1) if start <= elapsed < end}
+        if MAINTENANCE in states:
+            return MAINTENANCE
+        return OPEN if OPEN in states else CLOSED
+
+
+class StandinSite:
+    """Sessions, scenario and request counters behind the stand-in's pages."""
+
+    def __init__(self, scenario=None, session_idle=1200.0, session_lifetime=0.0,
+                 slow_rate=0.0, slow_seconds=2.0, seed=None, fixture_dir=FIXTURE_DIR):
+        self.scenario = scenario or Scenario()
+        self.session_idle = session_idle
+        self.session_lifetime = session_lifetime
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.rng = random.Random(seed)
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.sessions = {}  # token -> [created, last request]
+        self.counts = {}
+        self.pages = {}
+        for name in ('login_page', 'services_redirect', 'booking_form', 'maintenance'):
+            with open(os.path.join(fixture_dir, f"{name}.html"), encoding='utf-8') as f:
+                self.pages[name] = f.read()
+
+    def elapsed(self):
+        """Seconds since the site started - the scenario's clock."""
+        return time.monotonic() - self.started
+
+    def count(self, what):
+        with self.lock:
+            self.counts[what] = self.counts.get(what, 0) + 1
+
+    def start_session(self):
+        token = secrets.token_urlsafe(24)
+        now = time.monotonic()
+        with self.lock:
+            self.sessions[token] = [now, now]
+        self.count('logins')
+        return token
+
+    def end_session(self, token):
+        with self.lock:
+            self.sessions.pop(token, None)
+
+    def authenticated(self, token):
+        """True if token is a live session; touches it, like the real site's sliding expiry."""
+        now = time.monotonic()
+        with self.lock:
+            session = self.sessions.get(token)
+            if session is None:
+                return False
+            created, last = session
+            if now - last > self.session_idle or (self.session_lifetime and now - created > self.session_lifetime):
+                del self.sessions[token]
+                self.counts['sessions_expired'] = self.counts.get('sessions_expired', 0) + 1
+                return False
+            session[1] = now
+            return True
+
+    def delay(self):
+        """Seconds to hold this response back (a slow response now and then)."""
+        if self.slow_rate and self.rng.random() < self.slow_rate:
+            self.count('slow_responses')
+            return self.slow_seconds
+        return 0.0
+
+    def booking_page(self, service_id):
+        return self.pages['booking_form'].replace('4755', service_id)
+
+
+def make_handler(site):
+    from http.server import BaseHTTPRequestHandler
+
+    class StandinHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _session(self):
+            for part in self.headers.get('Cookie', '').split(';'):
+                name, _, value = part.strip().partition('=')
+                if name == SESSION_COOKIE:
+                    return value
+            return None
+
+        def _send(self, status, body='', headers=(), content_type='text/html; charset=utf-8'):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _redirect(self, location, headers=()):
+            self._send(302, headers=[('Location', location)] + list(headers))
+
+        def _login_redirect(self, path):
+            self._redirect(f"/Home/Login?ReturnUrl={quote(path, safe='')}")
+
+        def do_GET(self):
+            time.sleep(site.delay())
+            url = urlsplit(self.path)
+            path = url.path.rstrip('/') or '/'
+            lowered = path.lower()
+            site.count('requests')
+
+            if lowered == '/':
+                self._send(200, HOME_PAGE)
+            elif lowered == '/home/login':
+                self._send(200, site.pages['login_page'])
+            elif lowered == '/home/logout':
+                site.end_session(self._session())
+                self._redirect('/Home/Login', [('Set-Cookie', f"{SESSION_COOKIE}=; Path=/; Max-Age=0")])
+            elif lowered.startswith('/content/'):
+                self._send(200, '', content_type='text/css')
+            elif not lowered.startswith('/services'):
+                self._send(404, 'Not found', content_type='text/plain')
+            elif not site.authenticated(self._session()):
+                site.count('login_redirects')
+                self._login_redirect(path)
+            elif lowered == '/services':
+                site.count('services_pages')
+                self._send(200, site.pages['services_redirect'])
+            elif lowered.startswith('/services/booking/'):
+                service_id = path.rsplit('/', 1)[1]
+                state = site.scenario.state_at(site.elapsed())
+                site.count(f"booking_{state}")
+                if state == OPEN:
+                    self._send(200, site.booking_page(service_id))
+                elif state == MAINTENANCE:
+                    self._send(503, site.pages['maintenance'])
+                else:
+                    self._redirect('/Services')
+            else:
+                self._send(404, 'Not found', content_type='text/plain')
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            form = parse_qs(self.rfile.read(length).decode('utf-8'))
+            url = urlsplit(self.path)
+            if url.path.rstrip('/').lower() != '/home/login':
+                self._send(404, 'Not found', content_type='text/plain')
+                return
+            if not form.get('Email') or not form.get('Password'):
+                self._send(200, site.pages['login_page'])
+                return
+            token = site.start_session()
+            target = parse_qs(url.query).get('ReturnUrl', ['/Services'])[0]
+            self._redirect(target if target.startswith('/') else '/Services',
+                           [('Set-Cookie', f"{SESSION_COOKIE}={token}; Path=/; HttpOnly")])
+
+        def log_message(self, format, *args):
+            pass  # Thousands of simulated checks would flood the terminal
+
+    return StandinHandler
+
+
+class StandinServer:
+    """The stand-in on a background thread, for the simulator and benchmarks."""
+
+    def __init__(self, site, host='127.0.0.1', port=0):
+        from http.server import ThreadingHTTPServer
+
+        self.site = site
+        self.server = ThreadingHTTPServer((host, port), make_handler(site))
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='prenotami-standin', daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_site_arguments(parser):
+    """Scenario and site behaviour options, shared with simulate_monitor.py."""
+    parser.add_argument('--scenario', help="JSON list of {at, for, state} windows instead of random ones")
+    parser.add_argument('--open-every', type=float, default=120, help="mean seconds between openings (random scenario)")
+    parser.add_argument('--open-seconds', type=float, default=20, help="how long each opening lasts")
+    parser.add_argument('--maintenance-every', type=float, default=0, help="mean seconds between maintenance windows (0 = none)")
+    parser.add_argument('--maintenance-seconds', type=float, default=30)
+    parser.add_argument('--session-idle', type=float, default=1200, help="seconds without a request before a session ends")
+    parser.add_argument('--session-lifetime', type=float, default=0, help="seconds before any session ends (0 = never)")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="fraction of responses held back")
+    parser.add_argument('--slow-seconds', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=None, help="seed for the random scenario and slow responses")
+
+
+def site_from_args(args):
+    if args.scenario:
+        scenario = Scenario.from_file(args.scenario)
+    else:
+        scenario = Scenario(open_every=args.open_every, open_seconds=args.open_seconds,
+                            maintenance_every=args.maintenance_every,
+                            maintenance_seconds=args.maintenance_seconds, seed=args.seed)
+    return StandinSite(scenario, session_idle=args.session_idle, session_lifetime=args.session_lifetime,
+                       slow_rate=args.slow_rate, slow_seconds=args.slow_seconds, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for prenotami.esteri.it")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        site = site_from_args(args)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Invalid scenario: {e}")
+        return 1
+    server = StandinServer(site, args.host, args.port)
+    print(f"🧪 Prenotami stand-in on {server.url} - log in with any email and password")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+        print(f"📊 Requests: {json.dumps(site.counts, sort_keys=True)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Process Memory - Chrome Process Tree RSS
+
+Finds the Chrome processes that belong to a WebDriver session (chromedriver
+and all its descendants) and reports their resident memory, split into
+browser, renderer and other helper processes. Uses psutil when it is
+installed and falls back to /proc on Linux.
+"""
+
+import os
+
+try:
+    import psutil
+except ImportError:  # Optional - /proc is enough on Linux
+    psutil = None
+
+
+def _proc_children_map():
+    """Map parent pid -> child pids by scanning /proc."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read().decode('utf-8', 'replace')
+            # Fields after the ")" that closes the command name: state, ppid, ...
+            ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _proc_rss(pid):
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _proc_cmdline(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+
+def process_tree(root_pid):
+    """Return [(pid, rss_bytes, cmdline)] for root_pid and all descendants."""
+    if psutil is not None:
+        try:
+            root = psutil.Process(root_pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return []
+        tree = []
+        for process in processes:
+            try:
+                tree.append((process.pid, process.memory_info().rss, ' '.join(process.cmdline())))
+            except psutil.Error:
+                continue
+        return tree
+
+    if not os.path.isdir('/proc'):
+        return []
+    children = _proc_children_map()
+    tree = []
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        tree.append((pid, _proc_rss(pid), _proc_cmdline(pid)))
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+class MemorySample:
+    """RSS of one WebDriver session's process tree, in bytes."""
+
+    def __init__(self, browser=0, renderers=0, other=0, renderer_count=0):
+        self.browser = browser
+        self.renderers = renderers
+        self.other = other
+        self.renderer_count = renderer_count
+
+    @property
+    def total(self):
+        return self.browser + self.renderers + self.other
+
+    def __repr__(self):
+        return (f"MemorySample(total={self.total / 2**20:.0f}MB, browser={self.browser / 2**20:.0f}MB, "
+                f"renderers={self.renderers / 2**20:.0f}MB x{self.renderer_count})")
+
+
+def driver_memory(driver):
+    """Sample the RSS of the Chrome processes started for driver."""
+    try:
+        root_pid = driver.service.process.pid
+    except AttributeError:
+        return None
+    tree = process_tree(root_pid)
+    if not tree:
+        return None
+
+    sample = MemorySample()
+    for pid, rss, cmdline in tree:
+        if pid == root_pid:
+            sample.other += rss  # chromedriver itself
+        elif '--type=renderer' in cmdline:
+            sample.renderers += rss
+            sample.renderer_count += 1
+        elif '--type=' in cmdline:
+            sample.other += rss  # GPU, network and utility helpers
+        else:
+            sample.browser += rss
+    return sample
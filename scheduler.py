@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Adaptive Scheduler - Spend a Fixed Request Budget Where Slots Appear
+
+With a flat CHECK_INTERVAL most requests land in hours when slots never
+show up. The adaptive scheduler takes a daily budget of checks (all targets
+together) and shares it out over the 24 hours of the day by weight:
+
+- every hour gets a base weight of 1
+- configured release windows (RELEASE_WINDOWS, e.g. "15:00-16:00,22:00-23:00"
+  in RELEASE_WINDOWS_TZ) add RELEASE_WINDOW_WEIGHT
+- hours in which the check history actually saw slots add up to
+  HISTORY_WEIGHT, in proportion to their sighting rate
+
+Checks are shared out in proportion to the square root of the weight: that
+split minimises the expected time from a release to the next check for a
+fixed total (proportional shares give exactly the flat expectation). Each
+hour's share is clamped between MAX_CHECK_INTERVAL and
+MIN_CHECK_INTERVAL per target and CHECK_BUDGET_PER_HOUR, with the surplus
+redistributed, so the total never exceeds the budget. Within the plan each
+target's share follows its configured interval. The delay to a target's
+next check integrates the hourly rate, so checks speed up right at the
+start of a release window instead of one slow interval later.
+
+Enabled by setting CHECK_BUDGET_PER_DAY; without it every target keeps its
+flat interval.
+"""
+
+import os
+import math
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+HOURS = 24
+
+
+def parse_windows(spec):
+    """'15:00-16:00, 22:00-23:30' -> [((15, 0), (16, 0)), ((22, 0), (23, 30))]."""
+    windows = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        start, _, end = item.partition('-')
+        start_h, _, start_m = start.strip().partition(':')
+        end_h, _, end_m = end.strip().partition(':')
+        windows.append(((int(start_h), int(start_m or 0)), (int(end_h), int(end_m or 0))))
+    return windows
+
+
+def window_hours(windows, tz_name=None, day=None):
+    """Local hours (0-23) touched by windows given in tz_name, for day (default today)."""
+    local_now = day or datetime.now().astimezone()
+    tz = None
+    if tz_name:
+        from zoneinfo import ZoneInfo
+        tz = ZoneInfo(tz_name)
+    hours = set()
+    for (start_h, start_m), (end_h, end_m) in windows:
+        base = local_now.astimezone(tz) if tz else local_now
+        start = base.replace(hour=start_h, minute=start_m, second=0, microsecond=0)
+        end = base.replace(hour=end_h % 24, minute=end_m, second=0, microsecond=0)
+        if end <= start:
+            end += timedelta(days=1)  # Window crosses midnight
+        moment = start
+        while moment < end:
+            hours.add(moment.astimezone(local_now.tzinfo).hour)
+            moment = (moment + timedelta(hours=1)).replace(minute=0)
+    return hours
+
+
+class HourlyPlan:
+    """Checks per hour of the day, for all targets together."""
+
+    def __init__(self, checks, weights):
+        self.checks = checks
+        self.weights = weights
+
+    @property
+    def total(self):
+        return sum(self.checks)
+
+    def interval(self, hour, share=1.0):
+        """Average seconds between checks of one target with budget share `share` in hour."""
+        per_hour = self.checks[hour] * share
+        return 3600 / per_hour if per_hour else float('inf')
+
+    def expected_delay(self, share=1.0):
+        """Mean wait from a slot release to the next check, weighted like the plan (seconds)."""
+        weight_sum = sum(self.weights)
+        return sum(weight * self.interval(hour, share) / 2 for hour, weight in enumerate(self.weights)) / weight_sum
+
+
+def allocate(budget, weights, floor, cap):
+    """Share budget over the hours by sqrt(weight), clamped to [floor, cap] per hour (water-filling).
+
+    Every hour gets clamp(scale * sqrt(weight), floor, cap); the total only
+    grows with scale, so the largest scale that fits the budget is found by
+    bisection and the plan never exceeds it:
+
+    >>> weights = [1, 1, 1, 1, 1, 1, 9, 17, 1, 17, 17, 1, 1, 1, 1, 3, 1, 17, 1, 1, 1, 1, 1, 1]
+    >>> sum(allocate(115.44, weights, 4.0, 12.0)) <= 115.44
+    True
+    >>> sum(allocate(716.02, weights, 30.0, 60)) <= 716.02
+    True
+    """
+    weights = [math.sqrt(weight) for weight in weights]
+    floor = min(floor, cap, budget / HOURS)
+
+    def plan(scale):
+        return [min(max(scale * weight, floor), cap) for weight in weights]
+
+    if HOURS * cap <= budget:
+        return [cap] * HOURS
+    low, high = 0.0, cap / max(min(weights), 1e-9)  # At high every hour is at its cap
+    for _ in range(100):
+        middle = (low + high) / 2
+        if sum(plan(middle)) <= budget:
+            low = middle
+        else:
+            high = middle
+    checks = plan(low)
+    assert sum(checks) <= budget * (1 + 1e-9), "hourly plan exceeds the daily budget"
+    return checks
+
+
+class AdaptiveScheduler:
+    """Plans check intervals from a daily budget and release-window weights."""
+
+    def __init__(self, daily_budget, hourly_cap=None, min_interval=120, max_interval=3600,
+                 windows=None, windows_tz=None, window_weight=8.0, history=None, history_weight=8.0,
+                 history_days=60, min_sightings=10):
+        self.daily_budget = daily_budget
+        self.hourly_cap = hourly_cap
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.windows = windows or []
+        self.windows_tz = windows_tz
+        self.window_weight = window_weight
+        self.history = history
+        self.history_weight = history_weight
+        self.history_days = history_days
+        self.min_sightings = min_sightings
+        self.plan = None
+        self.plan_date = None
+        self.shares = {}
+
+    @classmethod
+    def from_env(cls, history=None):
+        """Scheduler configured from .env, or None when CHECK_BUDGET_PER_DAY is unset."""
+        budget = os.getenv('CHECK_BUDGET_PER_DAY')
+        if not budget:
+            return None
+        hourly_cap = os.getenv('CHECK_BUDGET_PER_HOUR')
+        return cls(
+            float(budget),
+            hourly_cap=float(hourly_cap) if hourly_cap else None,
+            min_interval=float(os.getenv('MIN_CHECK_INTERVAL', 120)),
+            max_interval=float(os.getenv('MAX_CHECK_INTERVAL', 3600)),
+            windows=parse_windows(os.getenv('RELEASE_WINDOWS', '')),
+            windows_tz=os.getenv('RELEASE_WINDOWS_TZ') or None,
+            window_weight=float(os.getenv('RELEASE_WINDOW_WEIGHT', 8)),
+            history=history,
+            history_weight=float(os.getenv('HISTORY_WEIGHT', 8)),
+            history_days=float(os.getenv('HISTORY_DAYS', 60)),
+        )
+
+    def weights(self):
+        """Relative weight of each local hour of the day."""
+        weights = [1.0] * HOURS
+        for hour in window_hours(self.windows, self.windows_tz):
+            weights[hour] += self.window_weight
+
+        if self.history and self.history_weight:
+            sightings, _ = self.history.heatmap(self.history_days)
+            if sum(map(sum, sightings)) >= self.min_sightings:
+                rates = self.history.hourly_rates(self.history_days)
+                peak = max(rates.values(), default=0)
+                for hour, rate in rates.items():
+                    if peak:
+                        weights[hour] += self.history_weight * rate / peak
+        return weights
+
+    def replan(self, targets):
+        """Rebuild the hourly plan (once a day, or when the targets change)."""
+        # Targets share the budget in proportion to their configured check rate
+        rates = {target.key: 1 / target.check_interval for target in targets}
+        rate_sum = sum(rates.values())
+        self.shares = {key: rate / rate_sum for key, rate in rates.items()}
+
+        floor = len(targets) * 3600 / self.max_interval
+        cap = len(targets) * 3600 / self.min_interval
+        if self.hourly_cap:
+            cap = min(cap, self.hourly_cap)
+        weights = self.weights()
+        self.plan = HourlyPlan(allocate(self.daily_budget, weights, floor, cap), weights)
+        self.plan_date = datetime.now().date()
+
+        busiest = max(range(HOURS), key=lambda hour: self.plan.checks[hour])
+        quietest = min(range(HOURS), key=lambda hour: self.plan.checks[hour])
+        flat = HourlyPlan([self.plan.total / HOURS] * HOURS, weights)
+        logger.info(
+            f"🗓️ Check plan: {self.plan.total:.0f} checks/day for {len(targets)} target(s) - "
+            f"{self.plan.checks[busiest]:.0f}/h at {busiest:02d}:00, {self.plan.checks[quietest]:.0f}/h at {quietest:02d}:00; "
+            f"expected detection delay {self.plan.expected_delay() / 60:.1f} min (flat: {flat.expected_delay() / 60:.1f} min)"
+        )
+        return self.plan
+
+    def stale(self, targets, now):
+        return (self.plan is None or self.plan_date != now.date()
+                or set(self.shares) != {target.key for target in targets})
+
+    def next_delay(self, target, now):
+        """Seconds until target's next check, integrating the hourly rate from now."""
+        share = self.shares[target.key]
+
+        # Walk hour by hour until one check's worth of rate has accumulated
+        needed = 1.0
+        delay = 0.0
+        moment = now
+        for _ in range(HOURS + 1):
+            hour_end = (moment + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+            span = (hour_end - moment).total_seconds()
+            rate = self.plan.checks[moment.hour] * share / 3600
+            if rate * span >= needed:
+                return delay + needed / rate
+            needed -= rate * span
+            delay += span
+            moment = hour_end
+        return min(delay, self.max_interval)
+
+    def delay(self, target, targets, now=None):
+        """Delay to target's next check; replans at midnight or when the targets change."""
+        now = now or datetime.now()
+        if self.stale(targets, now):
+            self.replan(targets)
+        return self.next_delay(target, now)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Session Cookies - Moving the Login Between Browsers and Clients
+
+Helpers to copy cookies in and out of Chrome over CDP. Unlike
+driver.get_cookies/add_cookie, Network.getCookies/setCookies work whatever
+page the tab is on (including about:blank), so a session survives tab
+parking and browser restarts.
+"""
+
+SAME_SITE_VALUES = {'strict': 'Strict', 'lax': 'Lax', 'none': 'None'}
+
+
+def to_cdp_cookie(cookie):
+    """Convert a Selenium cookie dict to a CDP Network.CookieParam.
+
+    A cookie with a 'url' instead of a 'domain' is set as a host-only
+    cookie for that URL's host.
+    """
+    param = {
+        'name': cookie['name'],
+        'value': cookie['value'],
+        'path': cookie.get('path', '/'),
+        'secure': bool(cookie.get('secure', False)),
+        'httpOnly': bool(cookie.get('httpOnly', False)),
+    }
+    if cookie.get('url'):
+        param['url'] = cookie['url']
+    else:
+        param['domain'] = cookie.get('domain', '')
+    same_site = SAME_SITE_VALUES.get(str(cookie.get('sameSite') or '').lower())
+    if same_site:
+        param['sameSite'] = same_site
+    if cookie.get('expiry'):
+        param['expires'] = float(cookie['expiry'])
+    return param
+
+
+def from_cdp_cookie(cookie):
+    """Convert a CDP Network.Cookie to a Selenium cookie dict."""
+    converted = {
+        'name': cookie['name'],
+        'value': cookie['value'],
+        'domain': cookie.get('domain', ''),
+        'path': cookie.get('path', '/'),
+        'secure': bool(cookie.get('secure', False)),
+        'httpOnly': bool(cookie.get('httpOnly', False)),
+    }
+    if cookie.get('sameSite'):
+        converted['sameSite'] = cookie['sameSite']
+    if not cookie.get('session') and cookie.get('expires', -1) > 0:
+        converted['expiry'] = int(cookie['expires'])
+    return converted
+
+
+def browser_cookies(driver, urls):
+    """Read the cookies Chrome would send to urls, whatever page the tab is on."""
+    result = driver.execute_cdp_cmd('Network.getCookies', {'urls': list(urls)})
+    return [from_cdp_cookie(cookie) for cookie in result.get('cookies', [])]
+
+
+def restore_cookies(driver, cookies):
+    """Install Selenium-format cookies into the browser in one CDP call."""
+    if cookies:
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': [to_cdp_cookie(cookie) for cookie in cookies]})
+    return len(cookies)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Session Health - Knowing the Login Is Still Good Without Loading a Page
+
+The login state is inferred instead of re-checked on the Services page:
+
+- the auth cookies (SESSION_COOKIES, matched by prefix so chunked
+  .AspNetCore.CookiesC1/C2 count) are read over CDP - present, and not past
+  their expiry
+- every regular check is evidence too: a services redirect or booking page
+  means the request was authenticated, a login page means it was not
+- the site drops sessions after SESSION_IDLE_MINUTES without an
+  authenticated request
+
+Shortly before the earliest known expiry (SESSION_KEEPALIVE_MARGIN
+seconds), the monitor refreshes the session with one small authenticated
+request, so long check intervals never let it lapse. Only when this points
+to a lost login does the monitor fall back to the full page check and ask
+for a manual login.
+"""
+
+import os
+import time
+import logging
+
+from slot_detection import SLOTS_AVAILABLE, NO_SLOTS, LOGIN_REQUIRED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUTH_COOKIES = ('.AspNetCore.Cookies', '.ASPXAUTH')
+
+# Outcomes only an authenticated request can produce - a maintenance page is
+# served logged in or not, so it leaves the session state as it is
+AUTHENTICATED_OUTCOMES = (SLOTS_AVAILABLE, NO_SLOTS)
+
+
+class SessionWatch:
+    """Tracks the login from cookies and check outcomes and says when to refresh it."""
+
+    def __init__(self, cookie_names=DEFAULT_AUTH_COOKIES, idle_timeout=1200, margin=300, keepalive=True):
+        self.cookie_names = tuple(cookie_names)
+        self.idle_timeout = idle_timeout
+        self.margin = margin
+        self.keepalive = keepalive
+        self.last_active = None    # time.time() of the last request known to be authenticated
+        self.cookie_expiry = None  # Earliest expiry of the auth cookies, if they have one
+        # Whether refreshing the session moves cookie_expiry forward (sliding) or it is a fixed deadline
+        self.expiry_slides = True
+        self.confirmed_expiry = None  # cookie_expiry as of the last confirmed()
+        self.logged_out = False
+        # None until a confirmed login shows whether the configured auth cookies exist at all
+        self.tracks_cookies = None
+
+    @classmethod
+    def from_env(cls):
+        names = [name.strip() for name in os.getenv('SESSION_COOKIES', ','.join(DEFAULT_AUTH_COOKIES)).split(',')]
+        return cls(
+            cookie_names=[name for name in names if name],
+            idle_timeout=float(os.getenv('SESSION_IDLE_MINUTES', 20)) * 60,
+            margin=float(os.getenv('SESSION_KEEPALIVE_MARGIN', 300)),
+            keepalive=os.getenv('SESSION_KEEPALIVE', 'true').lower() in ('1', 'true', 'yes')
+        )
+
+    def auth_cookies(self, cookies):
+        return [cookie for cookie in cookies if cookie['name'].startswith(self.cookie_names)]
+
+    def _read_expiry(self, cookies):
+        auth = self.auth_cookies(cookies)
+        expiries = [cookie['expiry'] for cookie in auth if cookie.get('expiry')]
+        self.cookie_expiry = min(expiries) if expiries else None
+        return auth
+
+    def confirmed(self, cookies=None):
+        """The session was just seen working (login confirmed, authenticated check, keepalive)."""
+        self.logged_out = False
+        self.last_active = time.time()
+        if cookies is not None:
+            auth = self._read_expiry(cookies)
+            if self.confirmed_expiry is not None and self.cookie_expiry is not None:
+                self.expiry_slides = self.cookie_expiry > self.confirmed_expiry
+            self.confirmed_expiry = self.cookie_expiry
+            if self.tracks_cookies is None:
+                self.tracks_cookies = bool(auth)
+                if not auth:
+                    logger.info(f"🍪 No {'/'.join(self.cookie_names)} cookie after login - "
+                                "judging the session by check outcomes only")
+
+    def observe_outcome(self, outcome):
+        """Update from a regular check's outcome."""
+        if outcome in AUTHENTICATED_OUTCOMES:
+            self.logged_out = False
+            self.last_active = time.time()
+        elif outcome == LOGIN_REQUIRED:
+            self.logged_out = True
+
+    def check(self, cookies, now=None):
+        """(valid, reason) from cookies and what the checks have shown - no page load."""
+        now = time.time() if now is None else now
+        if self.logged_out:
+            return False, "the last check showed the login page"
+        if self.tracks_cookies:
+            if not self._read_expiry(cookies):
+                return False, "session cookie is gone"
+            if self.cookie_expiry and self.cookie_expiry <= now:
+                return False, "session cookie has expired"
+        if self.last_active and now - self.last_active > self.idle_timeout:
+            return False, f"no authenticated request for {(now - self.last_active) / 60:.0f} min"
+        return True, "session cookie present" if self.tracks_cookies else "recent checks were authenticated"
+
+    def keepalive_in(self, now=None):
+        """Seconds until the session should be refreshed, or None when there is nothing to refresh.
+
+        The cookie expiry only counts while refreshing has been seen to push
+        it out - a fixed deadline can't be kept alive, so then only the idle
+        timeout is.
+        """
+        if not self.keepalive or self.logged_out or self.last_active is None:
+            return None
+        now = time.time() if now is None else now
+        expires = self.last_active + self.idle_timeout
+        if self.cookie_expiry and self.expiry_slides:
+            expires = min(expires, self.cookie_expiry)
+        return max(0.0, expires - self.margin - now)
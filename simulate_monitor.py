@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+End-to-end simulation against the local prenotami stand-in.
+
+Starts prenotami_standin.py on a free port, logs a real BrowserVisaMonitor
+into it and drives the monitor's own check path (AsyncMonitorEngine, alerts
+to a file, evidence archive) for --cycles checks while the stand-in opens,
+closes, slows down and drops sessions on its scenario. Reports:
+
+- detection latency - from an opening to the check that alerted on it
+- missed openings, false alerts, and checks that saw an open page as closed
+  (overlooked)
+- resource use - Chrome RSS (peak/last), monitor CPU and peak RSS,
+  requests per check
+- the engine's per-phase timings
+
+With --max-* limits it exits 1 when a run is worse - a performance
+regression gate. Nothing touches the real site; a .env in the directory is
+read, but the simulation's own settings win.
+
+Usage:
+    python3 simulate_monitor.py --cycles 2000
+    python3 simulate_monitor.py --cycles 500 --interval 0.5 --slow-rate 0.05 --session-lifetime 300
+    python3 simulate_monitor.py --seed 7 --max-p95-latency 3 --max-false-alerts 0 --json sim.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import statistics
+
+from prenotami_standin import OPEN, StandinServer, add_site_arguments, site_from_args
+from process_memory import driver_memory
+from slot_detection import NO_SLOTS, LOGIN_REQUIRED
+
+SIM_EMAIL = 'simulation@example.com'
+SIM_PASSWORD = 'simulation'
+
+LOGIN_SCRIPT = """
+document.getElementById('login-email').value = arguments[0];
+document.getElementById('login-password').value = arguments[1];
+document.getElementById('login-form').submit();
+"""
+
+
+def simulation_env(site_url, workdir, args):
+    """Settings that point the monitor at the stand-in and keep its files in workdir."""
+    return {
+        'PRENOTAMI_URL': site_url,
+        'MONITOR_TARGETS': f"Simulated service:{args.service_id}",
+        'CHECK_INTERVAL': str(max(1, int(args.interval))),
+        'CHROME_PROFILE_DIR': os.path.join(workdir, 'chrome'),
+        'HEADLESS': 'false' if args.show else 'true',
+        'PROBE_MODE': 'true' if args.probe else 'false',
+        'NOTIFY_CHANNELS': 'file',
+        'NOTIFY_FILE': os.path.join(workdir, 'alerts.jsonl'),
+        'EVIDENCE_DIR': os.path.join(workdir, 'evidence'),
+        'LOG_FILE': os.path.join(workdir, 'visa_monitor.log'),
+        'CHECK_LOG_FILE': os.path.join(workdir, 'checks.jsonl'),
+        'HISTORY_DB': '',
+        'METRICS_FILE': '',
+        'METRICS_PORT': '0',
+        'COORDINATION_URL': '',
+        'CHECK_BUDGET_PER_DAY': '',
+        'CHECK_JITTER': '0',
+        'LOGIN_WAIT': '0',  # The simulation logs in again itself
+        'SESSION_IDLE_MINUTES': str(args.session_idle / 60),
+        'SMTP_KEEPALIVE': '0',
+    }
+
+
+def log_in(driver, site_url, timeout=15):
+    """Fill in and submit the stand-in's login form like a user would."""
+    driver.get(f"{site_url}/Home/Login")
+    driver.execute_script(LOGIN_SCRIPT, SIM_EMAIL, SIM_PASSWORD)
+    deadline = time.monotonic() + timeout
+    while 'login' in driver.current_url.lower():
+        if time.monotonic() > deadline:
+            raise RuntimeError("login form did not redirect")
+        time.sleep(0.05)
+
+
+def close_handed_over_tabs(driver):
+    """After an alert the booking tab is left for the user - nobody books here, so close it."""
+    current = driver.current_window_handle
+    for handle in driver.window_handles:
+        if handle != current:
+            driver.switch_to.window(handle)
+            driver.close()
+    driver.switch_to.window(current)
+
+
+async def simulate(monitor, site, args):
+    """Run args.cycles checks through the engine; returns the per-check records and Chrome samples."""
+    from monitor_engine import AsyncMonitorEngine
+
+    engine = AsyncMonitorEngine(monitor)
+    target = monitor.targets[0]
+    records = []
+    memory = []
+    keepalive = asyncio.create_task(engine.keep_session_alive()) if monitor.session.keepalive else None
+    try:
+        for cycle in range(args.cycles):
+            cycle_started = time.monotonic()
+            if records and records[-1]['alerted']:
+                await engine.run_in_browser(close_handed_over_tabs, monitor.driver, timeout=engine.check_timeout)
+
+            target.schedule(0)  # The simulation paces the checks, not the target's interval
+            found_before = target.slots_found_count
+            start = site.elapsed()
+            attention = not await engine.check_target(target)
+            if attention:
+                engine.consecutive_errors = 0  # The real monitor would stop and ask for attention here
+            result = target.last_result
+            records.append({
+                'start': start,
+                'end': site.elapsed(),
+                'outcome': result.outcome if result else 'error',
+                'alerted': target.slots_found_count > found_before,
+                'attention': attention,
+            })
+
+            if result is not None and result.outcome == LOGIN_REQUIRED:
+                await engine.run_in_browser(log_in, monitor.driver, monitor.site_url, timeout=engine.login_timeout)
+            await engine.maintain_browser()
+            if cycle % args.sample_every == 0:
+                sample = await engine.run_in_browser(driver_memory, monitor.driver, timeout=engine.check_timeout)
+                if sample:
+                    memory.append(sample)
+            if args.progress and (cycle + 1) % args.progress == 0:
+                print(f"   … {cycle + 1}/{args.cycles} checks ({site.elapsed():.0f}s)")
+
+            pause = args.interval - (time.monotonic() - cycle_started)
+            if pause > 0:
+                await asyncio.sleep(pause)
+    finally:
+        if keepalive:
+            keepalive.cancel()
+        await engine.shutdown(grace=10)
+    return records, memory
+
+
+def analyse(records, windows, end):
+    """Match alerts to openings: latency per caught opening, misses, false alerts."""
+    openings = [(start, stop) for start, stop, state in windows if state == OPEN and start < end]
+    latencies = []
+    missed = 0
+    for start, stop in openings:
+        alerts = [record['end'] for record in records
+                  if record['alerted'] and record['end'] >= start and record['start'] < stop]
+        if alerts:
+            latencies.append(min(alerts) - start)
+        elif stop < end:
+            missed += 1
+    false_alerts = sum(
+        1 for record in records
+        if record['alerted'] and not any(record['start'] < stop and record['end'] >= start for start, stop in openings)
+    )
+    # A check that ran entirely inside an opening and still reported no slots
+    overlooked = sum(
+        1 for record in records
+        if record['outcome'] == NO_SLOTS
+        and any(start <= record['start'] and record['end'] <= stop for start, stop in openings)
+    )
+    return {
+        'openings': len(openings),
+        'caught': len(latencies),
+        'missed': missed,
+        'false_alerts': false_alerts,
+        'overlooked_checks': overlooked,
+        'latencies': latencies,
+    }
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def build_report(records, memory, detection, site, metrics, cpu_seconds):
+    durations = [record['end'] - record['start'] for record in records]
+    outcomes = {}
+    for record in records:
+        outcomes[record['outcome']] = outcomes.get(record['outcome'], 0) + 1
+    latencies = detection.pop('latencies')
+    return {
+        'checks': len(records),
+        'elapsed': records[-1]['end'] - records[0]['start'] if records else 0.0,
+        'outcomes': outcomes,
+        'check_median': statistics.median(durations) if durations else None,
+        'check_p95': percentile(durations, 0.95),
+        'latency_median': statistics.median(latencies) if latencies else None,
+        'latency_p95': percentile(latencies, 0.95),
+        'latency_max': max(latencies) if latencies else None,
+        **detection,
+        'false_alert_rate': detection['false_alerts'] / max(1, sum(record['alerted'] for record in records)),
+        'attention_stops': sum(record['attention'] for record in records),
+        'chrome_rss_peak_mb': max(sample.total for sample in memory) / 2 ** 20 if memory else None,
+        'chrome_rss_last_mb': memory[-1].total / 2 ** 20 if memory else None,
+        'monitor_rss_peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'monitor_cpu_seconds': cpu_seconds,
+        'requests_per_check': site.counts.get('requests', 0) / max(1, len(records)),
+        'site': dict(site.counts),
+        'phases': {phase: mean for phase, (count, mean) in metrics.phase_summary().items()},
+    }
+
+
+def print_report(report):
+    def seconds(value):
+        return '-' if value is None else f"{value:.2f}s"
+
+    print(f"\n📊 {report['checks']} checks in {report['elapsed']:.0f}s")
+    print(f"   • Outcomes:          {', '.join(f'{name} {count}' for name, count in sorted(report['outcomes'].items()))}")
+    print(f"   • Check time:        median {seconds(report['check_median'])}, p95 {seconds(report['check_p95'])}")
+    print(f"\n🎯 Detection ({report['openings']} openings)")
+    print(f"   • Caught / missed:   {report['caught']} / {report['missed']}")
+    print(f"   • Latency:           median {seconds(report['latency_median'])}, p95 {seconds(report['latency_p95'])}, "
+          f"max {seconds(report['latency_max'])}")
+    print(f"   • False alerts:      {report['false_alerts']} ({report['false_alert_rate']:.1%} of alerts)")
+    print(f"   • Overlooked checks: {report['overlooked_checks']} (ran inside an opening, saw none)")
+    print(f"   • Attention stops:   {report['attention_stops']}")
+    print("\n💾 Resources")
+    if report['chrome_rss_peak_mb'] is not None:
+        print(f"   • Chrome RSS:        peak {report['chrome_rss_peak_mb']:,.0f} MB, last {report['chrome_rss_last_mb']:,.0f} MB")
+    print(f"   • Monitor process:   peak {report['monitor_rss_peak_mb']:,.0f} MB RSS, {report['monitor_cpu_seconds']:.1f}s CPU")
+    print(f"   • Requests/check:    {report['requests_per_check']:.2f} (site: {json.dumps(report['site'], sort_keys=True)})")
+    if report['phases']:
+        print(f"   • Phases (mean):     {', '.join(f'{phase} {mean * 1000:.0f}ms' for phase, mean in sorted(report['phases'].items()))}")
+
+
+def gate_failures(report, args):
+    """The --max-* limits this run broke."""
+    limits = (
+        ('latency_p95', args.max_p95_latency, "p95 detection latency"),
+        ('false_alerts', args.max_false_alerts, "false alerts"),
+        ('missed', args.max_missed, "missed openings"),
+        ('chrome_rss_peak_mb', args.max_rss_mb, "peak Chrome RSS (MB)"),
+    )
+    failures = []
+    for key, limit, label in limits:
+        if limit is not None and report[key] is not None and report[key] > limit:
+            failures.append(f"{label} {report[key]:g} > {limit:g}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the monitor against the local prenotami stand-in")
+    parser.add_argument('--cycles', type=int, default=1000, help="checks to run")
+    parser.add_argument('--interval', type=float, default=0, help="seconds between check starts (0 = back to back)")
+    parser.add_argument('--service-id', default='4755')
+    parser.add_argument('--probe', action='store_true', help="run with PROBE_MODE (needs requests)")
+    parser.add_argument('--show', action='store_true', help="show the browser window instead of running headless")
+    parser.add_argument('--sample-every', type=int, default=25, help="checks between Chrome memory samples")
+    parser.add_argument('--progress', type=int, default=100, help="print progress every this many checks (0 = off)")
+    parser.add_argument('--keep', action='store_true', help="keep the working directory (logs, alerts, evidence)")
+    parser.add_argument('--verbose', action='store_true', help="show the monitor's log on the console")
+    parser.add_argument('--json', help="also write the report to this file")
+    parser.add_argument('--max-p95-latency', type=float, help="fail if the p95 detection latency exceeds this (s)")
+    parser.add_argument('--max-false-alerts', type=int, help="fail above this many false alerts")
+    parser.add_argument('--max-missed', type=int, help="fail above this many missed openings")
+    parser.add_argument('--max-rss-mb', type=float, help="fail if Chrome's peak RSS exceeds this")
+    add_site_arguments(parser)
+    args = parser.parse_args()
+    args.sample_every = max(1, args.sample_every)
+
+    site = site_from_args(args)
+    server = StandinServer(site).start()
+    workdir = tempfile.mkdtemp(prefix='visa-sim-')
+    os.environ.update(simulation_env(server.url, workdir, args))
+
+    from structured_log import configure_logging
+    from browser_monitor import BrowserVisaMonitor
+
+    listener = configure_logging(False)
+    if not args.verbose:
+        listener.handlers[0].setLevel(logging.WARNING)  # Console only - the log file keeps everything
+
+    print("🧪 Monitor Simulation")
+    print("=" * 40)
+    print(f"🌐 Stand-in: {server.url} | {args.cycles} checks | work dir {workdir}")
+
+    monitor = BrowserVisaMonitor(interactive=False)
+    try:
+        if not monitor.setup_browser():
+            print("❌ Failed to setup browser")
+            return 1
+        log_in(monitor.driver, server.url)
+        if not monitor.ensure_logged_in():
+            print("❌ Could not log in to the stand-in")
+            return 1
+
+        cpu_start = time.process_time()
+        records, memory = asyncio.run(simulate(monitor, site, args))
+        cpu_seconds = time.process_time() - cpu_start
+    finally:
+        if monitor.driver:
+            monitor.driver.quit()
+        server.close()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    end = site.elapsed()
+    detection = analyse(records, site.scenario.windows_until(end), end)
+    report = build_report(records, memory, detection, site, monitor.metrics, cpu_seconds)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    failures = gate_failures(report, args)
+    for failure in failures:
+        print(f"❌ Regression gate: {failure}")
+    if not failures and any(limit is not None for limit in (args.max_p95_latency, args.max_false_alerts,
+                                                            args.max_missed, args.max_rss_mb)):
+        print("✅ Within all regression limits")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
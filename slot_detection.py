@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Slot Detection - Page Snapshot and Classifier
+
+Collects everything the monitor needs to judge the booking page in a single
+WebDriver round trip, then decides the outcome in pure Python so the same
+logic can run without a browser - including over saved HTML snapshots
+(see snapshot_from_html and benchmark_classifier.py).
+
+The wording the classifier looks for comes from the detection rules file
+(detection_rules.py), scanned in one pass per page.
+
+The snapshot also carries a fingerprint of the page text, computed in the
+browser after normalising away digits and long hex tokens (timestamps,
+CSRF values, session IDs). VerdictCache remembers the verdict for each
+fingerprint, so a page seen before is neither sent over the wire again nor
+re-classified - and a page never seen before stands out as a new variant.
+"""
+
+import re
+import struct
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+from detection_rules import rules_for
+
+# Outcomes returned by the classifier
+SLOTS_AVAILABLE = "slots_available"
+NO_SLOTS = "no_slots"
+UNEXPECTED_REDIRECT = "unexpected_redirect"
+LOGIN_REQUIRED = "login_required"
+MAINTENANCE = "maintenance"
+
+OUTCOMES = (SLOTS_AVAILABLE, NO_SLOTS, UNEXPECTED_REDIRECT, LOGIN_REQUIRED, MAINTENANCE)
+
+# Visible text is capped so a huge page never dominates the wire transfer
+MAX_TEXT_LENGTH = 20000
+
+# Volatile parts of the page text, replaced by '#' before fingerprinting.
+# Detection rules may not contain digits (detection_rules.py rejects them),
+# so this never hides a difference the classifier would see.
+VOLATILE_PATTERN = re.compile(r'\b[0-9a-f]{16,}\b|\d+', re.ASCII)
+
+# Injected once per check - returns counts, URL, title, a fingerprint of the
+# visible text and the text itself unless its fingerprint is in arguments[1]
+SNAPSHOT_SCRIPT = """
+const count = (selector) => document.querySelectorAll(selector).length;
+const fingerprint = (value) => {
+    let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+    for (let i = 0; i < value.length; i++) {
+        const code = value.charCodeAt(i);
+        h1 = Math.imul(h1 ^ code, 2654435761);
+        h2 = Math.imul(h2 ^ code, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return (h2 >>> 0).toString(16).padStart(8, '0') + (h1 >>> 0).toString(16).padStart(8, '0');
+};
+let container = null;
+for (const selector of ['main', '#main', '[role="main"]', '.container', 'body']) {
+    container = document.querySelector(selector);
+    if (container) { break; }
+}
+const text = (container ? (container.innerText || '') : '').slice(0, arguments[0]);
+const print = fingerprint(text.toLowerCase().replace(/\\b[0-9a-f]{16,}\\b|\\d+/g, '#'));
+const known = (arguments[1] || []).includes(print);
+return {
+    url: window.location.href,
+    title: document.title || '',
+    ready_state: document.readyState,
+    forms: count('form'),
+    inputs: count('input'),
+    submit_buttons: count("input[type='submit'], button[type='submit'], .btn-submit"),
+    name_fields: count("input[name*='name'], input[name*='Name'], input[id*='name'], input[id*='Name']"),
+    email_fields: count("input[type='email'], input[name*='email'], input[name*='Email']"),
+    phone_fields: count("input[name*='phone'], input[name*='Phone'], input[type='tel']"),
+    password_fields: count("input[type='password']"),
+    fingerprint: print,
+    text_omitted: known,
+    text: known ? '' : text
+};
+"""
+
+COUNT_FIELDS = (
+    'forms', 'inputs', 'submit_buttons', 'name_fields', 'email_fields', 'phone_fields', 'password_fields'
+)
+
+
+class PageSnapshot:
+    """Everything the classifier looks at, captured in one round trip."""
+
+    def __init__(self, url='', title='', text='', ready_state='', fingerprint='', text_omitted=False, **counts):
+        self.url = url or ''
+        self.title = title or ''
+        self.ready_state = ready_state or ''
+        # Lowercase once here so no branch has to copy the page again
+        self.text = (text or '').lower()
+        self.fingerprint = fingerprint or ''
+        self.text_omitted = bool(text_omitted)  # Text left in the browser - its fingerprint was known
+        for field in COUNT_FIELDS:
+            setattr(self, field, int(counts.get(field) or 0))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a snapshot from the dict returned by SNAPSHOT_SCRIPT."""
+        data = data or {}
+        counts = {field: data.get(field, 0) for field in COUNT_FIELDS}
+        return cls(
+            url=data.get('url', ''),
+            title=data.get('title', ''),
+            text=data.get('text', ''),
+            ready_state=data.get('ready_state', ''),
+            fingerprint=data.get('fingerprint', ''),
+            text_omitted=data.get('text_omitted', False),
+            **counts
+        )
+
+    def counts(self):
+        """Return the element counts as a dict."""
+        return {field: getattr(self, field) for field in COUNT_FIELDS}
+
+
+class SlotCheckResult:
+    """Outcome of classifying a booking page snapshot."""
+
+    def __init__(self, outcome, snapshot, reason, evidence=None):
+        self.outcome = outcome
+        self.snapshot = snapshot
+        self.reason = reason
+        self.evidence = evidence or {}
+        self.timings = {}  # phase -> seconds, filled in by the monitor
+        self.cached = False  # Verdict replayed from VerdictCache
+        self.novel = False  # First time this page variant was seen
+
+    @property
+    def slots_available(self):
+        return self.outcome == SLOTS_AVAILABLE
+
+    def __repr__(self):
+        return f"SlotCheckResult(outcome={self.outcome!r}, reason={self.reason!r})"
+
+
+class LoginCheckResult:
+    """Outcome of the login heuristics for a page."""
+
+    def __init__(self, logged_in, logged_in_signs, not_logged_signs):
+        self.logged_in = logged_in
+        self.logged_in_signs = logged_in_signs
+        self.not_logged_signs = not_logged_signs
+
+
+def capture_snapshot(driver, known_fingerprints=()):
+    """Collect the page snapshot with a single execute_script call.
+
+    The text is left out when its fingerprint is in known_fingerprints.
+    """
+    return PageSnapshot.from_dict(driver.execute_script(SNAPSHOT_SCRIPT, MAX_TEXT_LENGTH, list(known_fingerprints)))
+
+
+def _imul(a, b):
+    return (a * b) & 0xFFFFFFFF
+
+
+def text_fingerprint(text):
+    """Python twin of the fingerprint in SNAPSHOT_SCRIPT (same hash, same UTF-16 code units)."""
+    normalized = VOLATILE_PATTERN.sub('#', text.lower()).encode('utf-16-le')
+    h1, h2 = 0xdeadbeef, 0x41c6ce57
+    for code in struct.unpack(f'<{len(normalized) // 2}H', normalized):
+        h1 = _imul(h1 ^ code, 2654435761)
+        h2 = _imul(h2 ^ code, 1597334677)
+    h1 = _imul(h1 ^ (h1 >> 16), 2246822507) ^ _imul(h2 ^ (h2 >> 13), 3266489909)
+    h2 = _imul(h2 ^ (h2 >> 16), 2246822507) ^ _imul(h1 ^ (h1 >> 13), 3266489909)
+    return f'{h2:08x}{h1:08x}'
+
+
+def verdict_key(snapshot, booking_path, rules=None):
+    """Everything classify_booking_page depends on, with the text reduced to its fingerprint.
+
+    rules is the RuleSet the page is classified with - a consulate's
+    variant can judge the same page differently from the shared rules.
+    """
+    current_url = snapshot.url.lower()
+    return (snapshot.fingerprint, booking_path, booking_path in current_url, 'services' in current_url,
+            tuple(snapshot.counts().values()), rules)
+
+
+class VerdictCache:
+    """Bounded LRU from page fingerprint (plus URL and element counts) to verdict."""
+
+    def __init__(self, size=64):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def fingerprints(self):
+        """Text fingerprints with a cached verdict - SNAPSHOT_SCRIPT skips sending these pages."""
+        return list({key[0] for key in self.entries})
+
+    def lookup(self, snapshot, booking_path, rules=None):
+        """Replay the verdict for an identical page seen before under the same rules, or None."""
+        if not snapshot.fingerprint:
+            return None
+        key = verdict_key(snapshot, booking_path, rules)
+        cached = self.entries.get(key)
+        if cached is None:
+            return None
+        self.entries.move_to_end(key)
+        outcome, reason, evidence = cached
+        evidence = dict(evidence)
+        if 'url' in evidence:
+            evidence['url'] = snapshot.url
+        result = SlotCheckResult(outcome, snapshot, reason, evidence)
+        result.cached = True
+        return result
+
+    def remember(self, snapshot, booking_path, result, rules=None):
+        """Store a freshly classified verdict. Returns True when the page was new."""
+        if not snapshot.fingerprint or not self.size or snapshot.text_omitted:
+            return False
+        key = verdict_key(snapshot, booking_path, rules)
+        novel = key not in self.entries
+        self.entries[key] = (result.outcome, result.reason, result.evidence)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return novel
+
+
+def has_booking_form(snapshot):
+    """Element-count heuristic for a fillable booking form."""
+    return (
+        snapshot.forms > 0 and
+        snapshot.inputs > 3 and  # More than just basic inputs
+        (snapshot.submit_buttons > 0 or snapshot.name_fields > 0 or snapshot.email_fields > 0)
+    )
+
+
+def classify_booking_page(snapshot, booking_path, rules=None):
+    """Decide whether the snapshot shows open slots.
+
+    booking_path is the lowercase URL fragment that identifies the booking
+    page, e.g. "booking/4755". rules is the target's compiled RuleSet
+    (default: the shared rules).
+    """
+    current_url = snapshot.url.lower()
+
+    if snapshot.password_fields > 0:
+        return SlotCheckResult(LOGIN_REQUIRED, snapshot, "login form shown", {'url': snapshot.url})
+
+    matches = (rules or rules_for()).scan(snapshot.text)
+    if matches.present('maintenance') and not has_booking_form(snapshot):
+        evidence = {'maintenance_messages': matches.phrases('maintenance'), 'scores': matches.scores()}
+        return SlotCheckResult(MAINTENANCE, snapshot, "maintenance page", evidence)
+
+    if booking_path in current_url:
+        evidence = snapshot.counts()
+        evidence['keywords'] = matches.phrases('booking')
+        evidence['scores'] = matches.scores()
+        if has_booking_form(snapshot):
+            return SlotCheckResult(SLOTS_AVAILABLE, snapshot, "booking form detected", evidence)
+        return SlotCheckResult(NO_SLOTS, snapshot, "on booking page but no booking form", evidence)
+
+    if "services" in current_url:
+        evidence = {'no_slots_messages': matches.phrases('no_slots'), 'scores': matches.scores()}
+        return SlotCheckResult(NO_SLOTS, snapshot, "redirected to services page", evidence)
+
+    return SlotCheckResult(UNEXPECTED_REDIRECT, snapshot, "unexpected redirect", {'url': snapshot.url})
+
+
+def classify_page_content(snapshot, booking_path, rules=None):
+    """Content-only fallback used when element counts are unavailable."""
+    matches = (rules or rules_for()).scan(snapshot.text)
+    evidence = {'content_indicators': matches.phrases('form'), 'scores': matches.scores()}
+    if booking_path in snapshot.url.lower() and matches.present('form'):  # Form wording, not just one stray word
+        return SlotCheckResult(SLOTS_AVAILABLE, snapshot, "booking form detected via page content", evidence)
+    return SlotCheckResult(NO_SLOTS, snapshot, "no booking form in page content", evidence)
+
+
+def classify_login_page(snapshot, rules=None):
+    """Login heuristics: logged-in wording present and no login wording on the page or in the URL."""
+    rules = rules or rules_for()
+    matches = rules.scan(snapshot.text)
+    not_logged = matches.union(rules.scan(snapshot.url.lower()))
+    logged_in_signs = matches.phrases('logged_in')
+    not_logged_signs = not_logged.phrases('not_logged_in')
+    if snapshot.password_fields > 0:
+        not_logged_signs.append('password field')
+    is_logged_in = matches.present('logged_in') and not not_logged.present('not_logged_in') and not snapshot.password_fields
+    return LoginCheckResult(is_logged_in, logged_in_signs, not_logged_signs)
+
+
+class _SnapshotParser(HTMLParser):
+    """Computes the SNAPSHOT_SCRIPT fields from raw HTML without a browser."""
+
+    SKIPPED_TAGS = {'script', 'style', 'head', 'title', 'noscript', 'template'}
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.counts = dict.fromkeys(COUNT_FIELDS, 0)
+        self.title = ''
+        self.stack = []
+        self.skip_depth = 0
+        self.in_title = False
+        # Same priority order as the injected script: first match per selector
+        self.containers = {'main': None, '#main': None, '[role="main"]': None, '.container': None, 'body': None}
+        self.open_containers = []
+
+    def _container_keys(self, tag, attrs):
+        keys = []
+        classes = (attrs.get('class') or '').split()
+        if tag == 'main':
+            keys.append('main')
+        if attrs.get('id') == 'main':
+            keys.append('#main')
+        if attrs.get('role') == 'main':
+            keys.append('[role="main"]')
+        if 'container' in classes:
+            keys.append('.container')
+        if tag == 'body':
+            keys.append('body')
+        return [key for key in keys if self.containers[key] is None]
+
+    def _count_input(self, attrs):
+        input_type = (attrs.get('type') or '').lower()
+        name = attrs.get('name') or ''
+        element_id = attrs.get('id') or ''
+        self.counts['inputs'] += 1
+        if input_type == 'submit':
+            self.counts['submit_buttons'] += 1
+        if 'name' in name or 'Name' in name or 'name' in element_id or 'Name' in element_id:
+            self.counts['name_fields'] += 1
+        if input_type == 'email' or 'email' in name or 'Email' in name:
+            self.counts['email_fields'] += 1
+        if 'phone' in name or 'Phone' in name or input_type == 'tel':
+            self.counts['phone_fields'] += 1
+        if input_type == 'password':
+            self.counts['password_fields'] += 1
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'title':
+            self.in_title = True
+        if tag == 'form':
+            self.counts['forms'] += 1
+        elif tag == 'input':
+            self._count_input(attrs)
+        elif tag == 'button':
+            if (attrs.get('type') or '').lower() == 'submit' or 'btn-submit' in (attrs.get('class') or '').split():
+                self.counts['submit_buttons'] += 1
+        elif 'btn-submit' in (attrs.get('class') or '').split():
+            self.counts['submit_buttons'] += 1
+
+        if tag in self.VOID_TAGS:
+            return
+        keys = self._container_keys(tag, attrs)
+        for key in keys:
+            self.containers[key] = []
+        self.stack.append((tag, keys))
+        self.open_containers.extend(keys)
+        if tag in self.SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self.in_title = False
+        # Tolerate unclosed tags by unwinding to the matching start tag
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index][0] == tag:
+                for open_tag, keys in self.stack[index:]:
+                    for key in keys:
+                        self.open_containers.remove(key)
+                    if open_tag in self.SKIPPED_TAGS:
+                        self.skip_depth -= 1
+                del self.stack[index:]
+                break
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+        if self.skip_depth or not data.strip():
+            return
+        for key in self.open_containers:
+            self.containers[key].append(data.strip())
+
+    def text(self):
+        for chunks in self.containers.values():
+            if chunks is not None:
+                return ' '.join(chunks)
+        return ''
+
+
+def snapshot_from_html(html, url):
+    """Build a PageSnapshot from saved HTML, mirroring SNAPSHOT_SCRIPT."""
+    parser = _SnapshotParser()
+    parser.feed(html)
+    parser.close()
+    text = parser.text()[:MAX_TEXT_LENGTH]
+    return PageSnapshot(
+        url=url,
+        title=parser.title.strip(),
+        text=text,
+        ready_state='complete',
+        fingerprint=text_fingerprint(text),
+        **parser.counts
+    )
@@ -1,114 +1,274 @@
 #!/usr/bin/env python3
 """
-Wrapper script to ensure browser monitor runs with correct Python environment
+VISA Monitor Entry Point
+
+Checks the environment in this interpreter (no subprocess probing, no
+re-exec) and starts the monitor in process. Dependencies are only installed
+when a required module is actually missing.
+
+Usage:
+    python3 start_monitor.py                 # check environment, then monitor
+    python3 start_monitor.py run --fast      # skip the environment check (supervisor restarts)
+    python3 start_monitor.py run --debug     # narrate every step of every check
+    python3 start_monitor.py check-config    # validate .env, targets and channels
+    python3 start_monitor.py test-email      # send a test email
+
+check-config and test-email never import Selenium.
 """
-import sys
 import os
+import sys
+import site
+import argparse
+import importlib
+import importlib.util
 import subprocess
 
-def main():
-    print("🎯 VISA Monitor Environment Wrapper")
-    print("=" * 40)
-    
-    # Ensure we're in the right directory
-    if not os.path.exists('browser_monitor.py'):
-        print("❌ Error: browser_monitor.py not found")
-        print("Please run from the project directory")
-        return 1
-    
-    # Try to find Python 3 automatically
-    python_candidates = [
-        "python3",
-        "/usr/local/bin/python3", 
-        "/opt/homebrew/bin/python3",
-        "/usr/bin/python3"
-    ]
-    
-    python_path = None
-    for candidate in python_candidates:
-        try:
-            result = subprocess.run([candidate, "--version"], capture_output=True, text=True)
-            if result.returncode == 0 and "Python 3" in result.stdout:
-                python_path = candidate
-                break
-        except FileNotFoundError:
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+REQUIREMENTS = os.path.join(PROJECT_DIR, 'requirements.txt')
+
+# import name -> pip package
+RUN_MODULES = {'selenium': 'selenium', 'dotenv': 'python-dotenv'}
+OPTIONAL_MODULES = {'webdriver_manager': 'webdriver-manager', 'requests': 'requests'}
+CONFIG_MODULES = {'dotenv': 'python-dotenv'}
+
+NUMERIC_SETTINGS = (
+    'CHECK_INTERVAL', 'READY_TIMEOUT', 'CHECK_TIMEOUT', 'LOGIN_TIMEOUT', 'NOTIFY_TIMEOUT',
+    'SCREENSHOT_TIMEOUT', 'SMTP_KEEPALIVE', 'SMTP_PORT', 'SMTP_FALLBACK_PORT', 'SMTP_RETRIES', 'SMTP_RETRY_BACKOFF',
+    'RENDERER_MEMORY_LIMIT_MB', 'BROWSER_MEMORY_LIMIT_MB', 'MEMORY_SAMPLE_EVERY', 'RECYCLE_TAB_EVERY',
+    'VERDICT_CACHE_SIZE', 'EVIDENCE_MAX_MB', 'LOGIN_WAIT', 'POOL_CHECKS_PER_MINUTE', 'POOL_BURST', 'WORKER_RESTARTS',
+    'LEASE_TTL', 'CLUSTER_CHECKS_PER_MINUTE', 'ALERT_DEDUP_SECONDS', 'COORDINATION_TIMEOUT',
+    'SESSION_IDLE_MINUTES', 'SESSION_KEEPALIVE_MARGIN',
+    'CHECK_BUDGET_PER_DAY', 'CHECK_BUDGET_PER_HOUR', 'MIN_CHECK_INTERVAL', 'MAX_CHECK_INTERVAL',
+    'RELEASE_WINDOW_WEIGHT', 'HISTORY_WEIGHT', 'HISTORY_DAYS', 'CHECK_JITTER',
+)
+
+
+def missing_modules(modules):
+    """Import names from modules that can't be found - without importing them."""
+    return [name for name in modules if importlib.util.find_spec(name) is None]
+
+
+def install_requirements():
+    """pip install requirements.txt into this interpreter; True on success."""
+    print("💡 Trying user installation to avoid externally-managed-environment error...")
+    for flag in ('--user', '--break-system-packages'):
+        result = subprocess.run([sys.executable, "-m", "pip", "install", flag, "-r", REQUIREMENTS],
+                                capture_output=True, text=True)
+        if result.returncode == 0:
+            print(f"✅ Dependencies installed with {flag} flag")
+            # A fresh user site-packages isn't on sys.path yet
+            site.addsitedir(site.getusersitepackages())
+            importlib.invalidate_caches()
+            return True
+        print(f"⚠️  Installation with {flag} failed")
+    return False
+
+
+def ensure_environment(modules):
+    """Make sure modules are importable, installing requirements if needed."""
+    missing = missing_modules(modules)
+    if not missing:
+        return True
+
+    print(f"⚠️  Missing: {', '.join(modules[name] for name in missing)} - installing dependencies...")
+    if install_requirements() and not missing_modules(modules):
+        return True
+
+    print("❌ Failed to install dependencies")
+    print("💡 Please install manually:")
+    print(f"   {sys.executable} -m pip install --user -r requirements.txt")
+    return False
+
+
+def load_env():
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(PROJECT_DIR, '.env'))
+
+
+def check_config():
+    """Validate the .env settings without starting a browser; returns an exit code."""
+    from email_notifier import SMTPNotifier
+    from notifications import DEFAULT_CHANNEL_TIMEOUTS, DEFAULT_CHANNELS
+    from page_readiness import PAGE_LOAD_STRATEGIES
+    from browser_profile import PROFILES
+    from targets import parse_targets, load_targets_file
+    from scheduler import parse_windows, window_hours
+
+    print("🔎 Checking configuration...")
+    errors = []
+    warnings = []
+
+    for key in NUMERIC_SETTINGS:
+        value = os.getenv(key)
+        if value is None:
             continue
-    
-    if not python_path:
-        print("❌ Error: Python 3 not found")
-        print("Please install Python 3 or ensure it's in your PATH")
-        return 1
-    
-    print(f"🐍 Python: {python_path}")
-    print(f"📁 Directory: {os.getcwd()}")
-    
-    # Check if selenium is available
+        try:
+            float(value)
+        except ValueError:
+            errors.append(f"{key}={value!r} is not a number")
+
+    check_interval = 300
     try:
-        result = subprocess.run([python_path, "-c", "import selenium; print('✅ Selenium OK')"], 
-                              capture_output=True, text=True)
-        if result.returncode != 0:
-            print("⚠️  Installing dependencies...")
-            print("💡 Trying user installation to avoid externally-managed-environment error...")
-            
-            # Try user installation first (--user flag)
-            try:
-                result = subprocess.run([python_path, "-m", "pip", "install", "--user", "-r", "requirements.txt"], 
-                                      capture_output=True, text=True, check=True)
-                print("✅ Dependencies installed with --user flag")
-            except subprocess.CalledProcessError:
-                print("⚠️  User installation failed, trying with --break-system-packages...")
-                try:
-                    result = subprocess.run([python_path, "-m", "pip", "install", "--break-system-packages", "-r", "requirements.txt"], 
-                                          capture_output=True, text=True, check=True)
-                    print("✅ Dependencies installed with --break-system-packages")
-                except subprocess.CalledProcessError as e:
-                    print("❌ Failed to install dependencies")
-                    print("💡 Please install manually:")
-                    print(f"   {python_path} -m pip install --user -r requirements.txt")
-                    print("   OR")
-                    print("   pip3 install --user selenium webdriver-manager python-dotenv")
-                    return 1
-        else:
-            print(result.stdout.strip())
-    except Exception as e:
-        print(f"❌ Environment check failed: {e}")
-        print("💡 Try installing dependencies manually:")
-        print(f"   {python_path} -m pip install --user selenium webdriver-manager python-dotenv")
-        return 1
-    
-    print("")
-    print("🚀 Starting monitor...")
-    print("")
-    
-    # Get the full path for execv if needed
-    if not os.path.isabs(python_path):
-        # Find the full path for relative commands like "python3"
-        import shutil
-        full_python_path = shutil.which(python_path)
-        if full_python_path:
-            python_path = full_python_path
+        check_interval = int(os.getenv('CHECK_INTERVAL', 300))
+        if check_interval < 60:
+            warnings.append(f"CHECK_INTERVAL={check_interval}s is very aggressive - prenotami may block the session")
+    except ValueError:
+        pass
+
+    try:
+        notifier = SMTPNotifier.from_env()
+        if notifier.configured:
+            print(f"📧 Email: {notifier.sender} -> {len(notifier.receivers)} recipient(s) via "
+                  f"{', '.join(server.address for server in notifier.servers)}")
         else:
-            # Fallback to subprocess if we can't resolve the path
-            print(f"🔄 Using subprocess fallback for {python_path}")
-            try:
-                subprocess.run([python_path, "browser_monitor.py"])
-                return 0
-            except Exception as e:
-                print(f"❌ Failed to start monitor: {e}")
-                return 1
-    
-    # Run the monitor with the correct Python
+            errors.append("email is not configured (SENDER_EMAIL, SENDER_PASSWORD, RECEIVER_EMAIL)")
+    except ValueError as e:
+        errors.append(f"invalid SMTP settings: {e}")
+
     try:
-        os.execv(python_path, [python_path, "browser_monitor.py"])
-    except FileNotFoundError:
-        # Final fallback
-        print(f"🔄 Exec failed, using subprocess for {python_path}")
+        if os.getenv('TARGETS_FILE'):
+            targets = load_targets_file(os.getenv('TARGETS_FILE'), check_interval)
+        else:
+            targets = parse_targets(os.getenv('MONITOR_TARGETS', ''), check_interval)
+        if not targets:
+            print("🎯 Targets: default VISA service")
+        for target in targets:
+            print(f"🎯 Target: {target.label} every {target.check_interval}s -> {target.booking_url}")
+    except (OSError, ValueError, KeyError) as e:
+        errors.append(f"invalid target configuration: {e}")
+        targets = []
+
+    budget = os.getenv('CHECK_BUDGET_PER_DAY')
+    if budget:
         try:
-            subprocess.run([python_path, "browser_monitor.py"])
-            return 0
+            average = 86400 * max(1, len(targets)) / float(budget)
+            print(f"🗓️ Adaptive schedule: {float(budget):.0f} checks/day, one every {average:.0f}s per target on average")
+            if average < 300:
+                warnings.append("CHECK_BUDGET_PER_DAY averages under 5 minutes per target - please be respectful")
+            hours = window_hours(parse_windows(os.getenv('RELEASE_WINDOWS', '')), os.getenv('RELEASE_WINDOWS_TZ') or None)
+            if hours:
+                print(f"🗓️ Release windows (local hours): {', '.join(f'{hour:02d}:00' for hour in sorted(hours))}")
         except Exception as e:
-            print(f"❌ Failed to start monitor: {e}")
+            errors.append(f"invalid adaptive schedule settings: {e}")
+
+    workers_file = os.getenv('WORKERS_FILE')
+    if workers_file:
+        from worker_pool import load_workers, unknown_overrides
+        try:
+            specs = load_workers(workers_file)
+            print(f"👷 Workers: {', '.join(spec.name for spec in specs)}")
+            warnings.extend(unknown_overrides(specs))
+            if not float(os.getenv('POOL_CHECKS_PER_MINUTE', 0)):
+                warnings.append("POOL_CHECKS_PER_MINUTE is not set - the workers' checks are not capped together")
+        except (OSError, ValueError) as e:
+            errors.append(f"invalid WORKERS_FILE: {e}")
+
+    rules_file = os.getenv('DETECTION_RULES')
+    if rules_file:
+        from detection_rules import DetectionRules
+        try:
+            rules = DetectionRules.from_file(rules_file, os.getenv('DETECTION_LANGUAGES', '').split(','))
+            print(f"📏 Detection rules: {rules_file} ({len(rules.rules)} shared phrases, "
+                  f"{len(rules.variants)} consulate variant(s))")
+        except (OSError, ValueError) as e:
+            errors.append(f"invalid DETECTION_RULES: {e}")
+
+    coordination = os.getenv('COORDINATION_URL', '').strip()
+    if coordination.startswith(('sqlite:', 'http://', 'https://')):
+        print(f"🤝 Coordination: {coordination} (node {os.getenv('NODE_ID') or 'hostname-pid'})")
+    elif coordination:
+        errors.append(f"COORDINATION_URL={coordination!r} (expected sqlite:<path> or http(s)://host:port)")
+
+    strategy = os.getenv('PAGE_LOAD_STRATEGY', 'eager').lower()
+    if strategy not in PAGE_LOAD_STRATEGIES:
+        errors.append(f"PAGE_LOAD_STRATEGY={strategy!r} (expected one of {', '.join(PAGE_LOAD_STRATEGIES)})")
+
+    profile = os.getenv('BROWSER_PROFILE', 'standard').lower()
+    if profile not in PROFILES:
+        errors.append(f"BROWSER_PROFILE={profile!r} (expected one of {', '.join(PROFILES)})")
+
+    channels = [name.strip().lower() for name in os.getenv('NOTIFY_CHANNELS', DEFAULT_CHANNELS).split(',') if name.strip()]
+    for name in channels:
+        if name not in DEFAULT_CHANNEL_TIMEOUTS:
+            errors.append(f"unknown notification channel {name!r}")
+        elif name == 'webhook' and not os.getenv('WEBHOOK_URL'):
+            errors.append("webhook channel enabled but WEBHOOK_URL is not set")
+    print(f"📣 Channels: {', '.join(channels) or 'none'}")
+
+    if os.getenv('PROBE_MODE', 'false').lower() in ('1', 'true', 'yes') and missing_modules(['requests']):
+        errors.append("PROBE_MODE needs the requests package")
+    if missing_modules(RUN_MODULES):
+        warnings.append(f"not installed yet: {', '.join(RUN_MODULES[name] for name in missing_modules(RUN_MODULES))}")
+
+    for warning in warnings:
+        print(f"⚠️  {warning}")
+    for error in errors:
+        print(f"❌ {error}")
+    if errors:
+        return 1
+    print("✅ Configuration looks good")
+    return 0
+
+
+def run_email_test():
+    from test_email import test_email
+    return 0 if test_email() else 1
+
+
+def run_monitor(fast=False, debug=None, workers=None):
+    if not fast:
+        print(f"🐍 Python: {sys.executable}")
+        print(f"📁 Directory: {os.getcwd()}")
+        if not ensure_environment(RUN_MODULES):
+            return 1
+        missing = missing_modules(OPTIONAL_MODULES)
+        if missing:
+            print(f"ℹ️  Optional packages not installed: {', '.join(OPTIONAL_MODULES[name] for name in missing)}")
+        print("✅ Dependencies OK")
+        print("")
+        print("🚀 Starting monitor...")
+        print("")
+
+    load_env()
+    workers = workers or os.getenv('WORKERS_FILE')
+    if workers:
+        from worker_pool import run_pool
+        return run_pool(workers, debug=debug)
+
+    import browser_monitor
+    return browser_monitor.main(debug=debug)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VISA slot monitor")
+    subcommands = parser.add_subparsers(dest='command')
+    run_parser = subcommands.add_parser('run', help="monitor the booking pages (default)")
+    run_parser.add_argument('--fast', action='store_true', help="skip the dependency check")
+    run_parser.add_argument('--debug', action='store_true', default=None, help="verbose step-by-step log")
+    run_parser.add_argument('--workers', metavar='FILE', help="run one worker per account listed in FILE (see WORKERS_FILE)")
+    subcommands.add_parser('check-config', help="validate .env, targets and channels")
+    subcommands.add_parser('test-email', help="send a test email")
+    args = parser.parse_args(argv)
+
+    # .env, logs and the driver state live next to the scripts
+    os.chdir(PROJECT_DIR)
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+
+    if args.command in ('check-config', 'test-email'):
+        if not ensure_environment(CONFIG_MODULES):
             return 1
+        load_env()
+        return check_config() if args.command == 'check-config' else run_email_test()
+
+    print("🎯 VISA Monitor")
+    print("=" * 40)
+    return run_monitor(
+        fast=getattr(args, 'fast', False) or os.getenv('FAST_START', '').lower() in ('1', 'true', 'yes'),
+        debug=getattr(args, 'debug', None),
+        workers=getattr(args, 'workers', None)
+    )
+
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Structured Log - One Record per Check, Written off the Check Loop
+
+Every log call only puts a record on a queue; a background QueueListener
+thread does the formatting-to-disk, so a slow disk or fsync never stalls a
+check. Two files, both rotated by size and by age:
+
+- visa_monitor.log - the human-readable log: startup, one line per check,
+                     warnings, errors and alerts
+- checks.jsonl     - one compact JSON record per check (outcome, timings,
+                     evidence) for scripts and later analysis
+
+The step-by-step narration of each check (navigation, readiness, form
+analysis...) is logged at DEBUG and only appears with LOG_DEBUG=true or
+`start_monitor.py run --debug`.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+CHECK_LOGGER = 'visa_monitor.checks'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Chatty third-party loggers stay at INFO/WARNING even in debug mode
+QUIET_LOGGERS = {'selenium': logging.INFO, 'urllib3': logging.WARNING, 'WDM': logging.WARNING}
+
+
+class RotatingLogFile(RotatingFileHandler):
+    """Rotates at max_bytes or every rotate_seconds, keeping backup_count numbered files."""
+
+    def __init__(self, filename, max_bytes=10 * 2 ** 20, rotate_seconds=86400, backup_count=5):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=max(1, backup_count), encoding='utf-8', delay=True)
+        self.rotate_seconds = rotate_seconds
+        self.rollover_at = time.time() + rotate_seconds if rotate_seconds else None
+
+    def shouldRollover(self, record):
+        if self.rollover_at and time.time() >= self.rollover_at:
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                return True
+            self.rollover_at = time.time() + self.rotate_seconds
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.rotate_seconds:
+            self.rollover_at = time.time() + self.rotate_seconds
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Renders the record's `check` dict as one JSON line."""
+
+    def format(self, record):
+        data = getattr(record, 'check', None) or {'message': record.getMessage()}
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class OnlyChecks(logging.Filter):
+    def filter(self, record):
+        return hasattr(record, 'check')
+
+
+def configure_logging(debug=None):
+    """Route all logging through a queue to the console and rotating files.
+
+    Returns the running QueueListener (stopped automatically at exit).
+    """
+    if debug is None:
+        debug = os.getenv('LOG_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+    max_bytes = int(float(os.getenv('LOG_MAX_MB', 10)) * 2 ** 20)
+    rotate_seconds = float(os.getenv('LOG_ROTATE_HOURS', 24)) * 3600
+    backups = int(os.getenv('LOG_BACKUPS', 5))
+
+    log_format = LOG_FORMAT
+    worker = os.getenv('WORKER_NAME')
+    if worker:
+        # Worker pool: tell the workers apart on the shared console
+        log_format = log_format.replace('%(levelname)s', f"[{worker.replace('%', '%%')}] %(levelname)s")
+    text_format = logging.Formatter(log_format)
+    console = logging.StreamHandler()
+    console.setFormatter(text_format)
+    logfile = RotatingLogFile(os.getenv('LOG_FILE', 'visa_monitor.log'), max_bytes, rotate_seconds, backups)
+    logfile.setFormatter(text_format)
+    checks = RotatingLogFile(os.getenv('CHECK_LOG_FILE', 'checks.jsonl'), max_bytes, rotate_seconds, backups)
+    checks.setFormatter(JsonLinesFormatter())
+    checks.addFilter(OnlyChecks())
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, console, logfile, checks, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(logging.DEBUG if debug else logging.INFO)
+    for name, level in QUIET_LOGGERS.items():
+        logging.getLogger(name).setLevel(level)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def log_check(record, summary):
+    """Emit one check: `summary` for the text log, `record` for checks.jsonl."""
+    logging.getLogger(CHECK_LOGGER).info(summary, extra={'check': record})
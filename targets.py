@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Monitor Targets - Services and Consulates to Watch
+
+Every target is one prenotami booking service (Schengen visa, national
+visa, passport, ...) at one consulate. All targets are checked from the
+same logged-in browser on a shared rotation, each with its own interval
+and state.
+
+Configure them in .env:
+    MONITOR_TARGETS=Schengen visa:4755, National visa:4756@600, Passport:4757
+or point TARGETS_FILE at a JSON list:
+    [{"name": "Schengen visa", "service_id": 4755, "consulate": "Los Angeles", "interval": 300}]
+"""
+
+import os
+import json
+import math
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://prenotami.esteri.it"
+DEFAULT_SERVICE_ID = "4755"
+
+
+def site_url():
+    """Base URL of the booking site - PRENOTAMI_URL points the monitor at a stand-in (prenotami_standin.py)."""
+    return os.getenv('PRENOTAMI_URL', DEFAULT_BASE_URL).rstrip('/')
+
+
+class MonitorTarget:
+    """One booking service to watch, plus its rotation state."""
+
+    def __init__(self, name, service_id, check_interval, consulate='', base_url=None):
+        self.name = name
+        self.service_id = str(service_id)
+        self.check_interval = int(check_interval)
+        self.consulate = consulate
+        self.base_url = (base_url or site_url()).rstrip('/')
+        self.booking_url = f"{self.base_url}/Services/Booking/{self.service_id}"
+        self.booking_path = f"booking/{self.service_id}"
+
+        # Per-target state
+        self.check_count = 0
+        self.consecutive_errors = 0
+        self.slots_found_count = 0
+        self.last_result = None
+        self.last_checked_at = None
+        self.deadline = time.monotonic()  # Planned time on the drift-free grid
+        self.next_check = self.deadline   # deadline + this check's jitter
+        self.missed_deadlines = 0
+        self.schedule_lag = 0.0  # How late the last check started
+        self.lease_holder = None  # Node checking this target (coordination only)
+        self.alert_claim = None  # Claim of the opening this node alerted for (coordination only)
+
+    @property
+    def key(self):
+        """Identifies the target across nodes and plans - the same service at two consulates is two targets."""
+        consulate = self.consulate.strip().lower()
+        return f"{self.service_id}@{consulate}" if consulate else self.service_id
+
+    @property
+    def label(self):
+        """Human readable name used in logs and alerts."""
+        where = f" @ {self.consulate}" if self.consulate else ""
+        return f"{self.name}{where} (ID: {self.service_id})"
+
+    def schedule(self, delay, jitter=0.0):
+        """Plan the next check for delay seconds from now (restarts the grid)."""
+        self.deadline = time.monotonic() + delay
+        self.next_check = self.deadline + jitter
+
+    def advance(self, interval, jitter=0.0, now=None):
+        """Move the deadline on by interval from the previous deadline, not from now.
+
+        Check duration and wake-up latency therefore never accumulate. Deadlines
+        already in the past are skipped rather than run back to back; returns
+        how many were missed.
+        """
+        now = time.monotonic() if now is None else now
+        self.deadline += interval
+        missed = 0
+        if self.deadline < now and interval > 0:
+            missed = math.ceil((now - self.deadline) / interval)
+            self.deadline += missed * interval
+            self.missed_deadlines += missed
+        self.next_check = self.deadline + jitter
+        return missed
+
+    def __repr__(self):
+        return f"MonitorTarget({self.label!r}, every {self.check_interval}s)"
+
+
+def parse_targets(spec, default_interval):
+    """Parse 'Name:ID[@interval], ...' into targets."""
+    targets = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, rest = item.rpartition(':')
+        service_id, _, interval = rest.partition('@')
+        targets.append(MonitorTarget(
+            name.strip() or f"Service {service_id.strip()}",
+            service_id.strip(),
+            int(interval) if interval.strip() else default_interval
+        ))
+    return targets
+
+
+def load_targets_file(path, default_interval):
+    """Load targets from a JSON list of objects."""
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    return [
+        MonitorTarget(
+            entry.get('name') or f"Service {entry['service_id']}",
+            entry['service_id'],
+            entry.get('interval', default_interval),
+            consulate=entry.get('consulate', ''),
+            base_url=entry.get('base_url')
+        )
+        for entry in entries
+    ]
+
+
+def load_targets(default_interval):
+    """Targets from TARGETS_FILE or MONITOR_TARGETS, else the single default VISA service."""
+    targets_file = os.getenv('TARGETS_FILE')
+    spec = os.getenv('MONITOR_TARGETS', '')
+    try:
+        if targets_file:
+            targets = load_targets_file(targets_file, default_interval)
+        else:
+            targets = parse_targets(spec, default_interval)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"❌ Invalid target configuration: {str(e)} - using default target")
+        targets = []
+
+    if not targets:
+        targets = [MonitorTarget("VISA", DEFAULT_SERVICE_ID, default_interval)]
+    return targets
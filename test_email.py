@@ -4,40 +4,26 @@ Simple test script to verify email functionality.
 Run this before using the main bot to ensure email settings work.
 """
 
-import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from dotenv import load_dotenv
+from email_notifier import SMTPNotifier
 
 # Load environment variables
 load_dotenv()
 
 def test_email():
     """Test email functionality."""
-    sender_email = os.getenv('SENDER_EMAIL')
-    sender_password = os.getenv('SENDER_PASSWORD')
-    receiver_email_str = os.getenv('RECEIVER_EMAIL', '')
-    # Parse comma-separated email addresses
-    receiver_emails = [email.strip() for email in receiver_email_str.split(',') if email.strip()]
-    smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-    smtp_port = int(os.getenv('SMTP_PORT', 587))
+    notifier = SMTPNotifier.from_env()
+    receiver_emails = notifier.receivers
     
-    if not all([sender_email, sender_password, receiver_emails]):
+    if not notifier.configured:
         print("❌ Missing email configuration. Please check your .env file.")
         return False
     
-    try:
-        print("📧 Testing email configuration...")
-        print(f"📧 Sending to {len(receiver_emails)} recipient(s): {', '.join(receiver_emails)}")
-        
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = ', '.join(receiver_emails)  # Join all emails for display
-        msg['Subject'] = "🧪 Prenotami Bot - Test Email"
-        
-        body = f"""
+    print("📧 Testing email configuration...")
+    print(f"📧 Sending to {len(receiver_emails)} recipient(s): {', '.join(receiver_emails)}")
+    
+    body = f"""
         <html>
         <body>
             <h2>Email Configuration Test</h2>
@@ -48,28 +34,19 @@ def test_email():
         </body>
         </html>
         """
-        
-        msg.attach(MIMEText(body, 'html'))
-        
-        print(f"📤 Connecting to {smtp_server}:{smtp_port}...")
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        
-        print("🔐 Authenticating...")
-        server.login(sender_email, sender_password)
-        
-        print("📮 Sending test email...")
-        text = msg.as_string()
-        # Send to all recipients
-        server.sendmail(sender_email, receiver_emails, text)
-        server.quit()
-        
-        print(f"✅ Test email sent successfully to {len(receiver_emails)} recipient(s): {', '.join(receiver_emails)}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Email test failed: {str(e)}")
+    
+    for server in notifier.servers:
+        print(f"📤 Server: {server.address}")
+    print("📮 Sending test email...")
+    report = notifier.send("🧪 Prenotami Bot - Test Email", body)
+    notifier.close()
+    
+    if not report.success:
+        print(f"❌ Email test failed after {report.attempts} attempt(s): {report.error}")
         return False
+    
+    print(f"✅ Test email sent successfully via {report.server} in {report.latency:.2f}s to {len(receiver_emails)} recipient(s): {', '.join(receiver_emails)}")
+    return True
 
 if __name__ == "__main__":
     if test_email():
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Worker Pool - One Browser and Login per Applicant, One Shared Rate Budget
+
+Runs a BrowserVisaMonitor per account in its own process, each with its own
+Chrome profile (user-data-dir), login, targets and recipients, from a JSON
+file (WORKERS_FILE):
+
+    [
+        {"name": "alice", "MONITOR_TARGETS": "Schengen visa:4755", "RECEIVER_EMAIL": "alice@example.com"},
+        {"name": "bob", "MONITOR_TARGETS": "National visa:4756@600"}
+    ]
+
+Every key besides "name" overrides that setting from .env for the worker;
+keys that no module reads (usually a typo) are reported when the pool starts
+and by check-config.
+Per-worker files are derived from the shared settings unless given: the
+Chrome profile (<CHROME_PROFILE_DIR>-<name>), the logs
+(visa_monitor.<name>.log, checks.<name>.jsonl), the evidence directory and
+the metrics file/port.
+
+The workers' first checks are interleaved, so several accounts watching the
+same service cover it more densely, and a token bucket in shared memory caps
+the checks of all workers together at POOL_CHECKS_PER_MINUTE. A worker that
+crashes is restarted (up to WORKER_RESTARTS times); one that stops because
+it needs attention (login lost, too many errors) is left stopped.
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import difflib
+import logging
+import multiprocessing
+
+from structured_log import configure_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = '/tmp/chrome-visa-monitor'
+WORKER_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+# os.getenv('NAME' / os.environ.get('NAME' / f'PREFIX_{...}' in the monitor's modules
+SETTING_PATTERN = re.compile(r"""(?:getenv|environ\.get)\(\s*f?['"]([A-Z][A-Z0-9_]*)""")
+
+_known_settings = None
+
+
+def known_settings():
+    """Settings some module reads: (names, prefixes of per-name settings like NOTIFY_TIMEOUT_<CHANNEL>)."""
+    global _known_settings
+    if _known_settings is None:
+        names = set()
+        for path in glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py')):
+            with open(path, encoding='utf-8') as f:
+                names.update(SETTING_PATTERN.findall(f.read()))
+        prefixes = tuple(name for name in names if name.endswith('_'))
+        _known_settings = (names.difference(prefixes), prefixes)
+    return _known_settings
+
+
+def unknown_overrides(specs):
+    """Warnings for worker keys no module reads - a misspelt key silently keeps the shared value."""
+    names, prefixes = known_settings()
+    warnings = []
+    for spec in specs:
+        for key in spec.env:
+            if key in names or key.startswith(prefixes):
+                continue
+            close = difflib.get_close_matches(key, names, n=1, cutoff=0.55)
+            hint = f" (did you mean {close[0]}?)" if close else ""
+            warnings.append(f"worker {spec.name}: no monitor module reads {key}{hint}")
+    return warnings
+
+
+class TokenBucket:
+    """Token bucket shared by all worker processes: `rate` tokens per second, up to `burst` banked."""
+
+    def __init__(self, rate, burst=1.0, context=multiprocessing):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        # [tokens, last refill] - time.monotonic() is system-wide, so comparable across processes
+        self.state = context.Array('d', [self.burst, time.monotonic()])
+
+    def reserve(self):
+        """Take one token; returns how many seconds to wait before using it (0 = now).
+
+        Tokens may go negative: later callers queue up behind earlier ones
+        instead of all retrying at once.
+        """
+        with self.state.get_lock():
+            now = time.monotonic()
+            tokens = min(self.burst, self.state[0] + (now - self.state[1]) * self.rate) - 1
+            self.state[0] = tokens
+            self.state[1] = now
+        return max(0.0, -tokens / self.rate)
+
+
+class WorkerSpec:
+    """One account: a name and its .env overrides."""
+
+    def __init__(self, name, env=None):
+        self.name = name
+        self.env = dict(env or {})
+
+    def __repr__(self):
+        return f"WorkerSpec({self.name!r})"
+
+
+def _suffixed(path, name):
+    """visa_monitor.log -> visa_monitor.alice.log"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{name}{ext}"
+
+
+def derive_worker_env(spec, index):
+    """The worker's overrides plus its own profile, log, evidence and metrics locations."""
+    env = {key: str(value) for key, value in spec.env.items()}
+    name = spec.name
+    env.setdefault('CHROME_PROFILE_DIR', f"{os.getenv('CHROME_PROFILE_DIR', DEFAULT_PROFILE_DIR)}-{name}")
+    env.setdefault('LOG_FILE', _suffixed(os.getenv('LOG_FILE', 'visa_monitor.log'), name))
+    env.setdefault('CHECK_LOG_FILE', _suffixed(os.getenv('CHECK_LOG_FILE', 'checks.jsonl'), name))
+    evidence_dir = os.getenv('EVIDENCE_DIR', 'evidence')
+    if evidence_dir:
+        env.setdefault('EVIDENCE_DIR', os.path.join(evidence_dir, name))
+    if os.getenv('METRICS_FILE'):
+        env.setdefault('METRICS_FILE', _suffixed(os.getenv('METRICS_FILE'), name))
+    if int(os.getenv('METRICS_PORT', 0)):
+        env.setdefault('METRICS_PORT', str(int(os.getenv('METRICS_PORT')) + index))
+    env['WORKER_NAME'] = name
+    return env
+
+
+def load_workers(path):
+    """Read WORKERS_FILE into WorkerSpecs; raises ValueError on a bad file."""
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path} must contain a non-empty JSON list of workers")
+
+    specs = []
+    for entry in entries:
+        name = str(entry.get('name', '')).strip()
+        if not WORKER_NAME_PATTERN.match(name):
+            raise ValueError(f"worker name {name!r} must be letters, digits, '.', '_' or '-'")
+        specs.append(WorkerSpec(name, {key: value for key, value in entry.items() if key != 'name'}))
+
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("worker names must be unique")
+    profiles = [derive_worker_env(spec, index)['CHROME_PROFILE_DIR'] for index, spec in enumerate(specs)]
+    if len(set(profiles)) != len(profiles):
+        raise ValueError("each worker needs its own CHROME_PROFILE_DIR")
+    return specs
+
+
+def run_worker(env, index, count, limiter, debug):
+    """Entry point of a worker process: its own browser, login and check loop."""
+    os.environ.update(env)
+    configure_logging(debug)
+
+    from browser_monitor import BrowserVisaMonitor
+    monitor = BrowserVisaMonitor(worker_index=index, worker_count=count, rate_limiter=limiter, interactive=False)
+    if not monitor.setup_browser():
+        logger.error("❌ Failed to setup browser")
+        sys.exit(1)
+    if not monitor.ensure_logged_in():
+        logger.error("❌ Login required - worker stopped")
+        return
+    monitor.run_monitor()
+
+
+class WorkerPool:
+    """Starts the workers, restarts crashed ones and waits for all of them."""
+
+    def __init__(self, specs, checks_per_minute=0.0, burst=1.0, restarts=3, debug=None):
+        self.specs = specs
+        self.restarts = restarts
+        self.debug = debug
+        self.context = multiprocessing.get_context('spawn')
+        self.limiter = TokenBucket(checks_per_minute / 60, burst, self.context) if checks_per_minute > 0 else None
+        self.processes = {}
+        self.restart_counts = {spec.name: 0 for spec in specs}
+        self.restart_at = {}
+
+    @classmethod
+    def from_env(cls, path, debug=None):
+        return cls(
+            load_workers(path),
+            checks_per_minute=float(os.getenv('POOL_CHECKS_PER_MINUTE', 0)),
+            burst=float(os.getenv('POOL_BURST', 1)),
+            restarts=int(os.getenv('WORKER_RESTARTS', 3)),
+            debug=debug
+        )
+
+    def start(self, index):
+        spec = self.specs[index]
+        process = self.context.Process(
+            target=run_worker,
+            args=(derive_worker_env(spec, index), index, len(self.specs), self.limiter, self.debug),
+            name=f"worker-{spec.name}"
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info(f"👷 Worker {spec.name} started (pid {process.pid})")
+
+    def supervise(self):
+        """Restart workers that crashed; returns False once every worker has stopped."""
+        for index, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            del self.processes[index]
+            name = self.specs[index].name
+            if process.exitcode == 0:
+                logger.info(f"👷 Worker {name} stopped")
+            elif self.restart_counts[name] < self.restarts:
+                self.restart_counts[name] += 1
+                delay = 30 * self.restart_counts[name]
+                logger.warning(f"⚠️ Worker {name} exited with code {process.exitcode} - "
+                               f"restarting in {delay}s ({self.restart_counts[name]}/{self.restarts})")
+                self.restart_at[index] = time.monotonic() + delay
+            else:
+                logger.error(f"❌ Worker {name} exited with code {process.exitcode} - giving up")
+
+        for index, when in list(self.restart_at.items()):
+            if time.monotonic() >= when:
+                del self.restart_at[index]
+                self.start(index)
+        return bool(self.processes or self.restart_at)
+
+    def run(self):
+        rate = f"{self.limiter.rate * 60:g} checks/min for all workers" if self.limiter else "no shared rate limit"
+        logger.info(f"👷 Starting {len(self.specs)} worker(s): {', '.join(spec.name for spec in self.specs)} ({rate})")
+        for index in range(len(self.specs)):
+            self.start(index)
+        try:
+            while self.supervise():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            # Workers got the same Ctrl+C and shut down on their own - give them the chance
+            logger.info("🛑 Stopping workers...")
+            for process in self.processes.values():
+                process.join(timeout=30)
+                if process.is_alive():
+                    process.terminate()
+        logger.info("👷 All workers stopped")
+
+
+def run_pool(path, debug=None):
+    """Run the workers listed in path until all of them have stopped; returns an exit code."""
+    configure_logging(debug)
+    try:
+        pool = WorkerPool.from_env(path, debug)
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ Invalid worker configuration: {str(e)}")
+        return 1
+    for warning in unknown_overrides(pool.specs):
+        logger.warning(f"⚠️ {warning}")
+    pool.run()
+    return 0